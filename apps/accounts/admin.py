@@ -2,12 +2,15 @@ from django.contrib import admin
 from django import forms
 from django.urls import path
 from django.http import JsonResponse
+from django.utils import timezone
 
 from .models import (
     Profile, Halaqa,
     Recitation, RecitationSubmission,
     Review, ReviewSubmission,
     Surah,
+    StudentProgress, StudentTaskStatus,
+    Job, AudioBlob, Broadcast, OutboundMessage,
 )
 
 # ========== Helpers ==========
@@ -79,7 +82,7 @@ class ProfileAdmin(admin.ModelAdmin):
 # ========== Halaqa ==========
 @admin.register(Halaqa)
 class HalaqaAdmin(admin.ModelAdmin):
-    list_display  = ("name",)
+    list_display  = ("name", "audio_retention_days")
     search_fields = ("name",)
     filter_horizontal = ("teachers",)
 
@@ -279,4 +282,69 @@ class ReviewSubmissionAdmin(admin.ModelAdmin):
 
     def review_title(self, obj):
         return _range_title(obj.review)
-    review_title.short_description = "المراجعة"
\ No newline at end of file
+    review_title.short_description = "المراجعة"
+
+# ========== StudentProgress ==========
+@admin.register(StudentProgress)
+class StudentProgressAdmin(admin.ModelAdmin):
+    list_display  = ("student", "total_score", "graded_count", "ayah_count", "updated_at")
+    search_fields = ("student__user__username",)
+    readonly_fields = ("student", "total_score", "graded_count", "ayah_count", "updated_at")
+
+# ========== StudentTaskStatus ==========
+@admin.register(StudentTaskStatus)
+class StudentTaskStatusAdmin(admin.ModelAdmin):
+    list_display  = ("student", "halaqa", "recitation", "review", "status", "score", "deadline")
+    list_filter   = ("status", "halaqa")
+    search_fields = ("student__user__username",)
+    list_select_related = ("student__user", "halaqa", "recitation__surah", "recitation__halaqa",
+                           "review__surah", "review__halaqa")
+    readonly_fields = ("halaqa", "student", "recitation", "review", "status", "score", "deadline", "updated_at")
+
+# ========== Job (طابور المهام الخلفية) ==========
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display  = ("id", "name", "status", "priority", "attempts", "max_attempts", "run_at", "finished_at")
+    list_filter   = ("status", "name")
+    readonly_fields = ("locked_by", "locked_at", "last_error", "created_at", "finished_at")
+    actions = ["retry_jobs"]
+
+    @admin.action(description="إعادة تشغيل المهام المحددة")
+    def retry_jobs(self, request, queryset):
+        count = queryset.exclude(status=Job.STATUS_RUNNING).update(
+            status=Job.STATUS_QUEUED, attempts=0, run_at=timezone.now(), finished_at=None,
+        )
+        self.message_user(request, f"تمت إعادة {count} مهمة إلى الطابور.")
+
+# ========== AudioBlob (تسجيلات بعنوان المحتوى) ==========
+@admin.register(AudioBlob)
+class AudioBlobAdmin(admin.ModelAdmin):
+    list_display  = ("name", "size", "refcount", "created_at", "unreferenced_at")
+    list_filter   = ("refcount",)
+    search_fields = ("name", "sha256")
+    readonly_fields = ("name", "sha256", "size", "refcount", "created_at", "unreferenced_at")
+
+# ========== Broadcast (إشعارات جماعية) ==========
+@admin.register(Broadcast)
+class BroadcastAdmin(admin.ModelAdmin):
+    list_display  = ("title", "halaqa", "sender", "created_at")
+    list_filter   = ("halaqa",)
+    search_fields = ("title", "message")
+    list_select_related = ("halaqa", "sender__user")
+    raw_id_fields = ("sender",)
+
+# ========== OutboundMessage (صادر رسائل أولياء الأمور) ==========
+@admin.register(OutboundMessage)
+class OutboundMessageAdmin(admin.ModelAdmin):
+    list_display  = ("id", "to", "channel", "kind", "day", "seq", "status", "attempts", "sent_at")
+    list_filter   = ("status", "kind", "channel", "day")
+    search_fields = ("to", "body", "provider_id")
+    readonly_fields = ("attempts", "locked_by", "locked_at", "provider_id", "last_error", "created_at", "sent_at")
+    actions = ["retry_messages"]
+
+    @admin.action(description="إعادة إرسال الرسائل الفاشلة المحددة")
+    def retry_messages(self, request, queryset):
+        count = queryset.filter(status=OutboundMessage.STATUS_FAILED).update(
+            status=OutboundMessage.STATUS_QUEUED, attempts=0, run_at=timezone.now(), last_error="",
+        )
+        self.message_user(request, f"تمت إعادة {count} رسالة إلى الصادر.")
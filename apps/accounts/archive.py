@@ -0,0 +1,157 @@
+# apps/accounts/archive.py
+import os
+import posixpath
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import storages
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .audio import TranscodeError, _download, transcode_to_opus
+from .blobs import delete_unreferenced, swap_reference
+from .models import BaseSubmission, Halaqa
+from .stats import TASK_KINDS
+
+ARCHIVE_BATCH_SIZE = 200
+# تسجيل استُرجع من الأرشيف لا يعود إليه قبل هذه المدة (غالبًا سيُفتح مرة أخرى قريبًا)
+ARCHIVE_RESTORE_KEEP = timedelta(days=30)
+
+
+def archive_storage():
+    return storages["audio_archive"]
+
+
+def retention_days(halaqa_days):
+    """أيام الاحتفاظ للحلقة (None = الإعداد العام، 0 = لا أرشفة)."""
+    return settings.AUDIO_ARCHIVE_AFTER_DAYS if halaqa_days is None else halaqa_days
+
+
+def archive_candidates(now=None, halaqa_id=None):
+    """
+    يعيد [(model, queryset)] للتسليمات المصححة الجاهزة التي مر على تصحيحها
+    أكثر من أيام الاحتفاظ لحلقتها ولم تُسترجع من الأرشيف مؤخرًا.
+    updated_at = وقت التصحيح (المعالجة والأرشفة تحدّث بـ update() فلا تغيّره).
+    """
+    now = now or timezone.now()
+    halaqat = Halaqa.objects.all()
+    if halaqa_id is not None:
+        halaqat = halaqat.filter(pk=halaqa_id)
+
+    result = []
+    for pk, days in halaqat.values_list("pk", "audio_retention_days"):
+        days = retention_days(days)
+        if not days:
+            continue
+        for kind, (_, model) in TASK_KINDS.items():
+            qs = model.objects.filter(
+                Q(audio_restored_at__isnull=True) | Q(audio_restored_at__lt=now - ARCHIVE_RESTORE_KEEP),
+                **{f"{kind}__halaqa_id": pk},
+                status="graded", audio_status=BaseSubmission.AUDIO_READY, archived_at__isnull=True,
+                updated_at__lt=now - timedelta(days=days),
+            ).exclude(audio="").exclude(audio__isnull=True)
+            result.append((model, qs))
+    return result
+
+
+def archive_submission_audio(submission):
+    """
+    ينسخ التسجيل إلى تخزين الأرشيف (نسخة واحدة لكل blob) ويستبدل به في التخزين
+    الأساسي معاينة قصيرة منخفضة الجودة (AUDIO_PREVIEW_SECONDS). الأصل في التخزين
+    الأساسي يتحرر ويجمعه gc_audio_blobs. المدة والموجة تبقى للتسجيل الكامل.
+    """
+    model = type(submission)
+    hot, archive = submission.audio.storage, archive_storage()
+    name = submission.audio.name
+
+    with tempfile.TemporaryDirectory(prefix="archive-") as tmp:
+        preview = os.path.join(tmp, "preview.ogg")
+        try:
+            src = _download(hot, name, tmp)
+            transcode_to_opus(src, preview, end=settings.AUDIO_PREVIEW_SECONDS,
+                              bitrate=settings.AUDIO_PREVIEW_BITRATE)
+        except (OSError, TranscodeError) as e:
+            raise TranscodeError(f"{model.__name__} #{submission.pk}: {e}") from e
+        if not archive.exists(name):
+            with open(src, "rb") as f:
+                archived = archive.save(name, File(f))
+        else:
+            archived = name
+        with open(preview, "rb") as f:
+            preview_name = hot.save(posixpath.splitext(name)[0] + ".ogg", File(f))
+
+    with transaction.atomic():
+        updated = model.objects.filter(pk=submission.pk, audio=name, archived_at__isnull=True).update(
+            audio=preview_name, audio_archive=archived, archived_at=timezone.now(),
+        )
+        if updated:
+            swap_reference(name, preview_name, hot)
+            # blobs لا تُحذف هنا؛ الأسماء القديمة (submissions/...) تُحذف لو لم يعد يشير إليها تسليم
+            transaction.on_commit(lambda: delete_unreferenced(name, hot))
+    return bool(updated)
+
+
+def restore_submission_audio(submission):
+    """
+    يعيد التسجيل الكامل من الأرشيف إلى التخزين الأساسي (عند فتحه للتصحيح).
+    لو لم يُجمع الـ blob الأصلي بعد فلا يُنسخ شيء (نفس المحتوى = نفس الاسم).
+    يحدّث submission نفسه ويعيد True لو تم الاسترجاع.
+    """
+    if not submission.audio_archive:
+        return False
+    model = type(submission)
+    hot = submission.audio.storage
+    preview, archived = submission.audio.name, submission.audio_archive
+
+    with archive_storage().open(archived, "rb") as f:
+        name = hot.save(archived, File(f, name=archived))
+
+    now = timezone.now()
+    with transaction.atomic():
+        updated = model.objects.filter(pk=submission.pk, audio=preview, audio_archive=archived).update(
+            audio=name, audio_archive="", archived_at=None, audio_restored_at=now,
+        )
+        if updated:
+            swap_reference(preview, name, hot)
+    if updated:
+        submission.audio.name = name
+        submission.audio_archive, submission.archived_at, submission.audio_restored_at = "", None, now
+    return bool(updated)
+
+
+def archive_due_recordings(batch_size=ARCHIVE_BATCH_SIZE, halaqa_id=None):
+    """يؤرشف حتى batch_size تسجيلًا مستحقًا. يعيد (عدد ما أُرشف، رسائل الأخطاء)."""
+    archived, errors = 0, []
+    for _, qs in archive_candidates(halaqa_id=halaqa_id):
+        for submission in qs.order_by("updated_at", "id")[:batch_size - archived]:
+            try:
+                archived += archive_submission_audio(submission)
+            except TranscodeError as e:
+                errors.append(str(e))
+        if archived >= batch_size:
+            break
+    return archived, errors
+
+
+def orphaned_archives():
+    """ملفات الأرشيف التي لا يشير إليها أي تسليم (حُذف أو أُعيد تسليمه)."""
+    storage = archive_storage()
+    referenced = set()
+    for _, model in TASK_KINDS.values():
+        referenced.update(model.objects.exclude(audio_archive="").values_list("audio_archive", flat=True))
+        referenced.update(model.objects.exclude(audio="").values_list("audio", flat=True))
+
+    def walk(path):
+        dirs, files = storage.listdir(path)
+        for f in files:
+            yield posixpath.join(path, f) if path else f
+        for d in dirs:
+            yield from walk(posixpath.join(path, d) if path else d)
+
+    try:
+        return [name for name in walk("") if name not in referenced]
+    except FileNotFoundError:  # لم يُؤرشف شيء بعد
+        return []
@@ -0,0 +1,286 @@
+# apps/accounts/audio.py
+import math
+import os
+import posixpath
+import shutil
+import subprocess
+import sys
+import tempfile
+from array import array
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Q
+
+from .blobs import delete_unreferenced, swap_reference
+from .models import BaseSubmission, RecitationSubmission, ReviewSubmission
+
+SUBMISSION_MODELS = (RecitationSubmission, ReviewSubmission)
+TRANSCODE_BATCH_SIZE = 20
+# granule position في Ogg/Opus دائمًا بوحدة عينات 48kHz مهما كان تردد المصدر
+OPUS_GRANULE_RATE = 48000
+# الموجة: عدد القمم المخزنة، وتردد فك الصوت لحسابها، وطول النافذة (50ms)
+WAVEFORM_PEAKS = 200
+WAVEFORM_RATE = 8000
+WAVEFORM_WINDOW = WAVEFORM_RATE // 20
+WINDOW_SECONDS = WAVEFORM_WINDOW / WAVEFORM_RATE
+# كشف الكلام (VAD) على نفس النوافذ
+VAD_MIN_GAP = 1.0  # سكتة أقصر من هذا تبقى داخل المقطع (وقف طبيعي بين الآيات)
+VAD_PADDING = 0.2  # هامش حول كل مقطع حتى لا تُقطع أطراف الكلمات
+VAD_MIN_SEGMENT = 0.25  # صوت أقصر من هذا (نقرة/طقطقة) ليس كلامًا
+
+
+class TranscodeError(RuntimeError):
+    pass
+
+
+def transcode_to_opus(src_path, dst_path, start=None, end=None, bitrate=None):
+    """
+    يحوّل أي صيغة يفهمها ffmpeg إلى Opus/Ogg أحادي بمعدل بت ثابت منخفض
+    (الكلام لا يحتاج أكثر من 24-32 kbps للتصحيح)، مع القص إلى [start, end] بالثواني.
+    """
+    trim = []
+    if start:
+        trim += ["-ss", f"{start:.3f}"]
+    if end is not None:
+        trim += ["-to", f"{end:.3f}"]
+    cmd = [
+        getattr(settings, "FFMPEG_BINARY", "ffmpeg"),
+        "-nostdin", "-hide_banner", "-loglevel", "error", "-y",
+        "-i", src_path, *trim,
+        "-vn", "-map_metadata", "-1", "-ac", "1", "-ar", "48000",
+        "-c:a", "libopus", "-b:a", bitrate or getattr(settings, "AUDIO_OPUS_BITRATE", "24k"),
+        "-application", "voip",
+        "-f", "ogg", dst_path,
+    ]
+    try:
+        result = subprocess.run(
+            cmd, capture_output=True, text=True,
+            timeout=getattr(settings, "AUDIO_TRANSCODE_TIMEOUT", 300),
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        raise TranscodeError(f"ffmpeg: {e}") from e
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise TranscodeError(lines[-1] if lines else f"ffmpeg exited with {result.returncode}")
+
+
+def ogg_opus_duration(path):
+    """
+    مدة ملف Ogg/Opus بالثواني من granule position لآخر صفحة ناقص pre-skip،
+    بدون ffprobe. يعيد None لو الملف ليس Ogg/Opus.
+    """
+    with open(path, "rb") as f:
+        head = f.read(4096)
+        f.seek(0, os.SEEK_END)
+        f.seek(max(0, f.tell() - 65536))  # أقصى حجم لصفحة Ogg أقل من 64KB
+        tail = f.read()
+    opus_head = head.find(b"OpusHead")
+    last_page = tail.rfind(b"OggS")
+    if opus_head < 0 or last_page < 0:
+        return None
+    pre_skip = int.from_bytes(head[opus_head + 10:opus_head + 12], "little")
+    granule = int.from_bytes(tail[last_page + 6:last_page + 14], "little")
+    return max(granule - pre_skip, 0) / OPUS_GRANULE_RATE
+
+
+def _window_peaks(data):
+    samples = array("h", data)
+    if sys.byteorder == "big":
+        samples.byteswap()
+    return [
+        min(max(max(w), -min(w)), 32767)
+        for w in (samples[i:i + WAVEFORM_WINDOW] for i in range(0, len(samples), WAVEFORM_WINDOW))
+    ]
+
+
+def decode_windows(path):
+    """
+    يعيد (قمة كل نافذة 50ms بين 0 و32767، المدة بالثواني).
+    الصوت يُفك بـ ffmpeg إلى PCM أحادي 8kHz ويُقرأ كتدفق،
+    فلا يُحمَّل التسجيل كاملًا في الذاكرة.
+    """
+    cmd = [
+        getattr(settings, "FFMPEG_BINARY", "ffmpeg"),
+        "-nostdin", "-hide_banner", "-loglevel", "error",
+        "-i", path, "-vn", "-ac", "1", "-ar", str(WAVEFORM_RATE), "-f", "s16le", "-",
+    ]
+    windows, total, rest = [], 0, b""
+    window_bytes = WAVEFORM_WINDOW * 2
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr)
+        except OSError as e:
+            raise TranscodeError(f"ffmpeg: {e}") from e
+        with proc:
+            for chunk in iter(lambda: proc.stdout.read(window_bytes * 64), b""):
+                data = rest + chunk
+                usable = len(data) - len(data) % window_bytes
+                windows += _window_peaks(data[:usable])
+                total += usable // 2
+                rest = data[usable:]
+        if len(rest) >= 2:
+            windows += _window_peaks(rest[:len(rest) - len(rest) % 2])
+            total += len(rest) // 2
+        if proc.returncode != 0:
+            stderr.seek(0)
+            lines = stderr.read().decode(errors="replace").strip().splitlines()
+            raise TranscodeError(lines[-1] if lines else f"ffmpeg exited with {proc.returncode}")
+    return windows, total / WAVEFORM_RATE
+
+
+def peaks_from_windows(windows, count=WAVEFORM_PEAKS):
+    """قمم الموجة كـ bytes بطول count (0-255)، مطبّعة على أعلى قمة في التسجيل."""
+    if not windows:
+        return bytes(count)
+    loudest = max(windows) or 1
+    peaks = bytearray()
+    for k in range(count):
+        lo = k * len(windows) // count
+        hi = max((k + 1) * len(windows) // count, lo + 1)
+        peaks.append(round(max(windows[lo:hi]) * 255 / loudest))
+    return bytes(peaks)
+
+
+def voiced_segments(windows):
+    """
+    مقاطع الكلام [[start, end], ...] بالثواني بكشف طاقة بسيط على نوافذ 50ms.
+    العتبة فوق مستوى الضوضاء (النسبة المئوية 10) ونسبة من مستوى الكلام (95)،
+    ثم تُدمج السكتات الأقصر من VAD_MIN_GAP وتُهمل الأصوات الأقصر من VAD_MIN_SEGMENT.
+    """
+    if not windows:
+        return []
+    ordered = sorted(windows)
+    noise = ordered[len(ordered) // 10]
+    speech = ordered[len(ordered) * 95 // 100]
+    # بدون سكوت في التسجيل تكون noise قريبة من speech، فلا نرفع العتبة فوق نصف الكلام
+    threshold = max(min(noise * 3, speech * 0.5), speech * 0.1, 200)
+
+    raw, start, last = [], None, None
+    for i, peak in enumerate(windows):
+        if peak < threshold:
+            continue
+        if start is not None and (i - last - 1) * WINDOW_SECONDS > VAD_MIN_GAP:
+            raw.append((start, last + 1))
+            start = None
+        if start is None:
+            start = i
+        last = i
+    if start is not None:
+        raw.append((start, last + 1))
+
+    total = len(windows) * WINDOW_SECONDS
+    segments = []
+    for first, end in raw:
+        if (end - first) * WINDOW_SECONDS < VAD_MIN_SEGMENT:
+            continue
+        a = max(first * WINDOW_SECONDS - VAD_PADDING, 0)
+        b = min(end * WINDOW_SECONDS + VAD_PADDING, total)
+        if segments and a <= segments[-1][1]:
+            segments[-1][1] = b
+        else:
+            segments.append([a, b])
+    return [[round(a, 2), round(b, 2)] for a, b in segments]
+
+
+def _download(storage, name, directory):
+    """نسخة محلية من ملف التخزين (قد يكون بعيدًا) ليقرأها ffmpeg."""
+    path = os.path.join(directory, "source" + posixpath.splitext(name)[1])
+    with storage.open(name, "rb") as f, open(path, "wb") as out:
+        shutil.copyfileobj(f, out)
+    return path
+
+
+def process_submission_audio(submission):
+    """
+    يحوّل تسجيل التسليم إلى Opus مقصوص السكوت في أوله وآخره ويستبدل الأصل به،
+    مع حفظ المدة والحجم وقمم الموجة ومقاطع الكلام.
+    الأصل لا يُحذف إلا بعد حفظ النسخة الجديدة وتحديث الصف. عند الفشل يبقى
+    الأصل كما هو (ويظل قابلًا للتشغيل) ويُعلَّم التسليم failed ثم يُرفع TranscodeError.
+    التحديث بـ update() حتى لا يتغير updated_at (يُستخدم في حساب زمن التصحيح).
+    """
+    model = type(submission)
+    storage = submission.audio.storage
+    original = submission.audio.name
+    current = model.objects.filter(pk=submission.pk, audio=original)
+
+    with tempfile.TemporaryDirectory(prefix="transcode-") as tmp:
+        dst = os.path.join(tmp, "audio.ogg")
+        try:
+            src = _download(storage, original, tmp)
+            windows, source_duration = decode_windows(src)
+            segments = voiced_segments(windows)
+            # قص السكوت في البداية والنهاية؛ لو لم يُكتشف كلام يبقى التسجيل كاملًا
+            start, end = (segments[0][0], segments[-1][1]) if segments else (0, source_duration)
+            transcode_to_opus(src, dst, start=start, end=end if end < source_duration else None)
+        except (OSError, TranscodeError) as e:
+            current.update(audio_status=BaseSubmission.AUDIO_FAILED)
+            raise TranscodeError(f"{model.__name__} #{submission.pk}: {e}") from e
+
+        size = os.path.getsize(dst)
+        duration = ogg_opus_duration(dst) or end - start
+        # المقاطع والموجة نسبةً إلى الملف المقصوص
+        segments = [[round(a - start, 2), round(b - start, 2)] for a, b in segments]
+        peaks = peaks_from_windows(windows[int(start / WINDOW_SECONDS):math.ceil(end / WINDOW_SECONDS)])
+        with open(dst, "rb") as f:
+            name = storage.save(posixpath.splitext(original)[0] + ".ogg", File(f))
+
+    with transaction.atomic():
+        updated = current.update(
+            audio=name, audio_status=BaseSubmission.AUDIO_READY,
+            audio_duration=duration, audio_size=size, audio_peaks=peaks, audio_segments=segments,
+        )
+        if updated:
+            # update() لا يطلق signals، فنحدّث عدّاد المراجع هنا
+            swap_reference(original, name, storage)
+            # الأصل قد يتشاركه تسليم آخر (blob أو ملف قديم مشترك)؛ لا يُحذف إلا لو لم يعد مستخدمًا
+            transaction.on_commit(lambda: delete_unreferenced(original, storage))
+    if not updated:
+        # الطالب أعاد التسليم أثناء المعالجة: النسخة المحوّلة لم تعد تخص التسليم
+        storage.delete(name)
+    return bool(updated)
+
+
+def pending_recordings(model, include_failed=False):
+    statuses = [BaseSubmission.AUDIO_PENDING]
+    if include_failed:
+        statuses.append(BaseSubmission.AUDIO_FAILED)
+    return model.objects.filter(audio_status__in=statuses).exclude(audio="").exclude(audio__isnull=True)
+
+
+def process_pending_recordings(batch_size=TRANSCODE_BATCH_SIZE, include_failed=False):
+    """
+    يعالج دفعة من أقدم التسجيلات المنتظرة لكل نوع تسليم.
+    يعيد (عدد ما تم تحويله، قائمة رسائل الأخطاء).
+    """
+    processed, errors = 0, []
+    for model in SUBMISSION_MODELS:
+        for submission in pending_recordings(model, include_failed).order_by("created_at", "id")[:batch_size]:
+            try:
+                processed += process_submission_audio(submission)
+            except TranscodeError as e:
+                errors.append(str(e))
+    return processed, errors
+
+
+def missing_waveforms(model):
+    """تسجيلات جاهزة بلا قمم موجة أو مقاطع كلام (حُوّلت قبل إضافتهما)."""
+    return model.objects.filter(
+        Q(audio_peaks__isnull=True) | Q(audio_segments__isnull=True),
+        audio_status=BaseSubmission.AUDIO_READY,
+    ).exclude(audio="").exclude(audio__isnull=True)
+
+
+def store_waveform(submission):
+    """يحسب قمم الموجة ومقاطع الكلام (والمدة لو غير معروفة) لتسجيل موجود دون تحويله أو قصه."""
+    name = submission.audio.name
+    with tempfile.TemporaryDirectory(prefix="waveform-") as tmp:
+        try:
+            windows, duration = decode_windows(_download(submission.audio.storage, name, tmp))
+        except (OSError, TranscodeError) as e:
+            raise TranscodeError(f"{type(submission).__name__} #{submission.pk}: {e}") from e
+    return type(submission).objects.filter(pk=submission.pk, audio=name).update(
+        audio_peaks=peaks_from_windows(windows), audio_segments=voiced_segments(windows),
+        audio_duration=submission.audio_duration or duration,
+    )
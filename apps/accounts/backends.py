@@ -0,0 +1,19 @@
+# apps/accounts/backends.py
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """
+    ModelBackend يجلب الـ profile مع المستخدم في نفس استعلام الجلسة، فقراءة
+    request.user.profile (وشارة الإشعارات في القوالب) لا تضيف استعلامًا لكل طلب.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related("profile").get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
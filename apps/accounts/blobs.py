@@ -0,0 +1,161 @@
+# apps/accounts/blobs.py
+import posixpath
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AudioBlob, RecitationSubmission, ReviewSubmission, submission_storage
+from .storage import BLOB_PREFIX, is_blob_name
+
+SUBMISSION_MODELS = (RecitationSubmission, ReviewSubmission)
+
+
+def acquire(name, storage=None):
+    """تسليم أصبح يشير إلى name."""
+    if not is_blob_name(name):
+        return
+    if AudioBlob.objects.filter(name=name).update(refcount=F("refcount") + 1, unreferenced_at=None):
+        return
+    # ملف blob بلا صف (حُفظ قبل تفعيل العدّاد مثلًا)
+    digest = posixpath.splitext(posixpath.basename(name))[0]
+    size = storage.size(name) if storage is not None and storage.exists(name) else 0
+    AudioBlob.objects.get_or_create(name=name, defaults={"sha256": digest, "size": size, "refcount": 1})
+
+
+def release(name):
+    """تسليم لم يعد يشير إلى name (تغيّر الملف أو حُذف التسليم)."""
+    if not is_blob_name(name):
+        return
+    AudioBlob.objects.filter(name=name, refcount__gt=0).update(refcount=F("refcount") - 1)
+    AudioBlob.objects.filter(name=name, refcount=0, unreferenced_at__isnull=True).update(
+        unreferenced_at=timezone.now()
+    )
+
+
+def swap_reference(old, new, storage=None):
+    if old != new:
+        acquire(new, storage)
+        release(old)
+
+
+def is_referenced(name):
+    return any(model.objects.filter(audio=name).exists() for model in SUBMISSION_MODELS)
+
+
+def delete_unreferenced(name, storage):
+    """
+    يحذف ملفًا قديمًا (خارج blobs/) تركه تسليم، إلا لو ما زال تسليم آخر يشير إليه
+    (ملفات seed_load_dataset التجريبية مثلًا مشتركة بين آلاف التسليمات).
+    ملفات blobs لا تُحذف هنا؛ يجمعها gc_audio_blobs حين يصل عدّادها للصفر.
+    """
+    if not is_blob_name(name) and not is_referenced(name):
+        storage.delete(name)
+
+
+def recount_references():
+    """
+    يعيد حساب refcount لكل blob من جداول التسليمات (بعد bulk_create أو تعديل يدوي).
+    يعيد عدد الصفوف التي صُححت.
+    """
+    actual = Counter()
+    for model in SUBMISSION_MODELS:
+        for name in model.objects.filter(audio__startswith=BLOB_PREFIX).values_list("audio", flat=True):
+            actual[name] += 1
+
+    storage, now, fixed = submission_storage(), timezone.now(), []
+    for blob in AudioBlob.objects.all().iterator():
+        count = actual.pop(blob.name, 0)
+        if blob.refcount != count:
+            blob.refcount = count
+            blob.unreferenced_at = None if count else (blob.unreferenced_at or now)
+            fixed.append(blob)
+    AudioBlob.objects.bulk_update(fixed, ["refcount", "unreferenced_at"], batch_size=500)
+    for name, count in actual.items():  # ملفات blobs مستخدمة بلا صف
+        acquire(name, storage)
+        AudioBlob.objects.filter(name=name).update(refcount=count)
+    return len(fixed) + len(actual)
+
+
+def collect_garbage(grace, dry_run=False):
+    """
+    يحذف blobs بلا مراجع منذ أكثر من grace. قبل الحذف نتأكد أن لا تسليم يشير للملف،
+    ونحذف الصف بشرط (refcount=0 و unreferenced_at قديم) قبل الملف؛ فالـ blob الذي
+    أُعيد استخدامه للتو (save يحدّث unreferenced_at) لا يُحذف. يعيد (العدد، البايتات).
+    """
+    storage = submission_storage()
+    cutoff = timezone.now() - grace
+    count = size = 0
+    for blob in AudioBlob.objects.filter(refcount=0, unreferenced_at__lt=cutoff).iterator():
+        references = sum(model.objects.filter(audio=blob.name).count() for model in SUBMISSION_MODELS)
+        if references:  # العدّاد انحرف (تعديل لم يمر بالـ signals)؛ نصححه بدل الحذف
+            AudioBlob.objects.filter(pk=blob.pk).update(refcount=references, unreferenced_at=None)
+            continue
+        if not dry_run:
+            deleted, _ = AudioBlob.objects.filter(pk=blob.pk, refcount=0, unreferenced_at__lt=cutoff).delete()
+            if not deleted:
+                continue
+            storage.purge(blob.name)
+        count += 1
+        size += blob.size
+    return count, size
+
+
+def _walk(storage, path):
+    dirs, files = storage.listdir(path)
+    for f in files:
+        yield posixpath.join(path, f)
+    for d in dirs:
+        yield from _walk(storage, posixpath.join(path, d))
+
+
+def stray_files(grace, directories=("submissions", "blobs")):
+    """
+    ملفات في مجلدات التسجيلات لا يشير إليها أي تسليم ولا صف AudioBlob
+    (من قبل التخزين بعنوان المحتوى، أو من رفع فشل). الأحدث من grace تُترك.
+    """
+    storage = submission_storage()
+    cutoff = timezone.now() - grace
+    referenced = set()
+    for model in SUBMISSION_MODELS:
+        referenced.update(model.objects.exclude(audio="").values_list("audio", flat=True))
+    referenced.update(AudioBlob.objects.values_list("name", flat=True))
+    for directory in directories:
+        if not storage.exists(directory):
+            continue
+        for name in _walk(storage, directory):
+            if name not in referenced and storage.get_modified_time(name) < cutoff:
+                yield name
+
+
+def delete_stray_file(name):
+    storage = submission_storage()
+    if is_blob_name(name):
+        storage.purge(name)
+    else:
+        storage.delete(name)
+
+
+def adopt_legacy_files():
+    """
+    ينقل تسجيلات التسليمات القديمة (submissions/...) إلى التخزين بعنوان المحتوى،
+    فتتوحد النسخ المكررة. الملف القديم يُحذف حين لا يشير إليه تسليم آخر.
+    يعيد (عدد التسليمات المنقولة، أسماء الملفات المفقودة).
+    """
+    storage = submission_storage()
+    moved, missing = 0, []
+    for model in SUBMISSION_MODELS:
+        legacy = model.objects.exclude(audio="").exclude(audio__isnull=True).exclude(audio__startswith=BLOB_PREFIX)
+        for pk, old in legacy.values_list("pk", "audio").iterator():
+            if not storage.exists(old):
+                missing.append(old)
+                continue
+            with storage.open(old, "rb") as f:
+                new = storage.save(old, f)
+            with transaction.atomic():
+                if model.objects.filter(pk=pk, audio=old).update(audio=new):
+                    acquire(new, storage)
+                    moved += 1
+            delete_unreferenced(old, storage)
+    return moved, missing
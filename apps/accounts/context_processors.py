@@ -0,0 +1,17 @@
+# apps/accounts/context_processors.py
+
+
+def notifications(request):
+    """
+    unread_notifications لشارة الإشعارات في القوالب الأساسية: من العدّاد المخزّن
+    في الـ profile المحمّل مع المستخدم (ProfileModelBackend)، بلا استعلام COUNT.
+    دالة وليست قيمة، فالصفحات التي لا تعرض الشارة لا تلمس الـ profile أصلًا.
+    """
+    def unread():
+        user = getattr(request, "user", None)
+        if user is None or not user.is_authenticated:
+            return 0
+        profile = getattr(user, "profile", None)
+        return profile.unread_notifications if profile is not None else 0
+
+    return {"unread_notifications": unread}
@@ -0,0 +1,47 @@
+# apps/accounts/deadlines.py
+from django.db import transaction
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import StudentTaskStatus
+
+SWEEP_BATCH_SIZE = 500
+
+# يُرسل مرة لكل دفعة من المهام التي فات موعدها (بعد حفظها كـ "متأخرة").
+# rows: قائمة صفوف StudentTaskStatus (id, student_id, recitation_id, review_id, deadline)
+# هذا هو المكان الوحيد لربط أي عمل يعتمد على مرور الموعد النهائي (إشعارات، رسائل، ...).
+tasks_overdue = Signal()
+
+
+def overdue_task_statuses(now=None):
+    """المهام المطلوبة التي فات موعدها ولم تُعلَّم بعد (على الفهرس status, deadline)."""
+    return StudentTaskStatus.objects.filter(
+        status=StudentTaskStatus.STATUS_ASSIGNED, deadline__lt=now or timezone.now()
+    )
+
+
+def sweep_overdue_tasks(now=None, batch_size=SWEEP_BATCH_SIZE):
+    """
+    يعلّم كل مهمة فات موعدها كـ "متأخرة" على دفعات: تحديث مجمّع واحد لكل دفعة
+    ثم إرسال tasks_overdue بنفس الدفعة. آمن للتشغيل المتكرر (cron) لأن الصفوف
+    المتأخرة لا تُلتقط مرة أخرى. يعيد عدد الصفوف التي تم تعليمها.
+    """
+    now = now or timezone.now()
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                overdue_task_statuses(now)
+                .order_by("deadline", "id")
+                .values("id", "student_id", "recitation_id", "review_id", "deadline")[:batch_size]
+            )
+            if not rows:
+                break
+            StudentTaskStatus.objects.filter(
+                id__in=[r["id"] for r in rows], status=StudentTaskStatus.STATUS_ASSIGNED
+            ).update(status=StudentTaskStatus.STATUS_LATE, updated_at=now)
+            tasks_overdue.send(sender=StudentTaskStatus, rows=rows, now=now)
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
@@ -0,0 +1,166 @@
+# apps/accounts/digest.py
+import smtplib
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Broadcast, BroadcastReceipt, Notification, Profile
+from .stats import TASK_KINDS
+
+# أقصى مدة يغطيها الملخص (لمن لم يصله ملخص من قبل أو توقف عنه فترة)
+DIGEST_WINDOW = timedelta(days=1)
+
+
+@dataclass
+class Digest:
+    """محتوى ملخص بروفايل واحد عن الفترة [since, until)."""
+    profile: Profile
+    since: datetime
+    until: datetime
+    notifications: list = field(default_factory=list)  # Notification و Broadcast غير المقروءة
+    tasks: list = field(default_factory=list)          # Recitation / Review جديدة في حلقته
+    grades: list = field(default_factory=list)         # تسليمات صُححت
+
+    def __bool__(self):
+        return bool(self.notifications or self.tasks or self.grades)
+
+
+def _day_start(now):
+    return timezone.make_aware(datetime.combine(timezone.localdate(now), time.min))
+
+
+def due_profiles(now=None):
+    """من يريد البريد (email_notifications) وله بريد ولم يصله ملخص اليوم."""
+    now = now or timezone.now()
+    return Profile.objects.filter(
+        Q(email_digest_sent_at__isnull=True) | Q(email_digest_sent_at__lt=_day_start(now)),
+        email_notifications=True, user__is_active=True,
+    ).exclude(user__email="")
+
+
+def build_digests(profiles, now=None):
+    """
+    ملخصات دفعة من البروفايلات بعدد ثابت من الاستعلامات مهما كان حجمها (واحد لكل
+    جدول) بدل استعلامات لكل بروفايل. النافذة من آخر ملخص، بحد أقصى DIGEST_WINDOW.
+    يعيد [Digest] بنفس ترتيب profiles (الفارغ منها أيضًا).
+    """
+    now = now or timezone.now()
+    floor = now - DIGEST_WINDOW
+    digests = {p.pk: Digest(p, since=max(p.email_digest_sent_at or floor, floor), until=now) for p in profiles}
+    if not digests:
+        return []
+    earliest = min(d.since for d in digests.values())
+    by_halaqa = defaultdict(list)
+    for d in digests.values():
+        if d.profile.halaqa_id:
+            by_halaqa[d.profile.halaqa_id].append(d)
+
+    def unread(d, created_at):
+        read_at = d.profile.notifications_read_at
+        return d.since <= created_at < d.until and (read_at is None or created_at > read_at)
+
+    for n in Notification.objects.filter(
+        recipient_id__in=digests, is_read=False, created_at__gte=earliest, created_at__lt=now,
+    ).order_by("created_at", "id"):
+        d = digests[n.recipient_id]
+        if unread(d, n.created_at):
+            d.notifications.append(n)
+
+    broadcasts = list(Broadcast.objects.filter(
+        halaqa_id__in=by_halaqa, created_at__gte=earliest, created_at__lt=now,
+    ).order_by("created_at", "id"))
+    receipts = set(BroadcastReceipt.objects.filter(
+        broadcast__in=broadcasts, recipient_id__in=digests,
+    ).values_list("broadcast_id", "recipient_id"))
+    for b in broadcasts:
+        for d in by_halaqa[b.halaqa_id]:
+            if (unread(d, b.created_at) and b.created_at >= d.profile.user.date_joined
+                    and (b.pk, d.profile.pk) not in receipts):
+                d.notifications.append(b)
+
+    for kind, (task_model, sub_model) in TASK_KINDS.items():
+        for task in task_model.objects.filter(
+            halaqa_id__in=by_halaqa, created_at__gte=earliest, created_at__lt=now,
+        ).select_related("surah", "halaqa").order_by("created_at", "id"):
+            for d in by_halaqa[task.halaqa_id]:
+                if d.since <= task.created_at:
+                    d.tasks.append(task)
+        # updated_at = وقت التصحيح (انظر archive_candidates)
+        for sub in sub_model.objects.filter(
+            student_id__in=digests, status="graded", updated_at__gte=earliest, updated_at__lt=now,
+        ).select_related(f"{kind}__surah", f"{kind}__halaqa").order_by("updated_at", "id"):
+            d = digests[sub.student_id]
+            if d.since <= sub.updated_at:
+                sub.task = getattr(sub, kind)
+                d.grades.append(sub)
+
+    for d in digests.values():
+        d.notifications.sort(key=lambda n: n.created_at)
+        d.tasks.sort(key=lambda t: t.created_at)
+        d.grades.sort(key=lambda s: s.updated_at)
+    return [digests[p.pk] for p in profiles]
+
+
+def render_digest(digest, connection=None):
+    """رسالة بريد واحدة (نص + HTML) من قالبي emails/notification_digest."""
+    user = digest.profile.user
+    site_url = settings.SITE_URL.rstrip("/")
+    prefix = "teacher_" if digest.profile.role == Profile.ROLE_TEACHER else "student_"
+    context = {
+        "digest": digest,
+        "name": user.get_full_name() or user.username,
+        "dashboard_url": site_url + reverse(f"accounts:{prefix}dashboard"),
+        "settings_url": site_url + reverse(f"accounts:{prefix}settings"),
+    }
+    message = EmailMultiAlternatives(
+        subject=render_to_string("emails/notification_digest_subject.txt", context).strip(),
+        body=render_to_string("emails/notification_digest.txt", context),
+        to=[user.email],
+        connection=connection,
+    )
+    message.attach_alternative(render_to_string("emails/notification_digest.html", context), "text/html")
+    return message
+
+
+def send_digests(batch_size=None, now=None, connection=None):
+    """
+    يرسل ملخص اليوم لكل من يستحقه على دفعات عبر اتصال SMTP واحد مفتوح طوال
+    التشغيل. من ليس عنده جديد لا تصله رسالة لكن تتقدم نافذته. من فشل إرساله
+    لا تتقدم نافذته فيُعاد في التشغيل التالي. يعيد (المرسلة، الفارغة، رسائل الأخطاء).
+    """
+    batch_size = batch_size or settings.DIGEST_BATCH_SIZE
+    now = now or timezone.now()
+    connection = connection or get_connection()
+    sent, empty, errors = 0, 0, []
+    last_pk = 0
+
+    with connection:
+        while True:
+            profiles = list(
+                due_profiles(now).filter(pk__gt=last_pk).select_related("user").order_by("pk")[:batch_size]
+            )
+            if not profiles:
+                break
+            last_pk = profiles[-1].pk
+            done = []
+            for digest in build_digests(profiles, now):
+                if not digest:
+                    empty += 1
+                    done.append(digest.profile.pk)
+                    continue
+                try:
+                    render_digest(digest, connection).send()
+                except (smtplib.SMTPException, OSError) as e:
+                    errors.append(f"{digest.profile.user.email}: {e}")
+                    continue
+                sent += 1
+                done.append(digest.profile.pk)
+            Profile.objects.filter(pk__in=done).update(email_digest_sent_at=now)
+    return sent, empty, errors
@@ -0,0 +1,146 @@
+# apps/accounts/events.py
+import itertools
+import json
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Q
+from django.utils.module_loading import import_string
+
+from .models import Event
+
+EVENT_TASK_CREATED = "task_created"
+EVENT_SUBMISSION_RECEIVED = "submission_received"
+EVENT_GRADED = "graded"
+EVENT_NOTIFICATION = "notification"
+
+EVENT_BATCH_SIZE = 100
+MEMORY_BUS_SIZE = 1000
+
+
+class DatabaseEventBus:
+    """
+    الأحداث في جدول Event: تعمل مع أكثر من عملية (gunicorn/run_worker) على نفس
+    قاعدة البيانات. كل اتصال SSE يستطلع الجدول بمؤشر id على فهرس (profile/halaqa, id).
+    """
+
+    def publish(self, events):
+        Event.objects.bulk_create(
+            [Event(profile_id=e["profile_id"], halaqa_id=e["halaqa_id"], kind=e["kind"], data=e["data"])
+             for e in events]
+        )
+
+    def _visible(self, profile):
+        target = Q(profile_id=profile.pk)
+        if profile.halaqa_id:
+            target |= Q(halaqa_id=profile.halaqa_id)
+        return Event.objects.filter(target)
+
+    def last_id(self, profile):
+        return self._visible(profile).aggregate(last=Max("id"))["last"] or 0
+
+    def read(self, profile, after, limit=EVENT_BATCH_SIZE):
+        """[(id, kind, data)] الأحدث من after بترتيب الإرسال."""
+        return list(
+            self._visible(profile).filter(id__gt=after).order_by("id").values_list("id", "kind", "data")[:limit]
+        )
+
+
+class MemoryEventBus:
+    """
+    الأحداث في ذاكرة العملية (آخر MEMORY_BUS_SIZE حدث): لعملية واحدة فقط
+    (runserver أو التجربة على جهاز واحد)، بلا جدول ولا استعلامات.
+    """
+
+    def __init__(self):
+        self._events = deque(maxlen=MEMORY_BUS_SIZE)
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def publish(self, events):
+        with self._lock:
+            for e in events:
+                self._events.append((next(self._ids), e))
+
+    def _visible(self, profile, event):
+        return event["profile_id"] == profile.pk or (
+            profile.halaqa_id is not None and event["halaqa_id"] == profile.halaqa_id
+        )
+
+    def last_id(self, profile):
+        with self._lock:
+            return self._events[-1][0] if self._events else 0
+
+    def read(self, profile, after, limit=EVENT_BATCH_SIZE):
+        with self._lock:
+            rows = [(pk, e["kind"], e["data"]) for pk, e in self._events
+                    if pk > after and self._visible(profile, e)]
+        return rows[:limit]
+
+
+@lru_cache(maxsize=None)
+def get_bus():
+    return import_string(settings.EVENT_BUS)()
+
+
+def _publish(events):
+    """بعد نجاح الـ transaction الحالي، فلا يصل للمتصفح حدث عن بيانات لم تُحفظ."""
+    if events:
+        transaction.on_commit(lambda: get_bus().publish(events))
+
+
+def publish(kind, data=None, profile_ids=(), halaqa_id=None):
+    """يرسل حدثًا لبروفايلات محددة و/أو لكل طلاب حلقة (صف واحد للحلقة)."""
+    data = data or {}
+    events = [{"profile_id": pk, "halaqa_id": None, "kind": kind, "data": data} for pk in profile_ids]
+    if halaqa_id is not None:
+        events.append({"profile_id": None, "halaqa_id": halaqa_id, "kind": kind, "data": data})
+    _publish(events)
+
+
+def publish_each(kind, items):
+    """حدث مختلف لكل بروفايل: items = [(profile_id, data)]، كتابة واحدة للكل."""
+    _publish([{"profile_id": pk, "halaqa_id": None, "kind": kind, "data": data} for pk, data in items])
+
+
+def sse_message(data, event=None, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    if event:
+        lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, ensure_ascii=False)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def stream(profile, last_id=None):
+    """
+    مولّد رسائل SSE لبروفايل: يستطلع الناقل كل EVENT_POLL_SECONDS ويرسل تعليق
+    keep-alive عند السكون، ثم ينتهي بعد EVENT_STREAM_SECONDS ليحرر عامل الخادم؛
+    EventSource يعيد الاتصال تلقائيًا بـ Last-Event-ID فلا يضيع حدث.
+    """
+    bus = get_bus()
+    if last_id is None:
+        last_id = bus.last_id(profile)
+    # مدة إعادة الاتصال في المتصفح
+    yield f"retry: {settings.EVENT_RETRY_MS}\n\n"
+
+    deadline = time.monotonic() + settings.EVENT_STREAM_SECONDS
+    idle_since = time.monotonic()
+    while time.monotonic() < deadline:
+        rows = bus.read(profile, last_id)
+        for pk, kind, data in rows:
+            last_id = pk
+            yield sse_message(data, event=kind, event_id=pk)
+        if rows:
+            idle_since = time.monotonic()
+            if len(rows) == EVENT_BATCH_SIZE:
+                continue
+        elif time.monotonic() - idle_since >= settings.EVENT_KEEPALIVE_SECONDS:
+            idle_since = time.monotonic()
+            yield ": keep-alive\n\n"
+        time.sleep(settings.EVENT_POLL_SECONDS)
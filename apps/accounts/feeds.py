@@ -0,0 +1,174 @@
+# apps/accounts/feeds.py
+import base64
+import hashlib
+from datetime import datetime, timedelta
+
+from django.db import connection
+from django.db.models import Q, F, Count, Sum, Value, CharField, DurationField, ExpressionWrapper
+from django.utils import timezone
+
+from .models import RecitationSubmission, ReviewSubmission
+
+FEED_PAGE_SIZE = 25
+FEED_STATUSES = ("submitted", "graded", "reviewing")
+
+# نوع التسليم → (الموديل، اسم حقل المهمة)
+FEED_SOURCES = {
+    "recitation": (RecitationSubmission, "recitation"),
+    "review": (ReviewSubmission, "review"),
+}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk, kind):
+    raw = f"{created_at.isoformat()}|{pk}|{kind}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor, kinds=FEED_SOURCES):
+    """يفك المؤشر إلى (created_at, id, kind) أو يرفع InvalidCursor."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, pk, kind = raw.split("|")
+        if kind not in kinds:
+            raise ValueError(kind)
+        return datetime.fromisoformat(created_at), int(pk), kind
+    except (ValueError, UnicodeDecodeError) as e:
+        raise InvalidCursor(cursor) from e
+
+
+def _teacher_submissions(model, task_field, teacher):
+    return model.objects.filter(**{f"{task_field}__halaqa__teachers": teacher})
+
+
+def _after_cursor(qs, kind, cursor):
+    """
+    شرط keyset للترتيب (created_at DESC, id DESC, kind DESC).
+    النوع ثابت داخل كل فرع، فيكفي مقارنته بنوع المؤشر في بايثون.
+    """
+    c_at, c_id, c_kind = cursor
+    cond = Q(created_at__lt=c_at) | Q(created_at=c_at, id__lt=c_id)
+    if kind < c_kind:
+        cond |= Q(created_at=c_at, id=c_id)
+    return qs.filter(cond)
+
+
+def submission_feed_page(teacher, status="all", task_type="all", halaqa_id=None,
+                         cursor=None, page_size=FEED_PAGE_SIZE):
+    """
+    صفحة من تسليمات المعلم (تسميع + مراجعة) مرتبة من الأحدث.
+    الفلترة والترتيب والتقسيم تتم كلها في قاعدة البيانات عبر UNION ALL
+    على (id, created_at, kind) فقط، ثم نجلب كائنات الصفحة نفسها فقط.
+    يعيد (قائمة التسليمات، مؤشر الصفحة التالية أو None).
+    """
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor)
+
+    branches = []
+    for kind, (model, task_field) in FEED_SOURCES.items():
+        if task_type in FEED_SOURCES and task_type != kind:
+            continue
+        qs = _teacher_submissions(model, task_field, teacher)
+        if status in FEED_STATUSES:
+            qs = qs.filter(status=status)
+        if halaqa_id:
+            qs = qs.filter(**{f"{task_field}__halaqa_id": halaqa_id})
+        if cursor:
+            qs = _after_cursor(qs, kind, cursor)
+        qs = qs.values("id", "created_at").annotate(
+            kind=Value(kind, output_field=CharField())
+        ).order_by()
+        if connection.features.supports_slicing_ordering_in_compound:
+            # كل فرع يكفيه أول page_size+1 صف (MySQL/PostgreSQL)
+            qs = qs.order_by("-created_at", "-id")[:page_size + 1]
+        branches.append(qs)
+
+    feed = branches[0]
+    if len(branches) > 1:
+        feed = feed.union(*branches[1:], all=True)
+    rows = list(feed.order_by("-created_at", "-id", "-kind")[:page_size + 1])
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    # جلب كائنات الصفحة فقط، استعلام واحد لكل نوع موجود فيها
+    objects = {}
+    for kind, (model, task_field) in FEED_SOURCES.items():
+        ids = [r["id"] for r in rows if r["kind"] == kind]
+        if not ids:
+            continue
+        for sub in model.objects.filter(id__in=ids).select_related(
+            "student__user", f"{task_field}__halaqa", f"{task_field}__surah"
+        ):
+            sub.type = kind
+            objects[(kind, sub.id)] = sub
+
+    page = [objects[(r["kind"], r["id"])] for r in rows if (r["kind"], r["id"]) in objects]
+    next_cursor = None
+    if has_more and rows:
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"], last["kind"])
+    return page, next_cursor
+
+
+def submission_page_etag(teacher, page, next_cursor, cursor=""):
+    """
+    ETag لصفحة من التسليمات: يتغير لو تغيّر أي تسليم فيها (الحالة/الدرجة/updated_at)
+    أو تغيّرت حدود الصفحة.
+    """
+    h = hashlib.md5(f"{teacher.pk}|{cursor}|{next_cursor}".encode())
+    for sub in page:
+        h.update(f"|{sub.type}:{sub.pk}:{sub.status}:{sub.score}:{sub.updated_at.isoformat()}".encode())
+    return f'W/"{h.hexdigest()}"'
+
+
+def format_grading_time(seconds):
+    if seconds is None:
+        return "N/A"
+    avg_days = int(seconds // 86400)
+    avg_hours = int((seconds % 86400) // 3600)
+    avg_minutes = int((seconds % 3600) // 60)
+    if avg_days > 0:
+        return f"{avg_days} يوم"
+    if avg_hours > 0:
+        return f"{avg_hours} ساعة"
+    return f"{avg_minutes} دقيقة"
+
+
+def submission_counters(teacher, now=None):
+    """
+    عدادات صفحة التسليمات كتجميعات شرطية: استعلام واحد لكل نوع تسليم
+    بدل تحميل كل التسليمات في الذاكرة.
+    """
+    now = now or timezone.now()
+    week_ago = now - timedelta(days=7)
+    graded = Q(status="graded")
+    timed = graded & Q(updated_at__gt=F("created_at"))
+    grading_time = ExpressionWrapper(F("updated_at") - F("created_at"), output_field=DurationField())
+
+    pending = completed = reviewing = timed_count = 0
+    total_time = timedelta(0)
+    for model, task_field in FEED_SOURCES.values():
+        row = _teacher_submissions(model, task_field, teacher).aggregate(
+            pending=Count("id", filter=Q(status="submitted")),
+            completed=Count("id", filter=graded & Q(updated_at__gte=week_ago)),
+            reviewing=Count("id", filter=Q(status="reviewing")),
+            timed_count=Count("id", filter=timed),
+            total_time=Sum(grading_time, filter=timed),
+        )
+        pending += row["pending"]
+        completed += row["completed"]
+        reviewing += row["reviewing"]
+        timed_count += row["timed_count"]
+        total_time += row["total_time"] or timedelta(0)
+
+    avg_seconds = total_time.total_seconds() / timed_count if timed_count else None
+    return {
+        "pending_count": pending,
+        "completed_this_week_count": completed,
+        "needs_resubmission_count": reviewing,
+        "average_grading_time": format_grading_time(avg_seconds),
+    }
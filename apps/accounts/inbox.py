@@ -0,0 +1,169 @@
+# apps/accounts/inbox.py
+import heapq
+import itertools
+from collections import Counter, defaultdict
+
+from django.db.models import BooleanField, CharField, Exists, ExpressionWrapper, F, OuterRef, Q, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .events import EVENT_NOTIFICATION, publish, publish_each
+from .feeds import _after_cursor, decode_cursor, encode_cursor
+from .models import Broadcast, BroadcastReceipt, Notification, Profile
+
+KIND_DIRECT = "direct"
+KIND_BROADCAST = "broadcast"
+INBOX_KINDS = (KIND_DIRECT, KIND_BROADCAST)
+INBOX_FIELDS = ("kind", "id", "title", "message", "created_at", "read")
+INBOX_PAGE_SIZE = 20
+
+
+def _read(condition, profile):
+    """مقروء = الشرط، أو أقدم من آخر "قراءة الكل"."""
+    if profile.notifications_read_at is not None:
+        condition |= Q(created_at__lte=profile.notifications_read_at)
+    return ExpressionWrapper(condition, output_field=BooleanField())
+
+
+def direct_messages(profile):
+    return Notification.objects.filter(recipient=profile).annotate(
+        kind=Value(KIND_DIRECT, output_field=CharField()),
+        read=_read(Q(is_read=True), profile),
+    )
+
+
+def broadcast_messages(profile):
+    """إشعارات حلقة الطالب الجماعية منذ انضمامه للموقع (لا شيء لمن ليس في حلقة)."""
+    receipt = BroadcastReceipt.objects.filter(broadcast=OuterRef("pk"), recipient=profile)
+    return Broadcast.objects.filter(
+        halaqa_id=profile.halaqa_id, created_at__gte=profile.user.date_joined,
+    ).annotate(
+        kind=Value(KIND_BROADCAST, output_field=CharField()),
+        read=_read(Q(Exists(receipt)), profile),
+    )
+
+
+def inbox_page(profile, cursor=None, page_size=INBOX_PAGE_SIZE):
+    """
+    صفحة من الإشعارات المباشرة والجماعية مدموجة (الأحدث أولًا) بترتيب
+    (created_at, id, kind) وتقسيم keyset كما في feeds.py. استعلامان كل منهما مقيّد
+    بـ page_size+1 على فهرسه ثم دمج في الذاكرة؛ UNION مع LIMIT داخله غير مدعوم في SQLite.
+    يعيد (قائمة dicts بحقول INBOX_FIELDS، مؤشر الصفحة التالية أو None).
+    """
+    if isinstance(cursor, str):
+        cursor = decode_cursor(cursor, kinds=INBOX_KINDS)
+
+    ordering = ("-created_at", "-id")
+    parts = []
+    for qs in (direct_messages(profile), broadcast_messages(profile)):
+        kind = KIND_DIRECT if qs.model is Notification else KIND_BROADCAST
+        if cursor:
+            qs = _after_cursor(qs, kind, cursor)
+        rows = qs.order_by(*ordering).values_list(*INBOX_FIELDS)[:page_size + 1]
+        parts.append([dict(zip(INBOX_FIELDS, row)) for row in rows])
+    merged = heapq.merge(
+        *parts, key=lambda row: (row["created_at"], row["id"], row["kind"]), reverse=True,
+    )
+    rows = list(itertools.islice(merged, page_size + 1))
+
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last["created_at"], last["id"], last["kind"])
+    return rows, next_cursor
+
+
+def unread_count(profile):
+    """العدد الفعلي (استعلامان)؛ الشارة تقرأ Profile.unread_notifications بدلًا منه."""
+    return (
+        direct_messages(profile).filter(read=False).count()
+        + broadcast_messages(profile).filter(read=False).count()
+    )
+
+
+def _bump(profile_ids, by=1):
+    return Profile.objects.filter(pk__in=profile_ids).update(
+        unread_notifications=F("unread_notifications") + by
+    )
+
+
+def notify(recipient_id, title, message):
+    """إشعار مباشر واحد + زيادة عدّاد صاحبه."""
+    notification = Notification.objects.create(recipient_id=recipient_id, title=title, message=message)
+    _bump([recipient_id])
+    publish(EVENT_NOTIFICATION, {"kind": KIND_DIRECT, "id": notification.pk, "title": title},
+            profile_ids=[recipient_id])
+    return notification
+
+
+def notify_many(notifications, batch_size=500):
+    """
+    bulk_create لإشعارات مباشرة ثم تحديث العدادات: تحديث واحد لكل عدد مختلف
+    (غالبًا إشعار واحد لكل طالب = تحديث واحد للجميع).
+    """
+    Notification.objects.bulk_create(notifications, batch_size=batch_size)
+    per_count = defaultdict(list)
+    for recipient_id, count in Counter(n.recipient_id for n in notifications).items():
+        per_count[count].append(recipient_id)
+    for count, recipient_ids in per_count.items():
+        _bump(recipient_ids, count)
+    publish_each(EVENT_NOTIFICATION, [
+        (n.recipient_id, {"kind": KIND_DIRECT, "title": n.title}) for n in notifications
+    ])
+    return notifications
+
+
+def broadcast(halaqa_id, title, message, sender=None):
+    """إشعار جماعي: صف Broadcast واحد + تحديث واحد لعدادات طلاب الحلقة."""
+    created = Broadcast.objects.create(halaqa_id=halaqa_id, sender=sender, title=title, message=message)
+    Profile.objects.filter(halaqa_id=halaqa_id).update(unread_notifications=F("unread_notifications") + 1)
+    publish(EVENT_NOTIFICATION, {"kind": KIND_BROADCAST, "id": created.pk, "title": title}, halaqa_id=halaqa_id)
+    return created
+
+
+def _discount(profile, count):
+    if count:
+        Profile.objects.filter(pk=profile.pk).update(
+            unread_notifications=Greatest(F("unread_notifications") - count, 0)
+        )
+        profile.unread_notifications = max(profile.unread_notifications - count, 0)
+    return count
+
+
+def mark_read(profile, direct=(), broadcasts=()):
+    """
+    يعلّم إشعارات محددة كمقروءة: تحديث واحد للمباشرة، وإدخال واحد لإيصالات الجماعية،
+    ثم إنقاص العدّاد بما تغيّر فعلًا. يعيد عدد ما تغيّر.
+    """
+    changed = 0
+    if direct:
+        changed += Notification.objects.filter(
+            recipient=profile, id__in=direct, is_read=False,
+        ).exclude(**(
+            {"created_at__lte": profile.notifications_read_at} if profile.notifications_read_at else {}
+        )).update(is_read=True)
+    if broadcasts:
+        visible = broadcast_messages(profile).filter(id__in=broadcasts, read=False).values_list("id", flat=True)
+        created = BroadcastReceipt.objects.bulk_create(
+            [BroadcastReceipt(broadcast_id=pk, recipient=profile) for pk in visible], ignore_conflicts=True,
+        )
+        changed += len(created)
+    return _discount(profile, changed)
+
+
+def mark_all_read(profile, now=None):
+    """كتابة واحدة مهما كان عدد الإشعارات: تحريك notifications_read_at وتصفير العدّاد."""
+    now = now or timezone.now()
+    Profile.objects.filter(pk=profile.pk).update(notifications_read_at=now, unread_notifications=0)
+    profile.notifications_read_at, profile.unread_notifications = now, 0
+    return now
+
+
+def recount_unread(profile, save=True):
+    """يعيد حساب العدّاد من الجداول (بعد تغيير الحلقة أو حذف إشعارات). يعيد العدد الفعلي."""
+    count = unread_count(profile)
+    if save and count != profile.unread_notifications:
+        Profile.objects.filter(pk=profile.pk).update(unread_notifications=count)
+        profile.unread_notifications = count
+    return count
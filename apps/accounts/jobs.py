@@ -0,0 +1,148 @@
+# apps/accounts/jobs.py
+import os
+import socket
+import traceback
+from datetime import timedelta
+
+from django.db.models import F
+from django.utils import timezone
+
+from .audio import process_submission_audio
+from .inbox import broadcast, notify
+from .models import Job, Halaqa
+from .stats import TASK_KINDS
+
+# تأخير إعادة المحاولة الأولى بالثواني، يتضاعف مع كل محاولة
+JOB_RETRY_DELAY = 30
+# مهمة في حالة running أطول من هذا غالبًا مات الـ worker الذي أخذها
+JOB_LOCK_TIMEOUT = timedelta(minutes=15)
+
+# اسم المهمة → (الدالة، الأولوية الافتراضية، أقصى عدد محاولات)
+JOB_HANDLERS = {}
+
+
+def job(name, priority=Job.PRIORITY_NORMAL, max_attempts=5):
+    """يسجل دالة كمهمة خلفية باسم name (المعاملات تُمرر كـ JSON)."""
+    def register(func):
+        JOB_HANDLERS[name] = (func, priority, max_attempts)
+        return func
+    return register
+
+
+def enqueue(name, payload=None, priority=None, delay=None):
+    """
+    يضيف مهمة للطابور. داخل معاملة لا تظهر للـ worker إلا بعد الـ commit،
+    فلا يمكن أن يسبق تنفيذها حفظ البيانات التي تعتمد عليها.
+    """
+    if name not in JOB_HANDLERS:
+        raise LookupError(f"Unknown job '{name}'")
+    _, default_priority, max_attempts = JOB_HANDLERS[name]
+    return Job.objects.create(
+        name=name,
+        payload=payload or {},
+        priority=default_priority if priority is None else priority,
+        max_attempts=max_attempts,
+        run_at=timezone.now() + (delay or timedelta(0)),
+    )
+
+
+def worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"[:100]
+
+
+def claim_next_job(worker, now=None):
+    """
+    يحجز أعلى مهمة مستحقة بتحديث مشروط (status=queued) بدل SELECT ... FOR UPDATE،
+    فيعمل نفس الكود على SQLite و MySQL مع أكثر من worker.
+    """
+    now = now or timezone.now()
+    candidates = Job.objects.filter(
+        status=Job.STATUS_QUEUED, run_at__lte=now
+    ).order_by("priority", "run_at", "id").values_list("id", flat=True)[:10]
+    for job_id in candidates:
+        claimed = Job.objects.filter(pk=job_id, status=Job.STATUS_QUEUED).update(
+            status=Job.STATUS_RUNNING, locked_by=worker, locked_at=now, attempts=F("attempts") + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_job(job_obj):
+    """
+    ينفذ مهمة محجوزة. الدالة تدير معاملاتها بنفسها (التحويل الصوتي مثلًا
+    لا يصح أن يحجز قاعدة البيانات طوال تشغيل ffmpeg). يعيد True عند النجاح.
+    """
+    handler = JOB_HANDLERS.get(job_obj.name)
+    row = Job.objects.filter(pk=job_obj.pk)
+    try:
+        if handler is None:
+            raise LookupError(f"Unknown job '{job_obj.name}'")
+        handler[0](**job_obj.payload)
+    except Exception:
+        error = traceback.format_exc(limit=5)
+        now = timezone.now()
+        if handler is not None and job_obj.attempts < job_obj.max_attempts:
+            delay = timedelta(seconds=JOB_RETRY_DELAY * 2 ** (job_obj.attempts - 1))
+            row.update(status=Job.STATUS_QUEUED, run_at=now + delay, locked_by="", locked_at=None, last_error=error)
+        else:
+            row.update(status=Job.STATUS_FAILED, finished_at=now, last_error=error)
+        return False
+    row.update(status=Job.STATUS_DONE, finished_at=timezone.now(), last_error="")
+    return True
+
+
+def requeue_stale_jobs(now=None, timeout=JOB_LOCK_TIMEOUT):
+    """يعيد المهام العالقة في running (worker توقف فجأة) إلى الطابور."""
+    now = now or timezone.now()
+    return Job.objects.filter(status=Job.STATUS_RUNNING, locked_at__lt=now - timeout).update(
+        status=Job.STATUS_QUEUED, run_at=now, locked_by="", locked_at=None,
+    )
+
+
+def purge_finished_jobs(older_than, now=None):
+    """حذف المهام المنتهية بنجاح الأقدم من older_than (الفاشلة تبقى للمراجعة)."""
+    now = now or timezone.now()
+    deleted, _ = Job.objects.filter(status=Job.STATUS_DONE, finished_at__lt=now - older_than).delete()
+    return deleted
+
+
+# ========= المهام المسجلة =========
+
+@job("transcode_submission", max_attempts=3)
+def transcode_submission(kind, submission_id):
+    """تحويل تسجيل التسليم إلى Opus (انظر audio.py)."""
+    _, sub_model = TASK_KINDS[kind]
+    # failed مقبولة هنا حتى تعيد محاولات المهمة التحويل فعلًا
+    submission = sub_model.objects.filter(
+        pk=submission_id, audio_status__in=[sub_model.AUDIO_PENDING, sub_model.AUDIO_FAILED]
+    ).exclude(audio="").first()
+    if submission is not None:  # حُذف التسليم أو سبقنا process_recordings
+        process_submission_audio(submission)
+
+
+@job("notify_submission_graded")
+def notify_submission_graded(kind, submission_id):
+    """إشعار الطالب بنتيجة التصحيح (لو مفعّل إشعارات التطبيق)."""
+    _, sub_model = TASK_KINDS[kind]
+    submission = sub_model.objects.filter(
+        pk=submission_id, status="graded", student__app_notifications=True
+    ).select_related(f"{kind}__surah", f"{kind}__halaqa").first()
+    if submission is None:
+        return
+    task = getattr(submission, kind)
+    notify(
+        submission.student_id,
+        title="تم تصحيح تسليمك",
+        message=f"{task}: الدرجة {submission.score:g} من 10" + (f" — {submission.notes}" if submission.notes else ""),
+    )
+
+
+@job("notify_halaqa", priority=Job.PRIORITY_HIGH)
+def notify_halaqa(halaqa_id, title, message):
+    """
+    إشعار جماعي لطلاب الحلقة. صار صفًا واحدًا (Broadcast) يُنشأ مباشرة في
+    send_halaqa_notification؛ المهمة باقية للمهام التي أُضيفت للطابور قبل ذلك.
+    """
+    if Halaqa.objects.filter(pk=halaqa_id).exists():
+        broadcast(halaqa_id, title, message)
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.archive import (
+    ARCHIVE_BATCH_SIZE, archive_candidates, archive_due_recordings, archive_storage, orphaned_archives,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move graded recordings older than their halaqa's retention period to the archive storage, "
+        "keeping a short preview in the main storage (run daily from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=ARCHIVE_BATCH_SIZE,
+            help="Maximum recordings to archive in this run.",
+        )
+        parser.add_argument("--halaqa", type=int, help="Only archive recordings of this halaqa.")
+        parser.add_argument(
+            "--purge-orphans", action="store_true",
+            help="Also delete archived files that no submission references any more.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be archived.")
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = sum(qs.count() for _, qs in archive_candidates(halaqa_id=opts["halaqa"]))
+            self.stdout.write(self.style.WARNING(f"{count} recordings are due for archiving."))
+            if opts["purge_orphans"]:
+                self.stdout.write(self.style.WARNING(f"{len(orphaned_archives())} orphaned archive files."))
+            return
+
+        archived, errors = archive_due_recordings(opts["batch_size"], opts["halaqa"])
+        for error in errors:
+            self.stdout.write(self.style.ERROR(error))
+
+        if opts["purge_orphans"]:
+            storage = archive_storage()
+            orphans = orphaned_archives()
+            for name in orphans:
+                storage.delete(name)
+            self.stdout.write(f"Deleted {len(orphans)} orphaned archive files.")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. Archived {archived} recordings, {len(errors)} failed."))
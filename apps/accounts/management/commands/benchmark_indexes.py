@@ -0,0 +1,105 @@
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.utils import timezone
+from apps.accounts.models import (
+    Profile, Halaqa, Recitation, Review, RecitationSubmission, ReviewSubmission,
+    Attendance, Notification,
+)
+from apps.accounts.stats import GRADED, with_halaqa_stats
+
+# الموديلات التي تحمل فهارس الاستعلامات الساخنة (تُحذف مؤقتًا مع --compare)
+INDEXED_MODELS = (Recitation, Review, RecitationSubmission, ReviewSubmission, Notification)
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Print query plans and timings for the hot submission/task/notification lookups. "
+        "With --compare, also measure them without the composite indexes (in a rolled-back transaction)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query (median is reported).")
+        parser.add_argument(
+            "--compare", action="store_true",
+            help="Also run every query with the indexes dropped inside a transaction that is rolled back.",
+        )
+        parser.add_argument("--no-plans", action="store_true", help="Only print timings.")
+
+    def _hot_queries(self):
+        # أكبر حلقة (بعدد الطلاب) ومعلمها وأحد طلابها: أسوأ حالة واقعية
+        halaqa = Halaqa.objects.filter(teachers__isnull=False).annotate(
+            n=Count("students", distinct=True)
+        ).filter(n__gt=0).order_by("-n", "id").first()
+        if halaqa is None:
+            raise CommandError("Need a halaqa with a teacher and students (see seed_load_dataset).")
+        teacher = halaqa.teachers.order_by("id").first()
+        student = halaqa.students.filter(role=Profile.ROLE_STUDENT).select_related("user").order_by("id").first()
+        today = timezone.localdate()
+        return [
+            ("student graded submissions", lambda: RecitationSubmission.objects.filter(GRADED, student=student)),
+            ("teacher inbox (pending, newest 25)", lambda: RecitationSubmission.objects.filter(
+                recitation__halaqa__teachers=teacher, status="submitted").order_by("-created_at", "-id")[:25]),
+            ("teacher inbox (all, newest 25)", lambda: ReviewSubmission.objects.filter(
+                review__halaqa__teachers=teacher).order_by("-created_at", "-id")[:25]),
+            ("halaqa pending per task", lambda: RecitationSubmission.objects.filter(
+                recitation__halaqa=halaqa, status="submitted")),
+            ("halaqa recent recitations", lambda: Recitation.objects.filter(halaqa=halaqa).order_by("-created_at")[:30]),
+            ("student tasks since join", lambda: Review.objects.filter(
+                halaqa=halaqa, created_at__gte=student.user.date_joined)),
+            ("student week attendance", lambda: Attendance.objects.filter(
+                student=student, date__range=(today - timedelta(days=6), today))),
+            ("unread notifications", lambda: Notification.objects.filter(
+                recipient=student, is_read=False).order_by("-created_at")[:20]),
+            ("teacher halaqat stats", lambda: with_halaqa_stats(Halaqa.objects.filter(teachers=teacher))),
+        ]
+
+    def _measure(self, queries, repeat, show_plans, label):
+        self.stdout.write(self.style.MIGRATE_HEADING(f"== {label} =="))
+        results = {}
+        for name, make_qs in queries:
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                list(make_qs())
+                timings.append((time.perf_counter() - start) * 1000)
+            results[name] = statistics.median(timings)
+            self.stdout.write(f"{name:<38} {results[name]:8.3f} ms")
+            if show_plans:
+                for line in make_qs().explain().splitlines():
+                    self.stdout.write(f"    {line}")
+        return results
+
+    def handle(self, *args, **opts):
+        queries = self._hot_queries()
+        show_plans = not opts["no_plans"]
+        after = self._measure(queries, opts["repeat"], show_plans, "with indexes")
+
+        if not opts["compare"]:
+            return
+        if not connection.features.can_rollback_ddl:
+            raise CommandError("--compare drops indexes inside a transaction; this database cannot roll back DDL.")
+
+        try:
+            with transaction.atomic(), connection.cursor() as cursor:
+                for model in INDEXED_MODELS:
+                    for index in model._meta.indexes:
+                        cursor.execute(f"DROP INDEX {connection.ops.quote_name(index.name)}")
+                before = self._measure(queries, opts["repeat"], show_plans, "without indexes")
+                raise _Rollback
+        except _Rollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING("== summary (median ms) =="))
+        for name, _ in queries:
+            speedup = before[name] / after[name] if after[name] else 0
+            self.stdout.write(f"{name:<38} {before[name]:8.3f} -> {after[name]:8.3f}  x{speedup:.1f}")
+        self.stdout.write(self.style.SUCCESS("Indexes restored (transaction rolled back)."))
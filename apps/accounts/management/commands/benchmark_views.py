@@ -0,0 +1,154 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from apps.accounts.models import Profile, Halaqa, RecitationSubmission
+
+# أقصى عدد استعلامات مسموح لكل صفحة. يجب ألا يعتمد على حجم البيانات؛
+# لو تجاوزته صفحة فغالبًا ظهر N+1 جديد.
+QUERY_BUDGETS = {
+    "student_dashboard": 12,
+    "teacher_dashboard": 8,
+    "teacher_submissions": 10,
+    "halaqa_details": 10,
+    "teacher_students": 8,
+    "grade_submission": 14,
+}
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the hot views through the test client against the current (seeded) database and report "
+        "wall time, query count and peak memory per view. Fails when a query budget is exceeded."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=5, help="Requests per view (median time is reported).")
+        parser.add_argument(
+            "--budget", action="append", default=[], metavar="VIEW=N",
+            help="Override a query budget, e.g. --budget teacher_dashboard=6 (can be repeated).",
+        )
+        parser.add_argument("--view", action="append", dest="views", help="Only run these views.")
+        parser.add_argument("--json", action="store_true", help="Print results as JSON.")
+
+    def _budgets(self, overrides):
+        budgets = dict(QUERY_BUDGETS)
+        for item in overrides:
+            name, _, value = item.partition("=")
+            if name not in budgets or not value.isdigit():
+                raise CommandError(f"Invalid --budget '{item}'. Views: {', '.join(budgets)}")
+            budgets[name] = int(value)
+        return budgets
+
+    def _scenarios(self):
+        """(اسم الصفحة، المستخدم، الطلب) على أكبر حلقة في قاعدة البيانات."""
+        halaqa = Halaqa.objects.filter(teachers__isnull=False).annotate(
+            n=Count("students", distinct=True)
+        ).filter(n__gt=0).order_by("-n", "id").first()
+        if halaqa is None:
+            raise CommandError("Need a halaqa with a teacher and students (see seed_load_dataset).")
+        teacher = halaqa.teachers.select_related("user").order_by("id").first()
+        # الطالب صاحب أكبر عدد من التسليمات
+        student = halaqa.students.filter(role=Profile.ROLE_STUDENT).annotate(
+            n=Count("recitation_submissions")
+        ).select_related("user").order_by("-n", "id").first()
+        pending = RecitationSubmission.objects.filter(
+            recitation__halaqa=halaqa, status="submitted"
+        ).order_by("id").first() or RecitationSubmission.objects.filter(recitation__halaqa=halaqa).first()
+
+        scenarios = [
+            ("student_dashboard", student.user, "get", reverse("accounts:student_dashboard"), None),
+            ("teacher_dashboard", teacher.user, "get", reverse("accounts:teacher_dashboard"), None),
+            ("teacher_submissions", teacher.user, "get", reverse("accounts:teacher_submissions") + "?status=all", None),
+            ("halaqa_details", teacher.user, "get", reverse("accounts:halaqa_details", args=[halaqa.id]), None),
+            ("teacher_students", teacher.user, "get", reverse("accounts:teacher_students"), None),
+        ]
+        if pending:
+            scenarios.append((
+                "grade_submission", teacher.user, "post",
+                reverse("accounts:grade_submission", args=["recitation", pending.id]),
+                {"hifdh": 4, "rules": 4, "notes": "benchmark"},
+            ))
+        return scenarios
+
+    def _run_once(self, client, method, url, payload, trace_memory=False):
+        """
+        طلب واحد داخل معاملة تُلغى في النهاية حتى لا يغيّر البنشمارك البيانات.
+        tracemalloc يبطئ التنفيذ كثيرًا، لذلك الذاكرة تُقاس في طلب منفصل عن التوقيت.
+        """
+        result = {}
+        try:
+            with transaction.atomic():
+                if trace_memory:
+                    tracemalloc.start()
+                with CaptureQueriesContext(connection) as queries:
+                    start = time.perf_counter()
+                    if method == "post":
+                        response = client.post(url, json.dumps(payload), content_type="application/json")
+                    else:
+                        response = client.get(url)
+                    result["ms"] = (time.perf_counter() - start) * 1000
+                if trace_memory:
+                    result["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+                    tracemalloc.stop()
+                result["status"] = response.status_code
+                result["queries"] = len(queries)
+                raise _Rollback
+        except _Rollback:
+            pass
+        finally:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+        return result
+
+    def handle(self, *args, **opts):
+        budgets = self._budgets(opts["budget"])
+        setup_test_environment()  # يسمح بـ testserver في ALLOWED_HOSTS
+        scenarios = [s for s in self._scenarios() if not opts["views"] or s[0] in opts["views"]]
+
+        rows, failures = [], []
+        for name, user, method, url, payload in scenarios:
+            client = Client()
+            client.force_login(user)
+            self._run_once(client, method, url, payload)  # تسخين (الجلسة، القوالب)
+            runs = [self._run_once(client, method, url, payload) for _ in range(opts["repeat"])]
+            memory = self._run_once(client, method, url, payload, trace_memory=True)
+
+            row = {
+                "view": name,
+                "status": runs[-1]["status"],
+                "ms": round(statistics.median(r["ms"] for r in runs), 2),
+                "queries": max(r["queries"] for r in runs),
+                "peak_kb": round(memory["peak_kb"], 1),
+                "budget": budgets[name],
+            }
+            rows.append(row)
+            if row["status"] >= 400:
+                failures.append(f"{name}: HTTP {row['status']}")
+            if row["queries"] > row["budget"]:
+                failures.append(f"{name}: {row['queries']} queries > budget {row['budget']}")
+
+        if opts["json"]:
+            self.stdout.write(json.dumps(rows, indent=2))
+        else:
+            self.stdout.write(f"{'view':<22}{'status':>7}{'ms':>10}{'queries':>9}{'budget':>8}{'peak KB':>10}")
+            for r in rows:
+                line = (f"{r['view']:<22}{r['status']:>7}{r['ms']:>10.2f}"
+                        f"{r['queries']:>9}{r['budget']:>8}{r['peak_kb']:>10.1f}")
+                over = r["queries"] > r["budget"] or r["status"] >= 400
+                self.stdout.write(self.style.ERROR(line) if over else line)
+
+        if failures:
+            raise CommandError("Benchmark failed:\n  " + "\n  ".join(failures))
+        self.stdout.write(self.style.SUCCESS(f"All {len(rows)} views within their query budgets."))
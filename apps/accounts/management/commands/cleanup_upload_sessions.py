@@ -0,0 +1,32 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.accounts.models import UploadSession
+from apps.accounts.uploads import discard_parts
+
+
+class Command(BaseCommand):
+    help = "Delete chunked upload sessions (and their stored parts) that were abandoned or already completed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than", type=int, default=24, metavar="HOURS",
+            help="Only sessions not touched for this many hours.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(hours=opts["older_than"])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff)
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{stale.count()} upload sessions would be deleted."))
+            return
+
+        deleted = 0
+        for session in stale.iterator():
+            # الجلسات المكتملة حُذفت أجزاؤها عند الإنهاء، والحذف مرة أخرى لا يضر
+            discard_parts(session)
+            session.delete()
+            deleted += 1
+        self.stdout.write(self.style.SUCCESS(f"Done. Deleted {deleted} upload sessions."))
@@ -0,0 +1,53 @@
+import time
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+from apps.accounts.models import OutboundMessage
+from apps.accounts.outbox import dispatch_batch, get_provider
+
+
+class Command(BaseCommand):
+    help = "Send queued guardian SMS/WhatsApp messages (OutboundMessage) in rate-limited batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.OUTBOX_BATCH_SIZE,
+            help="Messages claimed and sent per batch.",
+        )
+        parser.add_argument(
+            "--rate", type=float, default=settings.OUTBOX_RATE_PER_SECOND,
+            help="Maximum messages per second sent to the provider.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many messages are waiting; do not send.",
+        )
+        parser.add_argument(
+            "--every", type=int, metavar="SECONDS",
+            help="Keep running and send a batch every SECONDS (for hosts without cron).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = OutboundMessage.objects.filter(status=OutboundMessage.STATUS_QUEUED).count()
+            self.stdout.write(self.style.WARNING(f"{count} messages are waiting to be sent."))
+            return
+
+        try:
+            provider = get_provider()
+        except ImproperlyConfigured as e:
+            raise CommandError(f"{e} Messages stay queued.")
+
+        while True:
+            results = dispatch_batch(batch_size=opts["batch_size"], provider=provider, rate=opts["rate"])
+            message = (
+                f"Done. Sent {results[OutboundMessage.STATUS_SENT]}, "
+                f"Retrying {results[OutboundMessage.STATUS_QUEUED]}, "
+                f"Failed {results[OutboundMessage.STATUS_FAILED]}."
+            )
+            style = self.style.ERROR if results[OutboundMessage.STATUS_FAILED] else self.style.SUCCESS
+            self.stdout.write(style(message))
+            if not opts["every"]:
+                return
+            time.sleep(opts["every"])
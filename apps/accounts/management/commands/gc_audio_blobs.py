@@ -0,0 +1,59 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from apps.accounts.blobs import (
+    adopt_legacy_files, collect_garbage, delete_stray_file, recount_references, stray_files,
+)
+
+
+class Command(BaseCommand):
+    help = "Delete content-addressed submission recordings that no submission references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=int, default=24, metavar="HOURS",
+            help="Keep unreferenced blobs (and stray files) for this many hours before deleting them.",
+        )
+        parser.add_argument("--recount", action="store_true", help="Recompute reference counts from submissions first.")
+        parser.add_argument(
+            "--adopt", action="store_true",
+            help="Move recordings stored before content addressing into blobs/ (deduplicating them).",
+        )
+        parser.add_argument(
+            "--strays", action="store_true",
+            help="Also delete files under submissions/ and blobs/ that nothing references.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+
+    def handle(self, *args, **opts):
+        grace = timedelta(hours=opts["grace_hours"])
+        dry_run = opts["dry_run"]
+
+        if opts["adopt"]:
+            if dry_run:
+                self.stdout.write(self.style.WARNING("--adopt is skipped in --dry-run."))
+            else:
+                moved, missing = adopt_legacy_files()
+                self.stdout.write(f"Adopted {moved} recordings into content-addressed storage.")
+                for name in missing:
+                    self.stdout.write(self.style.WARNING(f"Missing file: {name}"))
+
+        if opts["recount"] and not dry_run:
+            self.stdout.write(f"Fixed {recount_references()} reference counts.")
+
+        count, size = collect_garbage(grace, dry_run=dry_run)
+        verb = "would be deleted" if dry_run else "deleted"
+        self.stdout.write(f"{count} unreferenced blobs {verb} ({size / 1024 / 1024:.1f} MB).")
+
+        if opts["strays"]:
+            strays = list(stray_files(grace))
+            for name in strays:
+                self.stdout.write(f"  {name}")
+                if not dry_run:
+                    delete_stray_file(name)
+            self.stdout.write(f"{len(strays)} stray files {verb}.")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING("Dry run, nothing was deleted."))
+        else:
+            self.stdout.write(self.style.SUCCESS("Done."))
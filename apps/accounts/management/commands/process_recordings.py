@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+from apps.accounts.audio import (
+    SUBMISSION_MODELS, TRANSCODE_BATCH_SIZE, TranscodeError,
+    pending_recordings, process_pending_recordings, missing_waveforms, store_waveform,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Transcode pending submission recordings to mono Opus/Ogg and store their duration, size "
+        "and waveform peaks (run from cron)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=TRANSCODE_BATCH_SIZE,
+            help="Recordings per submission type per batch.",
+        )
+        parser.add_argument(
+            "--retry-failed", action="store_true",
+            help="Also retry recordings whose processing failed before (one pass).",
+        )
+        parser.add_argument(
+            "--waveforms", action="store_true",
+            help="Also compute waveform peaks for already processed recordings that have none (one pass).",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many recordings are waiting.")
+        parser.add_argument(
+            "--every", type=int, metavar="SECONDS",
+            help="Keep running and check for new recordings every SECONDS (for hosts without cron).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = sum(pending_recordings(m, opts["retry_failed"]).count() for m in SUBMISSION_MODELS)
+            self.stdout.write(self.style.WARNING(f"{count} recordings are waiting to be processed."))
+            if opts["waveforms"]:
+                count = sum(missing_waveforms(m).count() for m in SUBMISSION_MODELS)
+                self.stdout.write(self.style.WARNING(f"{count} processed recordings have no waveform."))
+            return
+
+        if opts["waveforms"]:
+            self._backfill_waveforms()
+
+        while True:
+            total, failed = 0, 0
+            include_failed = opts["retry_failed"]
+            while True:
+                processed, errors = process_pending_recordings(opts["batch_size"], include_failed)
+                for error in errors:
+                    self.stderr.write(self.style.ERROR(error))
+                total += processed
+                failed += len(errors)
+                # الفاشلة تخرج من الطابور، فالحلقة تنتهي حين لا يبقى شيء معلق
+                if include_failed or not (processed or errors):
+                    break
+            self.stdout.write(self.style.SUCCESS(f"Done. Transcoded {total} recordings, {failed} failed."))
+            if not opts["every"]:
+                return
+            time.sleep(opts["every"])
+
+    def _backfill_waveforms(self):
+        done = failed = 0
+        for model in SUBMISSION_MODELS:
+            for submission in missing_waveforms(model).iterator():
+                try:
+                    done += store_waveform(submission)
+                except TranscodeError as e:
+                    self.stderr.write(self.style.ERROR(str(e)))
+                    failed += 1
+        self.stdout.write(self.style.SUCCESS(f"Waveforms: {done} computed, {failed} failed."))
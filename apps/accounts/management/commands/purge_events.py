@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.accounts.models import Event
+
+
+class Command(BaseCommand):
+    help = "Delete delivered live events (Event rows used by the SSE stream) older than a cutoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--older-than", type=int, default=24, metavar="HOURS",
+            help="Only events created more than this many hours ago.",
+        )
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+
+    def handle(self, *args, **opts):
+        cutoff = timezone.now() - timedelta(hours=opts["older_than"])
+        old = Event.objects.filter(created_at__lt=cutoff)
+        if opts["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"{old.count()} events would be deleted."))
+            return
+        deleted, _ = old.delete()
+        self.stdout.write(self.style.SUCCESS(f"Done. Deleted {deleted} events."))
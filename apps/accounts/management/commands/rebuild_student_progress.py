@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from apps.accounts.models import Profile, StudentProgress
+from apps.accounts.stats import compute_student_progress
+
+
+class Command(BaseCommand):
+    help = "Rebuild StudentProgress rollups from submissions, or report drift with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only compare stored rollups with recomputed values; do not write.",
+        )
+        parser.add_argument(
+            "--student", type=int, action="append", dest="students",
+            help="Limit to a student profile id (can be repeated).",
+        )
+
+    def handle(self, *args, **opts):
+        students = Profile.objects.filter(role=Profile.ROLE_STUDENT)
+        if opts["students"]:
+            students = students.filter(id__in=opts["students"])
+        student_ids = list(students.values_list("id", flat=True))
+
+        expected = compute_student_progress(student_ids)
+        stored = {
+            p.student_id: (p.total_score, p.graded_count, p.ayah_count)
+            for p in StudentProgress.objects.filter(student_id__in=student_ids)
+        }
+
+        # الصف يُنشأ عند أول تسليم مصحح فقط: طالب بلا صف = (0, 0, 0) وليس انحرافًا
+        empty = (0, 0, 0)
+        drift = {sid: vals for sid, vals in expected.items() if stored.get(sid, empty) != vals}
+
+        if opts["verify"]:
+            for sid, vals in drift.items():
+                self.stdout.write(self.style.WARNING(
+                    f"student {sid}: stored={stored.get(sid, empty)} expected={vals}"
+                ))
+            if drift:
+                self.stdout.write(self.style.ERROR(f"{len(drift)} of {len(expected)} rollups drifted."))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"All {len(expected)} rollups are in sync."))
+            return
+
+        to_create = [
+            StudentProgress(student_id=sid, total_score=s, graded_count=g, ayah_count=a)
+            for sid, (s, g, a) in drift.items() if sid not in stored
+        ]
+        now = timezone.now()
+        to_update = [
+            StudentProgress(student_id=sid, total_score=s, graded_count=g, ayah_count=a, updated_at=now)
+            for sid, (s, g, a) in drift.items() if sid in stored
+        ]
+        with transaction.atomic():
+            StudentProgress.objects.bulk_create(to_create, batch_size=500)
+            StudentProgress.objects.bulk_update(
+                to_update, ["total_score", "graded_count", "ayah_count", "updated_at"], batch_size=500
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. Created {len(to_create)}, Updated {len(to_update)}, "
+            f"Unchanged {len(expected) - len(drift)}."
+        ))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from apps.accounts.models import Halaqa
+from apps.accounts.stats import rebuild_task_statuses_for_halaqa
+
+
+class Command(BaseCommand):
+    help = "Rebuild the student x task status matrix (StudentTaskStatus) from tasks and submissions."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--halaqa", type=int, action="append", dest="halaqat",
+            help="Limit to a halaqa id (can be repeated).",
+        )
+
+    def handle(self, *args, **opts):
+        halaqat = Halaqa.objects.order_by("id")
+        if opts["halaqat"]:
+            halaqat = halaqat.filter(id__in=opts["halaqat"])
+
+        total = 0
+        for halaqa in halaqat:
+            with transaction.atomic():
+                created = rebuild_task_statuses_for_halaqa(halaqa.id)
+            total += created
+            self.stdout.write(f"{halaqa.name}: {created} rows")
+
+        self.stdout.write(self.style.SUCCESS(f"Done. {total} rows across {halaqat.count()} halaqat."))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from apps.accounts.inbox import recount_unread
+from apps.accounts.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Recompute the cached unread-notification counters (Profile.unread_notifications), or report drift with --verify."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verify", action="store_true",
+            help="Only compare stored counters with recomputed values; do not write.",
+        )
+        parser.add_argument(
+            "--profile", type=int, action="append", dest="profiles",
+            help="Limit to a profile id (can be repeated).",
+        )
+
+    def handle(self, *args, **opts):
+        profiles = Profile.objects.select_related("user").order_by("id")
+        if opts["profiles"]:
+            profiles = profiles.filter(id__in=opts["profiles"])
+
+        total, drift = 0, 0
+        for profile in profiles.iterator():
+            total += 1
+            stored = profile.unread_notifications
+            expected = recount_unread(profile, save=not opts["verify"])
+            if stored != expected:
+                drift += 1
+                if opts["verify"]:
+                    self.stdout.write(self.style.WARNING(
+                        f"profile {profile.pk}: stored={stored} expected={expected}"
+                    ))
+
+        if opts["verify"]:
+            if drift:
+                self.stdout.write(self.style.ERROR(f"{drift} of {total} counters drifted."))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"All {total} counters are in sync."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Done. Updated {drift}, Unchanged {total - drift}."))
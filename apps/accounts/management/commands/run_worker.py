@@ -0,0 +1,61 @@
+import signal
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.accounts.jobs import (
+    claim_next_job, run_job, requeue_stale_jobs, purge_finished_jobs, worker_id,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Run background jobs from the database queue (submission transcoding, notifications). "
+        "Several workers can run side by side; stop with SIGTERM/Ctrl+C after the current job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every job that is due now, then exit (for cron).")
+        parser.add_argument("--sleep", type=float, default=1.0, help="Seconds to wait when the queue is empty.")
+        parser.add_argument("--max-jobs", type=int, help="Exit after this many jobs (let a supervisor restart it).")
+        parser.add_argument(
+            "--purge-days", type=int, default=7,
+            help="Delete successfully finished jobs older than this many days (checked hourly).",
+        )
+
+    def handle(self, *args, **opts):
+        self._stopping = False
+        signal.signal(signal.SIGTERM, self._stop)
+        worker = worker_id()
+        done = failed = 0
+        next_housekeeping = timezone.now()
+
+        self.stdout.write(f"Worker {worker} started.")
+        try:
+            while not self._stopping:
+                if timezone.now() >= next_housekeeping:
+                    requeue_stale_jobs()
+                    purge_finished_jobs(timedelta(days=opts["purge_days"]))
+                    next_housekeeping = timezone.now() + timedelta(hours=1)
+
+                job = claim_next_job(worker)
+                if job is None:
+                    if opts["once"]:
+                        break
+                    time.sleep(opts["sleep"])
+                    continue
+
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f"{job.name} #{job.pk} failed (attempt {job.attempts}/{job.max_attempts})."))
+                if opts["max_jobs"] and done + failed >= opts["max_jobs"]:
+                    break
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f"Done. {done} jobs succeeded, {failed} failed."))
+
+    def _stop(self, signum, frame):
+        self._stopping = True
@@ -0,0 +1,287 @@
+import io
+import random
+import wave
+from collections import Counter
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from apps.accounts.models import (
+    Profile, Halaqa, Surah,
+    Recitation, Review, RecitationSubmission, ReviewSubmission,
+    Attendance, Notification,
+)
+
+User = get_user_model()
+
+MALE_NAMES = ["أحمد", "محمد", "علي", "خالد", "يوسف", "عبدالله", "عمر", "حمزة", "إبراهيم", "سعد"]
+FEMALE_NAMES = ["فاطمة", "ليلى", "سارة", "نورة", "مريم", "زينب", "هند", "أسماء", "رقية", "خديجة"]
+FAMILY_NAMES = ["الغامدي", "الزهيري", "الجهني", "السالم", "الزهراني", "العساف", "العمري", "القحطاني"]
+NOTIFICATION_TITLES = ["تذكير بالتسليم", "رسالة من المعلم", "تم تصحيح تسميعك", "تنبيه غياب"]
+
+DUMMY_AUDIO_COUNT = 8
+
+
+def _silent_wav(seconds, rate=8000):
+    """ملف WAV صغير صامت (mono 8-bit) لاستخدامه كتسجيل وهمي."""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(1)
+        w.setframerate(rate)
+        w.writeframes(b"\x80" * int(seconds * rate))
+    return buf.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a large synthetic dataset (halaqat, teachers, students, tasks, submissions, attendance, "
+        "notifications) with bulk_create for load and benchmark testing. Deterministic for a given --seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--prefix", default="load", help="Prefix for generated usernames and halaqa names.")
+        parser.add_argument("--halaqat", type=int, default=20)
+        parser.add_argument("--teachers", type=int, default=10)
+        parser.add_argument("--students", type=int, default=1000)
+        parser.add_argument("--tasks", type=int, default=30, help="Recitations and reviews per halaqa (each).")
+        parser.add_argument("--days", type=int, default=120, help="History span for tasks and submissions.")
+        parser.add_argument("--attendance-days", type=int, default=30)
+        parser.add_argument("--notifications", type=int, default=15, help="Average notifications per student.")
+        parser.add_argument("--password", default="load1234", help="Password for every generated account.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **opts):
+        rng = random.Random(opts["seed"])
+        prefix = opts["prefix"]
+        batch = opts["batch_size"]
+        now = timezone.now().replace(minute=0, second=0, microsecond=0)
+        start = now - timedelta(days=opts["days"])
+
+        if User.objects.filter(username__startswith=f"{prefix}_").exists():
+            raise CommandError(f"Users with prefix '{prefix}_' already exist; use another --prefix.")
+        if Halaqa.objects.filter(name__startswith=f"{prefix} حلقة ").exists():
+            raise CommandError(f"Halaqat with prefix '{prefix}' already exist; use another --prefix.")
+        surahs = list(Surah.objects.all())
+        if not surahs:
+            raise CommandError("No surahs found; run load_surahs first.")
+
+        with transaction.atomic():
+            halaqat, teachers, students = self._people(rng, opts, now, start)
+            recitations, reviews = self._tasks(rng, opts, halaqat, teachers, surahs, start, now)
+            audio = self._dummy_audio(prefix)
+            subs = self._submissions(rng, opts, students, recitations, reviews, audio, now)
+            attendance = self._attendance(rng, opts, students, now)
+            notifications = self._notifications(rng, opts, students, now)
+
+        self.stdout.write("Rebuilding rollups...")
+        call_command("rebuild_student_progress", students=[s.id for s in students], stdout=io.StringIO())
+        call_command("rebuild_task_matrix", halaqat=[h.id for h in halaqat], stdout=io.StringIO())
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Done. {len(halaqat)} halaqat, {len(teachers)} teachers, {len(students)} students, "
+            f"{len(recitations) + len(reviews)} tasks, {subs} submissions, {attendance} attendance rows, "
+            f"{notifications} notifications. Password for all accounts: {opts['password']}"
+        ))
+
+    # ---------- الحسابات والحلقات ----------
+
+    def _people(self, rng, opts, now, start):
+        prefix, batch = opts["prefix"], opts["batch_size"]
+        password = make_password(opts["password"])  # تجزئة واحدة لكل الحسابات
+
+        Halaqa.objects.bulk_create(
+            [Halaqa(name=f"{prefix} حلقة {i + 1}") for i in range(opts["halaqat"])], batch_size=batch
+        )
+        halaqat = list(Halaqa.objects.filter(name__startswith=f"{prefix} حلقة ").order_by("id"))
+
+        users = []
+        for i in range(opts["teachers"]):
+            users.append(User(username=f"{prefix}_teacher_{i + 1}", password=password, is_active=True,
+                              first_name=rng.choice(MALE_NAMES), last_name=rng.choice(FAMILY_NAMES),
+                              date_joined=start))
+        for i in range(opts["students"]):
+            is_male = rng.random() < 0.5
+            # معظم الطلاب انضموا في بداية الفترة، والباقي على مدارها
+            joined = start + (now - start) * (rng.random() ** 3)
+            users.append(User(username=f"{prefix}_student_{i + 1}", password=password, is_active=True,
+                              first_name=rng.choice(MALE_NAMES if is_male else FEMALE_NAMES),
+                              last_name=rng.choice(FAMILY_NAMES), email=f"{prefix}_student_{i + 1}@example.com",
+                              date_joined=joined))
+        User.objects.bulk_create(users, batch_size=batch)
+        # bulk_create لا يعيد المفاتيح على كل القواعد، فنعيد القراءة بالترتيب
+        users = list(User.objects.filter(username__startswith=f"{prefix}_").order_by("id"))
+        teacher_users = [u for u in users if u.username.startswith(f"{prefix}_teacher_")]
+        student_users = [u for u in users if u.username.startswith(f"{prefix}_student_")]
+
+        # أحجام حلقات غير متساوية (بعضها كبير وبعضها صغير)
+        weights = [rng.uniform(0.3, 1.0) ** 2 for _ in halaqat]
+        profiles = [
+            Profile(user=u, role=Profile.ROLE_TEACHER, teacher_status=Profile.TEACHER_APPROVED,
+                    gender=Profile.GENDER_MALE)
+            for u in teacher_users
+        ] + [
+            Profile(user=u, role=Profile.ROLE_STUDENT, teacher_status=Profile.TEACHER_APPROVED,
+                    gender=Profile.GENDER_MALE if u.first_name in MALE_NAMES else Profile.GENDER_FEMALE,
+                    halaqa=rng.choices(halaqat, weights)[0],
+                    app_notifications=rng.random() < 0.9, email_notifications=rng.random() < 0.6)
+            for u in student_users
+        ]
+        Profile.objects.bulk_create(profiles, batch_size=batch)
+        profiles = {p.user_id: p for p in Profile.objects.filter(user__in=users).select_related("user")}
+        teachers = [profiles[u.id] for u in teacher_users]
+        students = [profiles[u.id] for u in student_users]
+
+        # كل حلقة لها معلم أو اثنان
+        through = Halaqa.teachers.through
+        links = set()
+        for i, h in enumerate(halaqat):
+            links.add((h.id, teachers[i % len(teachers)].id))
+            if rng.random() < 0.3:
+                links.add((h.id, rng.choice(teachers).id))
+        through.objects.bulk_create(
+            [through(halaqa_id=h, profile_id=t) for h, t in sorted(links)], batch_size=batch
+        )
+        return halaqat, teachers, students
+
+    # ---------- المهام ----------
+
+    def _tasks(self, rng, opts, halaqat, teachers, surahs, start, now):
+        batch = opts["batch_size"]
+        teachers_of = {}
+        for h_id, t_id in Halaqa.teachers.through.objects.filter(
+            halaqa__in=halaqat
+        ).values_list("halaqa_id", "profile_id"):
+            teachers_of.setdefault(h_id, []).append(t_id)
+
+        result = []
+        for model in (Recitation, Review):
+            tasks, created = [], []
+            for h in halaqat:
+                for _ in range(opts["tasks"]):
+                    at = start + (now - start) * rng.random()
+                    first = rng.randint(1, 200)
+                    tasks.append(model(
+                        halaqa=h, created_by_id=rng.choice(teachers_of[h.id]), surah=rng.choice(surahs),
+                        start_ayah=first, end_ayah=first + rng.randint(2, 15),
+                        # بعض المهام بلا موعد نهائي
+                        deadline=at + timedelta(days=rng.randint(1, 7)) if rng.random() < 0.85 else None,
+                    ))
+                    created.append(at)
+            model.objects.bulk_create(tasks, batch_size=batch)
+            # created_at هو auto_now_add فلا يمكن ضبطه في bulk_create نفسه
+            result.append(_backdate(model.objects.filter(halaqa__in=halaqat), "created_at", created, batch))
+        return result
+
+    # ---------- التسليمات ----------
+
+    def _dummy_audio(self, prefix):
+        names = []
+        for i in range(DUMMY_AUDIO_COUNT):
+            names.append(default_storage.save(
+                f"submissions/{prefix}_dummy_{i + 1}.wav", ContentFile(_silent_wav(1 + i % 4))
+            ))
+        return names
+
+    def _submissions(self, rng, opts, students, recitations, reviews, audio, now):
+        batch = opts["batch_size"]
+        # "اجتهاد" و"مستوى" ثابتان لكل طالب حتى تكون التوزيعات واقعية
+        diligence = {s.id: rng.betavariate(5, 2) for s in students}
+        skill = {s.id: rng.uniform(2.0, 5.0) for s in students}
+        by_halaqa = {}
+        for s in students:
+            by_halaqa.setdefault(s.halaqa_id, []).append(s)
+
+        total = 0
+        for model, fk, tasks in (
+            (RecitationSubmission, "recitation", recitations),
+            (ReviewSubmission, "review", reviews),
+        ):
+            subs, timestamps = [], []
+            for task in tasks:
+                for s in by_halaqa.get(task.halaqa_id, []):
+                    if s.user.date_joined > task.created_at or rng.random() > diligence[s.id]:
+                        continue
+                    submitted = task.created_at + timedelta(hours=rng.uniform(1, 24 * 8))
+                    if submitted > now:
+                        continue
+                    sub = model(**{fk: task}, student=s, audio=rng.choice(audio), created_at=submitted)
+                    graded_at = submitted + timedelta(hours=rng.expovariate(1 / 20))
+                    roll = rng.random()
+                    if graded_at >= now or roll >= 0.85:
+                        # لم يصحح بعد (التسليمات الحديثة غالبًا)
+                        sub.status, graded_at = "submitted", submitted
+                    elif roll < 0.8:
+                        sub.status = "graded"
+                        sub.hifdh = max(0, min(5, round(rng.gauss(skill[s.id], 1))))
+                        sub.rules = max(0, min(5, round(rng.gauss(skill[s.id], 1))))
+                        sub.score = sub.hifdh + sub.rules
+                        sub.notes = "أحسنت، استمر" if sub.score >= 8 else None
+                    else:
+                        sub.status = "reviewing"
+                    subs.append(sub)
+                    timestamps.append(graded_at)
+            model.objects.bulk_create(subs, batch_size=batch)
+            # updated_at هو auto_now: نضبطه بعد الإنشاء ليعكس وقت التصحيح
+            _backdate(model.objects.filter(**{f"{fk}__in": tasks}), "updated_at", timestamps, batch)
+            total += len(subs)
+        return total
+
+    # ---------- الحضور والإشعارات ----------
+
+    def _attendance(self, rng, opts, students, now):
+        today = timezone.localdate(now)
+        rows = []
+        for s in students:
+            absent_rate = rng.uniform(0.02, 0.2)
+            for d in range(opts["attendance_days"]):
+                day = today - timedelta(days=d)
+                if day < s.user.date_joined.date():
+                    break
+                roll = rng.random()
+                status = "absent" if roll < absent_rate else "late" if roll < absent_rate + 0.07 else "present"
+                rows.append(Attendance(student=s, date=day, status=status))
+        Attendance.objects.bulk_create(rows, batch_size=opts["batch_size"])
+        return len(rows)
+
+    def _notifications(self, rng, opts, students, now):
+        rows, created = [], []
+        for s in students:
+            count = int(rng.expovariate(1 / opts["notifications"])) if opts["notifications"] else 0
+            joined = s.user.date_joined
+            for i in range(count):
+                rows.append(Notification(
+                    recipient=s, title=rng.choice(NOTIFICATION_TITLES),
+                    message="رسالة تجريبية لاختبار الأداء.",
+                    # الإشعارات القديمة غالبًا مقروءة
+                    is_read=i < count - 3 and rng.random() < 0.9,
+                ))
+                created.append(joined + (now - joined) * (i + rng.random()) / count)
+        Notification.objects.bulk_create(rows, batch_size=opts["batch_size"])
+        _backdate(Notification.objects.filter(recipient__in=students), "created_at", created, opts["batch_size"])
+        # عدّاد الشارة (bulk_create لا يمر بـ inbox.notify_many)
+        unread = Counter(n.recipient_id for n in rows if not n.is_read)
+        for s in students:
+            s.unread_notifications = unread[s.pk]
+        Profile.objects.bulk_update(students, ["unread_notifications"], batch_size=opts["batch_size"])
+        return len(rows)
+
+
+
+def _backdate(qs, field, values, batch_size):
+    """
+    يضبط حقل تاريخ (auto_now/auto_now_add) للصفوف المنشأة للتو بنفس ترتيب إنشائها.
+    نعيد القراءة بالمفتاح لأن bulk_create لا يعيد المفاتيح على كل القواعد (MySQL).
+    """
+    objs = list(qs.order_by("id"))
+    for obj, value in zip(objs, values):
+        setattr(obj, field, value)
+    qs.model.objects.bulk_update(objs, [field], batch_size=batch_size)
+    return objs
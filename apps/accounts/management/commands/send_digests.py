@@ -0,0 +1,41 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from apps.accounts.digest import due_profiles, send_digests
+
+
+class Command(BaseCommand):
+    help = "Email each user who enabled email notifications one daily digest of new tasks, grades and unread notifications."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=settings.DIGEST_BATCH_SIZE,
+            help="Profiles loaded and emailed per batch.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many users are due a digest; do not send.",
+        )
+        parser.add_argument(
+            "--every", type=int, metavar="SECONDS",
+            help="Keep running and send due digests every SECONDS (for hosts without cron).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = due_profiles().count()
+            self.stdout.write(self.style.WARNING(f"{count} users are due today's digest."))
+            return
+
+        while True:
+            sent, empty, errors = send_digests(batch_size=opts["batch_size"])
+            for error in errors:
+                self.stdout.write(self.style.ERROR(error))
+            style = self.style.ERROR if errors else self.style.SUCCESS
+            self.stdout.write(style(
+                f"Done. Sent {sent} digests, {empty} users had nothing new, {len(errors)} failed."
+            ))
+            if not opts["every"]:
+                return
+            time.sleep(opts["every"])
@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from apps.accounts.deadlines import SWEEP_BATCH_SIZE, overdue_task_statuses, sweep_overdue_tasks
+
+
+class Command(BaseCommand):
+    help = "Mark tasks whose deadline has passed as late and notify students (run from cron)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=SWEEP_BATCH_SIZE,
+            help="Rows marked and notified per batch.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Only report how many tasks are overdue; do not write.",
+        )
+        parser.add_argument(
+            "--every", type=int, metavar="SECONDS",
+            help="Keep running and sweep every SECONDS (for hosts without cron).",
+        )
+
+    def handle(self, *args, **opts):
+        if opts["dry_run"]:
+            count = overdue_task_statuses().count()
+            self.stdout.write(self.style.WARNING(f"{count} overdue task rows would be marked late."))
+            return
+
+        while True:
+            marked = sweep_overdue_tasks(timezone.now(), batch_size=opts["batch_size"])
+            self.stdout.write(self.style.SUCCESS(f"Done. Marked {marked} task rows late."))
+            if not opts["every"]:
+                return
+            time.sleep(opts["every"])
@@ -0,0 +1,136 @@
+# apps/accounts/media.py
+import posixpath
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe
+
+MEDIA_STREAM_CHUNK = 64 * 1024
+# الملفات لا تتغير بعد حفظها (كل رفع أو تحويل له اسم جديد)، فالكاش الخاص آمن
+MEDIA_MAX_AGE = 24 * 3600
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# mimetypes يعتبر .webm فيديو؛ التسجيلات كلها صوت
+AUDIO_CONTENT_TYPES = {
+    ".ogg": "audio/ogg",
+    ".opus": "audio/ogg",
+    ".webm": "audio/webm",
+    ".wav": "audio/wav",
+    ".mp3": "audio/mpeg",
+    ".m4a": "audio/mp4",
+}
+
+
+def audio_content_type(name):
+    return AUDIO_CONTENT_TYPES.get(posixpath.splitext(name)[1].lower(), "application/octet-stream")
+
+
+def parse_range(header, size):
+    """
+    يحوّل ترويسة Range إلى (start, end) شاملة، أو None لو غير موجودة/غير مدعومة
+    (عدة نطاقات مثلًا فنرسل الملف كاملًا)، أو يرفع ValueError لو النطاق خارج الملف.
+    """
+    match = _RANGE_RE.match((header or "").strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:  # آخر N بايت
+        length = int(last)
+        if length == 0:
+            raise ValueError(header)
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _range_is_fresh(request, etag, last_modified):
+    """If-Range: النطاق يُحترم فقط لو الملف لم يتغير منذ النسخة التي لدى المتصفح."""
+    if_range = request.headers.get("If-Range")
+    if not if_range:
+        return True
+    if if_range.startswith('"'):
+        return if_range == etag
+    since = parse_http_date_safe(if_range)
+    return since is not None and int(last_modified) <= since
+
+
+def _stream(storage, name, start, length):
+    with storage.open(name, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(MEDIA_STREAM_CHUNK, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+def _offload(response, storage, name):
+    """
+    تسليم الإرسال الفعلي للسيرفر الأمامي إن كان مفعّلًا في الإعدادات
+    (Apache mod_xsendfile أو nginx internal location). يعيد False لو غير ممكن.
+    """
+    backend = getattr(settings, "MEDIA_SENDFILE", "")
+    if backend == "x-accel-redirect":
+        prefix = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+        response["X-Accel-Redirect"] = prefix.rstrip("/") + "/" + quote(name)
+        return True
+    if backend == "x-sendfile":
+        try:
+            response["X-Sendfile"] = storage.path(name)
+        except NotImplementedError:  # تخزين بعيد بدون مسار محلي
+            return False
+        return True
+    return False
+
+
+def serve_media(request, storage, name, content_type="application/octet-stream"):
+    """
+    يرسل ملفًا من التخزين بعد التحقق من الصلاحيات في الـ view:
+    ETag/Last-Modified مع 304، ونطاقات البايت (206/416) للتنقل داخل التسجيل
+    بدون إعادة تنزيله، أو X-Sendfile/X-Accel-Redirect لو كان مفعّلًا.
+    """
+    size = storage.size(name)
+    last_modified = storage.get_modified_time(name).timestamp()
+    etag = f'"{int(last_modified * 1000):x}-{size:x}"'
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+    if not_modified is not None:
+        return not_modified
+
+    offloaded = HttpResponse(content_type=content_type)
+    if _offload(offloaded, storage, name):
+        # السيرفر الأمامي يتولى Range و Content-Length بنفسه
+        response = offloaded
+    else:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range and not _range_is_fresh(request, etag, last_modified):
+            byte_range = None
+
+        start, end = byte_range or (0, size - 1)
+        length = end - start + 1 if size else 0
+        response = StreamingHttpResponse(_stream(storage, name, start, length), content_type=content_type)
+        response["Content-Length"] = str(length)
+        if byte_range:
+            response.status_code = 206
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    patch_cache_control(response, private=True, max_age=MEDIA_MAX_AGE)
+    return response
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_studentprogress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StudentTaskStatus',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('assigned', 'مطلوبة'), ('submitted', 'تم التسليم'), ('graded', 'تم التصحيح'), ('late', 'متأخرة')], default='assigned', max_length=10)),
+                ('score', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('deadline', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('halaqa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_statuses', to='accounts.halaqa')),
+                ('recitation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='student_statuses', to='accounts.recitation')),
+                ('review', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='student_statuses', to='accounts.review')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_statuses', to='accounts.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['halaqa', 'student', 'status'], name='taskstatus_halaqa_student')],
+                'unique_together': {('student', 'recitation'), ('student', 'review')},
+            },
+        ),
+    ]
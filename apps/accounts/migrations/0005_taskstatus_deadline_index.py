@@ -0,0 +1,17 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_studenttaskstatus'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studenttaskstatus',
+            index=models.Index(fields=['status', 'deadline'], name='taskstatus_status_deadline'),
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_taskstatus_deadline_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', 'is_read', '-created_at'], name='notif_recipient_unread'),
+        ),
+        migrations.AddIndex(
+            model_name='recitation',
+            index=models.Index(fields=['halaqa', '-created_at'], name='recitation_halaqa_created'),
+        ),
+        migrations.AddIndex(
+            model_name='recitationsubmission',
+            index=models.Index(fields=['student', 'status'], name='recitationsubmission_stu_st'),
+        ),
+        migrations.AddIndex(
+            model_name='recitationsubmission',
+            index=models.Index(fields=['-created_at', '-id'], name='recitationsubmission_created'),
+        ),
+        migrations.AddIndex(
+            model_name='recitationsubmission',
+            index=models.Index(condition=models.Q(('status', 'submitted')), fields=['-created_at', '-id'], name='recitationsubmission_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='recitationsubmission',
+            index=models.Index(fields=['recitation', 'status'], name='recsub_task_status'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['halaqa', '-created_at'], name='review_halaqa_created'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(fields=['student', 'status'], name='reviewsubmission_stu_st'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(fields=['-created_at', '-id'], name='reviewsubmission_created'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(condition=models.Q(('status', 'submitted')), fields=['-created_at', '-id'], name='reviewsubmission_pending'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(fields=['review', 'status'], name='revsub_task_status'),
+        ),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:04
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UploadSession',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('task_type', models.CharField(choices=[('recitation', 'تسميع'), ('review', 'مراجعة')], max_length=10)),
+                ('task_id', models.PositiveIntegerField()),
+                ('filename', models.CharField(max_length=255)),
+                ('content_type', models.CharField(blank=True, max_length=100)),
+                ('size', models.PositiveBigIntegerField()),
+                ('received', models.PositiveBigIntegerField(default=0)),
+                ('parts', models.JSONField(blank=True, default=list)),
+                ('status', models.CharField(choices=[('active', 'جارٍ الرفع'), ('completed', 'اكتمل')], default='active', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='upload_sessions', to='accounts.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', 'task_type', 'task_id', 'status'], name='upload_student_task')],
+            },
+        ),
+    ]
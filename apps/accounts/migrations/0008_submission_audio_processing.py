@@ -0,0 +1,51 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_uploadsession'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ثانية)'),
+        ),
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='حجم التسجيل (بايت)'),
+        ),
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_status',
+            field=models.CharField(choices=[('pending', 'في انتظار المعالجة'), ('ready', 'جاهز'), ('failed', 'فشلت المعالجة')], default='pending', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_duration',
+            field=models.FloatField(blank=True, null=True, verbose_name='مدة التسجيل (ثانية)'),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_size',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='حجم التسجيل (بايت)'),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_status',
+            field=models.CharField(choices=[('pending', 'في انتظار المعالجة'), ('ready', 'جاهز'), ('failed', 'فشلت المعالجة')], default='pending', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='recitationsubmission',
+            index=models.Index(condition=models.Q(('audio_status', 'pending')), fields=['created_at', 'id'], name='recitationsubmission_aud_pend'),
+        ),
+        migrations.AddIndex(
+            model_name='reviewsubmission',
+            index=models.Index(condition=models.Q(('audio_status', 'pending')), fields=['created_at', 'id'], name='reviewsubmission_aud_pend'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_peaks',
+            field=models.BinaryField(blank=True, null=True, verbose_name='قمم الموجة'),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_peaks',
+            field=models.BinaryField(blank=True, null=True, verbose_name='قمم الموجة'),
+        ),
+    ]
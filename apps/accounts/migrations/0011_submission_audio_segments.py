@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0010_submission_audio_peaks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_segments',
+            field=models.JSONField(blank=True, null=True, verbose_name='مقاطع الكلام'),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_segments',
+            field=models.JSONField(blank=True, null=True, verbose_name='مقاطع الكلام'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:17
+
+import apps.accounts.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0011_submission_audio_segments'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recitationsubmission',
+            name='audio',
+            field=models.FileField(blank=True, null=True, storage=apps.accounts.models.submission_storage, upload_to='submissions/'),
+        ),
+        migrations.AlterField(
+            model_name='reviewsubmission',
+            name='audio',
+            field=models.FileField(blank=True, null=True, storage=apps.accounts.models.submission_storage, upload_to='submissions/'),
+        ),
+        migrations.CreateModel(
+            name='AudioBlob',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('sha256', models.CharField(db_index=True, max_length=64)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('refcount', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('unreferenced_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['refcount', 'unreferenced_at'], name='blob_gc')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_audio_blob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='halaqa',
+            name='audio_retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='أيام قبل أرشفة التسجيلات'),
+        ),
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_archive',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='التسجيل في الأرشيف'),
+        ),
+        migrations.AddField(
+            model_name='recitationsubmission',
+            name='audio_restored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_archive',
+            field=models.CharField(blank=True, default='', max_length=255, verbose_name='التسجيل في الأرشيف'),
+        ),
+        migrations.AddField(
+            model_name='reviewsubmission',
+            name='audio_restored_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0015_profile_unread_notifications'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Event',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=30)),
+                ('data', models.JSONField(blank=True, default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('halaqa', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='accounts.halaqa')),
+                ('profile', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='events', to='accounts.profile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['profile', 'id'], name='event_profile_id'), models.Index(fields=['halaqa', 'id'], name='event_halaqa_id'), models.Index(fields=['created_at'], name='event_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:41
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboundMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('to', models.CharField(max_length=30)),
+                ('channel', models.CharField(choices=[('sms', 'SMS'), ('whatsapp', 'WhatsApp')], default='sms', max_length=10)),
+                ('kind', models.CharField(default='guardian', max_length=30)),
+                ('day', models.DateField()),
+                ('body', models.TextField()),
+                ('status', models.CharField(choices=[('queued', 'في الانتظار'), ('sending', 'قيد الإرسال'), ('sent', 'أُرسلت'), ('failed', 'فشلت')], default='queued', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('run_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('provider_id', models.CharField(blank=True, max_length=100)),
+                ('last_error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_at'], name='outbox_next')],
+                'constraints': [models.UniqueConstraint(fields=('to', 'kind', 'day'), name='outbox_guardian_day')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 23:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_outbound_message'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profile',
+            name='email_digest_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
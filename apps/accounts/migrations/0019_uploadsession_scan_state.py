@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-19 10:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_profile_email_digest_sent_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='uploadsession',
+            name='scan_state',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-19 11:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_uploadsession_scan_state'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='outboundmessage',
+            name='outbox_guardian_day',
+        ),
+        migrations.AddField(
+            model_name='outboundmessage',
+            name='seq',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddConstraint(
+            model_name='outboundmessage',
+            constraint=models.UniqueConstraint(fields=('to', 'kind', 'day', 'seq'), name='outbox_guardian_day_seq'),
+        ),
+    ]
@@ -1,3 +1,7 @@
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import default_storage, storages
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -18,6 +22,8 @@ class Halaqa(models.Model):
         blank=True,
         limit_choices_to={"role": "teacher"},
     )
+    # بعد كم يوم من التصحيح تُنقل التسجيلات للأرشيف (فارغ = AUDIO_ARCHIVE_AFTER_DAYS، 0 = لا أرشفة)
+    audio_retention_days = models.PositiveIntegerField("أيام قبل أرشفة التسجيلات", null=True, blank=True)
 
     def __str__(self):
         return self.name
@@ -67,6 +73,13 @@ class Profile(models.Model):
     certificate = models.FileField(upload_to="certificates/", null=True, blank=True)
     email_notifications = models.BooleanField(default=True)
     app_notifications = models.BooleanField(default=True)
+    # "قراءة الكل": كل إشعار (مباشر أو جماعي) أقدم من هذا الوقت يُعتبر مقروءًا (انظر inbox.py)
+    notifications_read_at = models.DateTimeField(null=True, blank=True)
+    # عدد غير المقروء (مباشر + جماعي) لشارة الإشعارات؛ يُحدَّث عند الإنشاء والقراءة
+    # (inbox.py) ويُصحَّح بـ recount_notifications
+    unread_notifications = models.PositiveIntegerField(default=0)
+    # نهاية نافذة آخر ملخص بريد يومي (digest.py): الملخص التالي يبدأ من هنا
+    email_digest_sent_at = models.DateTimeField(null=True, blank=True)
     teacher_status = models.CharField(
         max_length=10, choices=TEACHER_STATUS_CHOICES, default=TEACHER_PENDING
     )
@@ -90,8 +103,16 @@ class Profile(models.Model):
         if self.role != self.ROLE_TEACHER:
             self.teacher_status = self.TEACHER_APPROVED
 
+    # تُحدَّث بـ update() من inbox.py وdigest.py فقط؛ save() العادي لا يكتبها فوق قيمة أحدث
+    INBOX_STATE_FIELDS = ("unread_notifications", "notifications_read_at", "email_digest_sent_at")
+
     def save(self, *args, **kwargs):
         self.full_clean()
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.INBOX_STATE_FIELDS
+            ]
         return super().save(*args, **kwargs)
 
 # ==============================================================================
@@ -114,6 +135,15 @@ class BaseTask(models.Model):
     class Meta:
         abstract = True
         ordering = ["-deadline", "-id"]
+        indexes = [
+            # سجل مهام الحلقة (الأحدث أولًا) ومهام الطالب منذ انضمامه
+            models.Index(fields=["halaqa", "-created_at"], name="%(class)s_halaqa_created"),
+        ]
+
+def submission_storage():
+    """تخزين تسجيلات التسليمات: STORAGES["submissions"] (بعنوان المحتوى، انظر blobs.py) أو الافتراضي."""
+    return storages["submissions"] if "submissions" in settings.STORAGES else default_storage
+
 
 class BaseSubmission(models.Model):
     """موديل أساسي مجرد يحتوي على الحقول المشتركة للتسليمات."""
@@ -122,12 +152,33 @@ class BaseSubmission(models.Model):
         ("reviewing", "قيد المراجعة"),
         ("graded", "تم التصحيح"),
     ]
+    # حالة معالجة التسجيل (التحويل إلى Opus في الخلفية)
+    AUDIO_PENDING = "pending"
+    AUDIO_READY = "ready"
+    AUDIO_FAILED = "failed"
+    AUDIO_STATUS_CHOICES = [
+        (AUDIO_PENDING, "في انتظار المعالجة"),
+        (AUDIO_READY, "جاهز"),
+        (AUDIO_FAILED, "فشلت المعالجة"),
+    ]
     student = models.ForeignKey(
         Profile,
         on_delete=models.CASCADE,
         limit_choices_to={"role": Profile.ROLE_STUDENT},
     )
-    audio = models.FileField(upload_to="submissions/", null=True, blank=True)
+    audio = models.FileField(upload_to="submissions/", storage=submission_storage, null=True, blank=True)
+    audio_status = models.CharField(max_length=10, choices=AUDIO_STATUS_CHOICES, default=AUDIO_PENDING)
+    audio_duration = models.FloatField("مدة التسجيل (ثانية)", null=True, blank=True)
+    audio_size = models.PositiveIntegerField("حجم التسجيل (بايت)", null=True, blank=True)
+    # قمم الموجة: WAVEFORM_PEAKS بايت (0-255) لرسم التسجيل قبل تحميله
+    audio_peaks = models.BinaryField("قمم الموجة", null=True, blank=True)
+    # مقاطع الكلام [[بداية، نهاية], ...] بالثواني لتخطي السكتات أثناء التصحيح
+    audio_segments = models.JSONField("مقاطع الكلام", null=True, blank=True)
+    # أرشفة التسجيلات القديمة (archive_recordings): audio تصبح مقطع معاينة قصيرًا والتسجيل
+    # الكامل في تخزين الأرشيف باسم audio_archive، ويُسترجع عند فتحه للتصحيح
+    audio_archive = models.CharField("التسجيل في الأرشيف", max_length=255, blank=True, default="")
+    archived_at = models.DateTimeField(null=True, blank=True)
+    audio_restored_at = models.DateTimeField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="submitted")
     score = models.PositiveSmallIntegerField(null=True, blank=True)
     rules = models.PositiveSmallIntegerField(null=True, blank=True)
@@ -139,6 +190,22 @@ class BaseSubmission(models.Model):
     class Meta:
         abstract = True
         ordering = ["-created_at"]
+        indexes = [
+            # إحصائيات الطالب وتسليماته حسب الحالة
+            models.Index(fields=["student", "status"], name="%(class)s_stu_st"),
+            # ترتيب صندوق التسليمات (keyset على created_at, id)
+            models.Index(fields=["-created_at", "-id"], name="%(class)s_created"),
+            # التسليمات المعلقة فقط (الفلتر الافتراضي لصفحة المعلم) - فهرس جزئي صغير
+            models.Index(
+                fields=["-created_at", "-id"], condition=models.Q(status="submitted"),
+                name="%(class)s_pending",
+            ),
+            # طابور معالجة التسجيلات (التحويل إلى Opus)
+            models.Index(
+                fields=["created_at", "id"], condition=models.Q(audio_status="pending"),
+                name="%(class)s_aud_pend",
+            ),
+        ]
 
 # ==============================================================================
 # Models الخاصة بالمهام (Recitation, Review)
@@ -186,6 +253,10 @@ class RecitationSubmission(BaseSubmission):
 
     class Meta(BaseSubmission.Meta):
         unique_together = ("recitation", "student")
+        indexes = BaseSubmission.Meta.indexes + [
+            # عدادات الحلقة: التسليمات المعلقة/المصححة لكل مهمة
+            models.Index(fields=["recitation", "status"], name="recsub_task_status"),
+        ]
         
     def __str__(self):
         return f"{self.student.user.username} → {self.recitation}"
@@ -202,6 +273,10 @@ class ReviewSubmission(BaseSubmission):
 
     class Meta(BaseSubmission.Meta):
         unique_together = ("review", "student")
+        indexes = BaseSubmission.Meta.indexes + [
+            # عدادات الحلقة: التسليمات المعلقة/المصححة لكل مهمة
+            models.Index(fields=["review", "status"], name="revsub_task_status"),
+        ]
 
     def __str__(self):
         return f"{self.student.user.username} → {self.review}"
@@ -229,5 +304,290 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # قائمة إشعارات المستخدم وعدد غير المقروء
+            models.Index(fields=["recipient", "is_read", "-created_at"], name="notif_recipient_unread"),
+        ]
+
+    def __str__(self):
+        return f"إشعار لـ {self.recipient.user.username}"
+
+
+class Broadcast(models.Model):
+    """
+    إشعار جماعي لطلاب حلقة: صف واحد مهما كان عدد الطلاب، يُدمج مع الإشعارات
+    المباشرة عند القراءة (inbox.py). حالة القراءة لكل طالب في BroadcastReceipt
+    تُنشأ فقط عندما يقرأه.
+    """
+    halaqa = models.ForeignKey(Halaqa, on_delete=models.CASCADE, related_name="broadcasts")
+    sender = models.ForeignKey(
+        Profile, null=True, blank=True, on_delete=models.SET_NULL, related_name="sent_broadcasts"
+    )
+    title = models.CharField(max_length=255)
+    message = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["halaqa", "-created_at"], name="broadcast_halaqa_created"),
+        ]
+
+    def __str__(self):
+        return f"إشعار جماعي لـ {self.halaqa.name}"
+
+
+class BroadcastReceipt(models.Model):
+    """قراءة طالب لإشعار جماعي (تُنشأ عند القراءة فقط)."""
+    broadcast = models.ForeignKey(Broadcast, on_delete=models.CASCADE, related_name="receipts")
+    recipient = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="broadcast_receipts")
+    read_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["recipient", "broadcast"], name="broadcast_receipt_unique"),
+        ]
+
+# ==============================================================================
+# Models الخاصة بالرفع المقسّم (Chunked uploads)
+# ==============================================================================
+
+class UploadSession(models.Model):
+    """
+    جلسة رفع تسجيل صوتي على أجزاء (init / chunk / finalize).
+    كل جزء يُحفظ مباشرة في التخزين، والتسليم نفسه لا يُنشأ إلا عند finalize.
+    """
+    STATUS_ACTIVE = "active"
+    STATUS_COMPLETED = "completed"
+    STATUS_CHOICES = [(STATUS_ACTIVE, "جارٍ الرفع"), (STATUS_COMPLETED, "اكتمل")]
+    TASK_TYPE_CHOICES = [("recitation", "تسميع"), ("review", "مراجعة")]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    student = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="upload_sessions")
+    task_type = models.CharField(max_length=10, choices=TASK_TYPE_CHOICES)
+    task_id = models.PositiveIntegerField()
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # [[offset, length, storage_name], ...] بترتيب الاستلام
+    parts = models.JSONField(default=list, blank=True)
+    # حالة فحص التسجيل بعد آخر جزء (AudioStreamValidator.state) ليستأنف منها الجزء التالي
+    scan_state = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ACTIVE)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["student", "task_type", "task_id", "status"], name="upload_student_task"),
+        ]
+
+    def __str__(self):
+        return f"رفع {self.filename} ({self.received}/{self.size})"
+
+# ==============================================================================
+# Models الخاصة بتخزين التسجيلات بعنوان المحتوى (Content-addressed)
+# ==============================================================================
+
+class AudioBlob(models.Model):
+    """
+    ملف تسجيل مخزن باسم SHA-256 لمحتواه (blobs/ab/cd/<sha>.ext) يتشاركه كل تسليم بنفس المحتوى.
+    refcount = عدد التسليمات التي تشير إليه؛ عند الصفر يُسجَّل unreferenced_at
+    ويحذفه gc_audio_blobs بعد مهلة أمان.
+    """
+    name = models.CharField(max_length=255, unique=True)
+    sha256 = models.CharField(max_length=64, db_index=True)
+    size = models.PositiveBigIntegerField(default=0)
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    unreferenced_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # مرشحو الجمع: بلا مراجع منذ أقدم وقت
+            models.Index(fields=["refcount", "unreferenced_at"], name="blob_gc"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.refcount} مرجع)"
+
+# ==============================================================================
+# Models الخاصة بطابور المهام الخلفية (بدون Redis/وسيط خارجي)
+# ==============================================================================
+
+class Job(models.Model):
+    """
+    مهمة خلفية مخزنة في قاعدة البيانات؛ يضيفها الـ view ويشغلها أمر run_worker.
+    الأولوية الأصغر تُنفذ أولًا، والفاشلة تُعاد بعد تأخير متزايد حتى max_attempts.
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "في الانتظار"),
+        (STATUS_RUNNING, "قيد التنفيذ"),
+        (STATUS_DONE, "تمت"),
+        (STATUS_FAILED, "فشلت"),
+    ]
+    PRIORITY_HIGH = 0
+    PRIORITY_NORMAL = 5
+    PRIORITY_LOW = 9
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    priority = models.PositiveSmallIntegerField(default=PRIORITY_NORMAL)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # اختيار المهمة التالية: الحالة ثم الأولوية ثم وقت التنفيذ
+            models.Index(fields=["status", "priority", "run_at"], name="job_next"),
+            # استرجاع المهام العالقة وتنظيف المنتهية
+            models.Index(fields=["status", "locked_at"], name="job_status_locked"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class OutboundMessage(models.Model):
+    """
+    رسالة SMS/WhatsApp لولي الأمر في صندوق الصادر (outbox.py)؛ يرسلها أمر
+    dispatch_outbox على دفعات بمعدل محدود. تنبيهات اليوم نفسه لنفس الرقم والنوع
+    تُجمع في نفس الرسالة ما دامت لم تُرسل؛ ما يصل بعد إرسالها يذهب في رسالة
+    لاحقة (seq التالي).
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "في الانتظار"),
+        (STATUS_SENDING, "قيد الإرسال"),
+        (STATUS_SENT, "أُرسلت"),
+        (STATUS_FAILED, "فشلت"),
+    ]
+    CHANNEL_SMS = "sms"
+    CHANNEL_WHATSAPP = "whatsapp"
+    CHANNEL_CHOICES = [(CHANNEL_SMS, "SMS"), (CHANNEL_WHATSAPP, "WhatsApp")]
+    KIND_ABSENCE = "absence"
+    KIND_GUARDIAN = "guardian"
+
+    to = models.CharField(max_length=30)
+    channel = models.CharField(max_length=10, choices=CHANNEL_CHOICES, default=CHANNEL_SMS)
+    kind = models.CharField(max_length=30, default=KIND_GUARDIAN)
+    day = models.DateField()
+    # ترتيب الرسالة بين رسائل نفس الرقم والنوع واليوم (0 = الأولى)
+    seq = models.PositiveSmallIntegerField(default=0)
+    body = models.TextField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    provider_id = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["to", "kind", "day", "seq"], name="outbox_guardian_day_seq"),
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_at"], name="outbox_next"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} → {self.to} ({self.status})"
+
+
+class Event(models.Model):
+    """
+    حدث فوري للمتصفح (events.py → events_stream عبر SSE). موجّه لبروفايل واحد أو
+    لكل طلاب حلقة (صف واحد للحلقة). المعرّف المتزايد هو Last-Event-ID لاستكمال البث.
+    صفوف مؤقتة؛ يحذف القديم منها أمر purge_events.
+    """
+    profile = models.ForeignKey(Profile, null=True, blank=True, on_delete=models.CASCADE, related_name="events")
+    halaqa = models.ForeignKey(Halaqa, null=True, blank=True, on_delete=models.CASCADE, related_name="events")
+    kind = models.CharField(max_length=30)
+    data = models.JSONField(default=dict, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["profile", "id"], name="event_profile_id"),
+            models.Index(fields=["halaqa", "id"], name="event_halaqa_id"),
+            models.Index(fields=["created_at"], name="event_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk}"
+
+# ==============================================================================
+# Models التجميعية (ملخصات تُحدَّث تدريجيًا بدل إعادة الحساب في كل طلب)
+# ==============================================================================
+
+class StudentProgress(models.Model):
+    """ملخص تراكمي لتقدم الطالب (مجموع الدرجات، عدد المصحَّح، الآيات المحفوظة)."""
+    student = models.OneToOneField(
+        Profile, on_delete=models.CASCADE, primary_key=True, related_name="progress"
+    )
+    total_score = models.PositiveIntegerField(default=0)
+    graded_count = models.PositiveIntegerField(default=0)
+    ayah_count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"تقدم {self.student.user.username}"
+
+
+class StudentTaskStatus(models.Model):
+    """
+    مصفوفة طالب × مهمة لكل حلقة: صف لكل مهمة مطلوبة من كل طالب بحالتها الحالية.
+    تُحدَّث عند إنشاء المهمة، وعند التسليم/التصحيح/الحذف، وعند انتقال الطالب لحلقة أخرى.
+    """
+    STATUS_ASSIGNED = "assigned"
+    STATUS_SUBMITTED = "submitted"
+    STATUS_GRADED = "graded"
+    STATUS_LATE = "late"
+    STATUS_CHOICES = [
+        (STATUS_ASSIGNED, "مطلوبة"),
+        (STATUS_SUBMITTED, "تم التسليم"),
+        (STATUS_GRADED, "تم التصحيح"),
+        (STATUS_LATE, "متأخرة"),
+    ]
+
+    halaqa = models.ForeignKey(Halaqa, on_delete=models.CASCADE, related_name="task_statuses")
+    student = models.ForeignKey(Profile, on_delete=models.CASCADE, related_name="task_statuses")
+    # واحد فقط من الحقلين مضبوط حسب نوع المهمة
+    recitation = models.ForeignKey(
+        Recitation, null=True, blank=True, on_delete=models.CASCADE, related_name="student_statuses"
+    )
+    review = models.ForeignKey(
+        Review, null=True, blank=True, on_delete=models.CASCADE, related_name="student_statuses"
+    )
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_ASSIGNED)
+    score = models.PositiveSmallIntegerField(null=True, blank=True)
+    deadline = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = (("student", "recitation"), ("student", "review"))
+        indexes = [
+            models.Index(fields=["halaqa", "student", "status"], name="taskstatus_halaqa_student"),
+            models.Index(fields=["status", "deadline"], name="taskstatus_status_deadline"),
+        ]
+
     def __str__(self):
-        return f"إشعار لـ {self.recipient.user.username}"
\ No newline at end of file
+        return f"{self.student.user.username} → {self.recitation or self.review} ({self.status})"
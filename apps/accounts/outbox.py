@@ -0,0 +1,223 @@
+# apps/accounts/outbox.py
+import logging
+import re
+import time
+import uuid
+from collections import deque
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import OutboundMessage
+
+logger = logging.getLogger(__name__)
+
+# تأخير إعادة المحاولة الأولى بالثواني، يتضاعف مع كل محاولة
+OUTBOX_RETRY_DELAY = 60
+OUTBOX_MAX_ATTEMPTS = 5
+# رسالة في حالة sending أطول من هذا غالبًا مات المرسل الذي أخذها
+OUTBOX_LOCK_TIMEOUT = timedelta(minutes=15)
+FAKE_PROVIDER_KEEP = 100
+
+
+class SendError(Exception):
+    """فشل الإرسال؛ retryable=False للأخطاء الدائمة (رقم غير صالح مثلًا)."""
+
+    def __init__(self, message, retryable=True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+def normalize_phone(phone):
+    """يحذف المسافات والشرطات والأقواس؛ "" لو لا يوجد رقم."""
+    phone = re.sub(r"[\s\-().]", "", phone or "")
+    if phone.startswith("00"):
+        phone = "+" + phone[2:]
+    return phone
+
+
+# ========= مزودو الإرسال =========
+
+class FakeProvider:
+    """
+    مزود محلي بلا شبكة للاختبارات والتطوير: لا يرسل شيئًا، ويحفظ آخر
+    FAKE_PROVIDER_KEEP رسالة في sent. أرقام في failures تفشل بالخطأ المحدد.
+    get_provider لا يقبله إلا مع DEBUG، فلا تُعلَّم تنبيهات حقيقية "أُرسلت" في الإنتاج.
+    """
+
+    def __init__(self):
+        self.sent = deque(maxlen=FAKE_PROVIDER_KEEP)
+        self.failures = {}
+
+    def send(self, message):
+        error = self.failures.get(message.to)
+        if error is not None:
+            raise error
+        self.sent.append(message)
+        logger.info("Fake outbox send: %s #%s to ...%s", message.channel, message.pk, message.to[-3:])
+        return f"fake-{uuid.uuid4().hex[:16]}"
+
+
+class TwilioProvider:
+    """SMS أو WhatsApp عبر Twilio (TWILIO_* في .env)."""
+    # أخطاء HTTP تستحق إعادة المحاولة؛ غيرها (رقم غير صالح، رقم محظور) دائمة
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self):
+        try:
+            from twilio.rest import Client
+        except ImportError as e:
+            raise ImproperlyConfigured("TwilioProvider requires the 'twilio' package.") from e
+        if not settings.TWILIO_ACCOUNT_SID or not settings.TWILIO_AUTH_TOKEN:
+            raise ImproperlyConfigured("Set TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN to use TwilioProvider.")
+        self.client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+
+    def send(self, message):
+        from twilio.base.exceptions import TwilioException, TwilioRestException
+
+        if message.channel == OutboundMessage.CHANNEL_WHATSAPP:
+            to, from_ = f"whatsapp:{message.to}", f"whatsapp:{settings.TWILIO_WHATSAPP_FROM}"
+        else:
+            to, from_ = message.to, settings.TWILIO_FROM_NUMBER
+        try:
+            return self.client.messages.create(to=to, from_=from_, body=message.body).sid
+        except TwilioRestException as e:
+            raise SendError(f"{e.status} {e.code}: {e.msg}", retryable=e.status in self.RETRYABLE_STATUSES) from e
+        except TwilioException as e:
+            raise SendError(str(e)) from e
+
+
+@lru_cache(maxsize=None)
+def get_provider():
+    """
+    مزود OUTBOX_PROVIDER. بدون مزود يُرفع ImproperlyConfigured قبل حجز أي رسالة،
+    فتبقى الرسائل في الانتظار حتى يُضبط المزود.
+    """
+    if not settings.OUTBOX_PROVIDER:
+        raise ImproperlyConfigured("Set OUTBOX_PROVIDER (e.g. apps.accounts.outbox.TwilioProvider) to send guardian messages.")
+    provider_class = import_string(settings.OUTBOX_PROVIDER)
+    if provider_class is FakeProvider and not settings.DEBUG:
+        raise ImproperlyConfigured("FakeProvider does not deliver messages; it is only allowed with DEBUG=1.")
+    return provider_class()
+
+
+# ========= الصادر =========
+
+def queue_message(to, body, kind=OutboundMessage.KIND_GUARDIAN, day=None, channel=None):
+    """
+    يضيف رسالة لولي الأمر إلى الصادر؛ لا شيء يُرسل هنا. لو في الصادر رسالة لنفس
+    (الرقم، النوع، اليوم) لم تُرسل بعد يُضاف السطر إليها (أخوان غائبان = رسالة واحدة)،
+    ولو أُرسلت أو بدأ إرسالها تُنشأ رسالة لاحقة. يُتجاهل فقط السطر المكرر حرفيًا
+    (نفس الطالب ونفس النص). يعيد (الرسالة، True لو أُضيف شيء) أو (None, False).
+    """
+    to = normalize_phone(to)
+    if not to:
+        return None, False
+    day = day or timezone.localdate()
+    channel = channel or settings.OUTBOX_CHANNEL
+
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                messages = list(
+                    OutboundMessage.objects.select_for_update().filter(to=to, kind=kind, day=day).order_by("seq")
+                )
+                for message in messages:
+                    if body in message.body.splitlines():
+                        return message, False
+                last = messages[-1] if messages else None
+                if last is not None and last.status == OutboundMessage.STATUS_QUEUED:
+                    updated = OutboundMessage.objects.filter(
+                        pk=last.pk, status=OutboundMessage.STATUS_QUEUED,
+                    ).update(body=last.body + "\n" + body)
+                    if updated:
+                        last.body += "\n" + body
+                        return last, True
+                    continue  # حُجزت للإرسال للتو: رسالة لاحقة
+                return OutboundMessage.objects.create(
+                    to=to, kind=kind, day=day, seq=last.seq + 1 if last else 0, channel=channel, body=body,
+                ), True
+        except IntegrityError:  # أُنشئت للتو في طلب متزامن
+            continue
+    raise IntegrityError(f"could not queue outbox message for {to}")
+
+
+def requeue_stale_messages(now=None, timeout=OUTBOX_LOCK_TIMEOUT):
+    """
+    يعيد الرسائل العالقة في sending إلى الطابور. المرسل توقف بعد الحجز، وقد يكون
+    أرسل بعضها قبل أن يسجل ذلك؛ الإرسال مرتين أهون من ضياع تنبيه الغياب.
+    """
+    now = now or timezone.now()
+    return OutboundMessage.objects.filter(
+        status=OutboundMessage.STATUS_SENDING, locked_at__lt=now - timeout,
+    ).update(status=OutboundMessage.STATUS_QUEUED, run_at=now, locked_by="", locked_at=None)
+
+
+def claim_batch(batch_size, now=None):
+    """
+    يحجز حتى batch_size رسالة مستحقة بتحديث مشروط واحد بعلامة فريدة للدفعة
+    (كما في claim_next_job)، فلا تأخذ عمليتان نفس الرسالة.
+    """
+    now = now or timezone.now()
+    token = uuid.uuid4().hex
+    ids = list(OutboundMessage.objects.filter(
+        status=OutboundMessage.STATUS_QUEUED, run_at__lte=now,
+    ).order_by("run_at", "id").values_list("id", flat=True)[:batch_size])
+    if not ids:
+        return []
+    OutboundMessage.objects.filter(pk__in=ids, status=OutboundMessage.STATUS_QUEUED).update(
+        status=OutboundMessage.STATUS_SENDING, locked_by=token, locked_at=now, attempts=F("attempts") + 1,
+    )
+    return list(OutboundMessage.objects.filter(
+        locked_by=token, status=OutboundMessage.STATUS_SENDING,
+    ).order_by("run_at", "id"))
+
+
+def _record(message, error=None):
+    row = OutboundMessage.objects.filter(pk=message.pk, locked_by=message.locked_by)
+    now = timezone.now()
+    if error is None:
+        row.update(status=OutboundMessage.STATUS_SENT, sent_at=now, provider_id=message.provider_id,
+                   locked_by="", locked_at=None, last_error="")
+        return OutboundMessage.STATUS_SENT
+    if error.retryable and message.attempts < OUTBOX_MAX_ATTEMPTS:
+        delay = timedelta(seconds=OUTBOX_RETRY_DELAY * 2 ** (message.attempts - 1))
+        row.update(status=OutboundMessage.STATUS_QUEUED, run_at=now + delay,
+                   locked_by="", locked_at=None, last_error=str(error))
+        return OutboundMessage.STATUS_QUEUED
+    row.update(status=OutboundMessage.STATUS_FAILED, locked_by="", locked_at=None, last_error=str(error))
+    return OutboundMessage.STATUS_FAILED
+
+
+def dispatch_batch(batch_size=None, provider=None, rate=None):
+    """
+    يرسل دفعة من الصادر بمعدل لا يتجاوز rate رسالة/ثانية (OUTBOX_RATE_PER_SECOND)
+    ويسجل حالة كل رسالة. يعيد {الحالة: العدد} (sent / queued لإعادة المحاولة / failed).
+    """
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    provider = provider or get_provider()
+    interval = 1 / (rate or settings.OUTBOX_RATE_PER_SECOND)
+
+    requeue_stale_messages()
+    results = {OutboundMessage.STATUS_SENT: 0, OutboundMessage.STATUS_QUEUED: 0, OutboundMessage.STATUS_FAILED: 0}
+    next_send = time.monotonic()
+    for message in claim_batch(batch_size):
+        wait = next_send - time.monotonic()
+        if wait > 0:
+            time.sleep(wait)
+        next_send = time.monotonic() + interval
+        try:
+            message.provider_id = provider.send(message) or ""
+        except SendError as e:
+            results[_record(message, e)] += 1
+        except Exception as e:  # خطأ غير متوقع من المزود: نعيد المحاولة لاحقًا
+            results[_record(message, SendError(f"{type(e).__name__}: {e}"))] += 1
+        else:
+            results[_record(message)] += 1
+    return results
@@ -1,8 +1,24 @@
 # apps/accounts/signals.py
-from django.db.models.signals import post_save
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.db import transaction
 from django.dispatch import receiver
 from django.contrib.auth import get_user_model
-from .models import Profile
+from .models import (
+    Profile, Recitation, Review, RecitationSubmission, ReviewSubmission,
+    Notification, StudentTaskStatus, Attendance,
+)
+from .deadlines import tasks_overdue
+from .inbox import notify_many, recount_unread
+from .events import (
+    publish, EVENT_TASK_CREATED, EVENT_SUBMISSION_RECEIVED, EVENT_GRADED,
+)
+from .blobs import swap_reference, release
+from apps.tracker.notifications import notify_absence
+from .stats import (
+    submission_contribution, apply_progress_delta,
+    rebuild_task_statuses_for_task, rebuild_task_statuses_for_student,
+    record_submission_status, clear_submission_status,
+)
 
 User = get_user_model()
 
@@ -44,3 +60,162 @@ def activate_user_when_teacher_status_changes(sender, instance: Profile, **kwarg
 
     # لو طالب: عادة نتركه كما هو.
     # إن أردت فرض التفعيل التلقائي للطلاب، يمكنك إضافة منطق هنا.
+
+
+# ========= تحديث ملخص تقدم الطالب (StudentProgress) تدريجيًا =========
+
+@receiver(pre_save, sender=RecitationSubmission)
+@receiver(pre_save, sender=ReviewSubmission)
+def remember_submission_contribution(sender, instance, **kwargs):
+    """
+    نحفظ مساهمة التسليم قبل التعديل حتى نطبّق الفرق فقط بعد الحفظ
+    (يغطي grade_submission و submit_task وتعديلات الأدمن).
+    """
+    old = None
+    if instance.pk:
+        old = sender.objects.filter(pk=instance.pk).first()
+    instance._progress_before = submission_contribution(old)
+    # ملف التسجيل السابق لتحديث عدّاد المراجع في AudioBlob
+    instance._audio_before = old.audio.name if old and old.audio else ""
+    # الحالة السابقة لأحداث التسليم/التصحيح الفورية
+    instance._status_before = old.status if old else None
+
+
+@receiver(post_save, sender=RecitationSubmission)
+@receiver(post_save, sender=ReviewSubmission)
+def update_progress_on_save(sender, instance, **kwargs):
+    before = getattr(instance, "_progress_before", (0, 0, 0))
+    apply_progress_delta(instance.student_id, before, submission_contribution(instance))
+
+
+@receiver(post_delete, sender=RecitationSubmission)
+@receiver(post_delete, sender=ReviewSubmission)
+def update_progress_on_delete(sender, instance, **kwargs):
+    """زر "إعادة المحاولة" يحذف التسليم، فنطرح مساهمته من الملخص."""
+    apply_progress_delta(instance.student_id, submission_contribution(instance), (0, 0, 0))
+
+
+# ========= عدّاد مراجع التسجيلات (AudioBlob) =========
+
+@receiver(post_save, sender=RecitationSubmission)
+@receiver(post_save, sender=ReviewSubmission)
+def update_audio_refcount_on_save(sender, instance, **kwargs):
+    swap_reference(getattr(instance, "_audio_before", ""), instance.audio.name or "", instance.audio.storage)
+
+
+@receiver(post_delete, sender=RecitationSubmission)
+@receiver(post_delete, sender=ReviewSubmission)
+def update_audio_refcount_on_delete(sender, instance, **kwargs):
+    """زر "إعادة المحاولة" يحذف التسليم: الملف يبقى حتى يجمعه gc_audio_blobs."""
+    release(instance.audio.name or "")
+
+
+# ========= مصفوفة طالب × مهمة (StudentTaskStatus) =========
+
+@receiver(post_save, sender=Recitation)
+@receiver(post_save, sender=Review)
+def sync_task_statuses_on_task_save(sender, instance, **kwargs):
+    """مهمة جديدة (أو تعديل موعدها/حلقتها): نعيد بناء صفوفها لطلاب الحلقة."""
+    rebuild_task_statuses_for_task(instance)
+
+
+@receiver(post_save, sender=RecitationSubmission)
+@receiver(post_save, sender=ReviewSubmission)
+def sync_task_status_on_submission_save(sender, instance, **kwargs):
+    record_submission_status(instance)
+
+
+@receiver(post_delete, sender=RecitationSubmission)
+@receiver(post_delete, sender=ReviewSubmission)
+def sync_task_status_on_submission_delete(sender, instance, **kwargs):
+    clear_submission_status(instance)
+
+
+@receiver(pre_save, sender=Profile)
+def remember_profile_halaqa(sender, instance, **kwargs):
+    old = sender.objects.filter(pk=instance.pk).values("halaqa_id", "role").first() if instance.pk else None
+    instance._task_matrix_before = (old["halaqa_id"], old["role"]) if old else (None, None)
+
+
+@receiver(post_save, sender=Profile)
+def sync_task_statuses_on_halaqa_change(sender, instance, **kwargs):
+    """انضمام الطالب لحلقة أو خروجه منها (assign/unassign من صفحة الطلاب)."""
+    if getattr(instance, "_task_matrix_before", (None, None)) != (instance.halaqa_id, instance.role):
+        rebuild_task_statuses_for_student(instance)
+
+
+@receiver(post_save, sender=Profile)
+def recount_unread_on_halaqa_change(sender, instance, created, **kwargs):
+    """الإشعارات الجماعية تتبع حلقة الطالب الحالية، فنعيد حساب عدّاد الشارة عند تغييرها."""
+    before = getattr(instance, "_task_matrix_before", (None, None))[0]
+    if not created and before != instance.halaqa_id:
+        recount_unread(instance)
+
+
+# ========= تنبيه ولي الأمر بالغياب (صادر الرسائل، dispatch_outbox) =========
+
+@receiver(post_save, sender=Attendance)
+def alert_guardian_on_absence(sender, instance, **kwargs):
+    """يُضاف للصادر بعد الـ commit فقط؛ الإرسال نفسه على دفعات خارج الطلب."""
+    if instance.status != "absent":
+        return
+    student = Profile.objects.select_related("user").filter(pk=instance.student_id).first()
+    if student is None or not student.guardian_phone:
+        return
+    name = student.user.get_full_name() or student.user.username
+    transaction.on_commit(lambda: notify_absence(name, student.guardian_phone, instance.date))
+
+
+# ========= الأحداث الفورية للمتصفح (events_stream) =========
+
+@receiver(post_save, sender=Recitation)
+@receiver(post_save, sender=Review)
+def publish_task_created(sender, instance, created, **kwargs):
+    if created:
+        kind = "recitation" if sender is Recitation else "review"
+        publish(EVENT_TASK_CREATED, {"type": kind, "id": instance.pk}, halaqa_id=instance.halaqa_id)
+
+
+@receiver(post_save, sender=RecitationSubmission)
+@receiver(post_save, sender=ReviewSubmission)
+def publish_submission_status(sender, instance, **kwargs):
+    """تسليم جديد/معاد → معلمو الحلقة، تصحيح → الطالب."""
+    if getattr(instance, "_status_before", None) == instance.status:
+        return
+    kind = "recitation" if sender is RecitationSubmission else "review"
+    data = {"type": kind, "id": instance.pk, "task_id": getattr(instance, f"{kind}_id")}
+    if instance.status == "submitted":
+        task_model = Recitation if kind == "recitation" else Review
+        teachers = Profile.objects.filter(
+            halaqat_as_teacher__in=task_model.objects.filter(pk=data["task_id"]).values("halaqa_id")
+        ).values_list("id", flat=True)
+        publish(EVENT_SUBMISSION_RECEIVED, data, profile_ids=list(teachers))
+    elif instance.status == "graded":
+        publish(EVENT_GRADED, dict(data, score=instance.score), profile_ids=[instance.student_id])
+
+
+# ========= مرور الموعد النهائي (أمر sweep_deadlines) =========
+
+@receiver(tasks_overdue)
+def notify_students_of_overdue_tasks(sender, rows, **kwargs):
+    """
+    إشعار واحد لكل طالب عن مهامه التي فات موعدها في هذه الدفعة،
+    تُنشأ كلها بـ bulk_create واحد (للطلاب المفعّلين لإشعارات التطبيق فقط).
+    """
+    statuses = StudentTaskStatus.objects.filter(
+        id__in=[r["id"] for r in rows], student__app_notifications=True
+    ).select_related("recitation__surah", "review__surah")
+
+    per_student = {}
+    for st in statuses:
+        title = f"تسميع {st.recitation.surah.name}" if st.recitation_id else f"مراجعة {st.review.surah.name}"
+        per_student.setdefault(st.student_id, []).append(title)
+
+    notify_many([
+        Notification(
+            recipient_id=student_id,
+            title="مهام فات موعدها" if len(titles) > 1 else "مهمة فات موعدها",
+            message="فات الموعد النهائي ولم تقم بالتسليم بعد: " + "، ".join(titles),
+        )
+        for student_id, titles in per_student.items()
+    ], batch_size=500)
@@ -0,0 +1,413 @@
+# apps/accounts/stats.py
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.db.models import (
+    Q, Count, Sum, Avg, Max, F, Exists, OuterRef, Subquery, IntegerField, Case, When, Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import (
+    Profile,
+    Recitation, Review,
+    RecitationSubmission, ReviewSubmission,
+    StudentProgress, StudentTaskStatus,
+)
+
+# تسليم "ناجح" = تم تصحيحه بدرجة 5 فأكثر (من 10)
+PASS_SCORE = 5
+
+
+@dataclass(frozen=True)
+class StudentStats:
+    """نتيجة إحصائيات الطالب (تُستخدم في لوحة الطالب وفي رد submit_task)."""
+    total_score: int = 0
+    graded_count: int = 0
+    accuracy_pct: int = 0
+    ayah_count: int = 0
+    weekly_hifdh_score: int = 0
+    weekly_review_score: int = 0
+    pending_tasks_count: int = 0
+
+
+GRADED = Q(status="graded")
+SUCCESSFUL_RECITATION = GRADED & Q(
+    score__gte=PASS_SCORE, recitation__start_ayah__gt=0, recitation__end_ayah__gt=0
+)
+
+
+def _weekly_avg(model, week_ago):
+    """متوسط درجات الأسبوع كاستعلام فرعي يُلحق بصف StudentProgress."""
+    return Subquery(
+        model.objects.filter(student=OuterRef("student_id"), created_at__gte=week_ago)
+        .filter(GRADED)
+        .values("student")
+        .annotate(avg=Avg("score"))
+        .values("avg")[:1]
+    )
+
+
+# ========= الملخص التراكمي (StudentProgress) =========
+
+def submission_contribution(sub):
+    """
+    مساهمة تسليم واحد في ملخص الطالب: (الدرجة، عدد المصحَّح، عدد الآيات).
+    يطابق تمامًا ما يحسبه compute_student_progress من قاعدة البيانات.
+    """
+    if sub is None or sub.status != "graded":
+        return (0, 0, 0)
+    score = sub.score or 0
+    ayahs = 0
+    if isinstance(sub, RecitationSubmission) and score >= PASS_SCORE:
+        task = sub.recitation
+        if task.start_ayah and task.end_ayah:
+            ayahs = task.end_ayah - task.start_ayah + 1
+    return (score, 1, ayahs)
+
+
+def apply_progress_delta(student_id, before, after):
+    """
+    يطبّق الفرق بين مساهمتين على صف الطالب بتحديث ذرّي واحد (F expressions).
+    لو لم يكن للطالب صف بعد لا نفعل شيئًا؛ سيُبنى كاملًا عند أول قراءة.
+    """
+    delta = [a - b for a, b in zip(after, before)]
+    if not any(delta):
+        return
+    StudentProgress.objects.filter(student_id=student_id).update(
+        total_score=F("total_score") + delta[0],
+        graded_count=F("graded_count") + delta[1],
+        ayah_count=F("ayah_count") + delta[2],
+        updated_at=timezone.now(),
+    )
+
+
+def compute_student_progress(student_ids=None):
+    """
+    يعيد حساب الملخص من التسليمات مباشرة: {student_id: (score, graded, ayahs)}.
+    استعلام مجمّع واحد لكل نوع تسليم مهما كان عدد الطلاب.
+    """
+    totals = {}
+    for model, extra in (
+        (RecitationSubmission, {"ayahs": Sum(
+            F("recitation__end_ayah") - F("recitation__start_ayah") + 1,
+            filter=SUCCESSFUL_RECITATION,
+        )}),
+        (ReviewSubmission, {}),
+    ):
+        qs = model.objects.filter(GRADED)
+        if student_ids is not None:
+            qs = qs.filter(student_id__in=student_ids)
+        rows = qs.values("student_id").annotate(
+            total=Sum("score"), graded=Count("id"), **extra
+        ).order_by()
+        for row in rows:
+            score, graded, ayahs = totals.get(row["student_id"], (0, 0, 0))
+            totals[row["student_id"]] = (
+                score + (row["total"] or 0),
+                graded + row["graded"],
+                ayahs + (row.get("ayahs") or 0),
+            )
+    if student_ids is not None:
+        for sid in student_ids:
+            totals.setdefault(sid, (0, 0, 0))
+    return totals
+
+
+def get_student_progress(student):
+    """قراءة الملخص بمفتاحه الأساسي، مع بنائه لأول مرة إن لم يكن موجودًا."""
+    progress = StudentProgress.objects.filter(student_id=student.pk).first()
+    if progress is None:
+        score, graded, ayahs = compute_student_progress([student.pk])[student.pk]
+        progress, _ = StudentProgress.objects.get_or_create(
+            student_id=student.pk,
+            defaults={"total_score": score, "graded_count": graded, "ayah_count": ayahs},
+        )
+    return progress
+
+
+def count_pending_tasks(student):
+    """
+    عدد المهام المطلوبة من الطالب: مهام حلقته المنشأة بعد انضمامه
+    والتي لم يسلّمها بعد أو رسب فيها (درجة أقل من 5).
+    """
+    if not student.halaqa_id:
+        return 0
+
+    join_date = student.user.date_joined
+    total = 0
+    for task_model, sub_model, fk in (
+        (Recitation, RecitationSubmission, "recitation"),
+        (Review, ReviewSubmission, "review"),
+    ):
+        done = sub_model.objects.filter(**{fk: OuterRef("pk")}, student=student).exclude(
+            status="graded", score__lt=PASS_SCORE
+        )
+        total += task_model.objects.filter(
+            halaqa_id=student.halaqa_id, created_at__gte=join_date
+        ).exclude(Exists(done)).count()
+    return total
+
+
+def get_student_stats(student, now=None, pending_tasks_count=None):
+    """
+    يجمع إحصائيات الطالب في استعلام واحد: الإجماليات من StudentProgress
+    (قراءة بالمفتاح الأساسي) ومتوسطات الأسبوع كاستعلامات فرعية على نفس الصف.
+    لو كان عدد المهام المطلوبة معروفًا مسبقًا (كما في لوحة الطالب) يُمرَّر
+    في pending_tasks_count لتجنّب الاستعلام الإضافي.
+    """
+    now = now or timezone.now()
+    week_ago = now - timedelta(days=7)
+
+    # صف واحد بالمفتاح الأساسي + متوسطات الأسبوع كاستعلامات فرعية في نفس الطلب
+    progress_qs = StudentProgress.objects.filter(student_id=student.pk).annotate(
+        hifdh_avg=_weekly_avg(RecitationSubmission, week_ago),
+        review_avg=_weekly_avg(ReviewSubmission, week_ago),
+    )
+    progress = progress_qs.first()
+    if progress is None:
+        get_student_progress(student)
+        progress = progress_qs.first()
+    hifdh_avg = progress.hifdh_avg or 0
+    review_avg = progress.review_avg or 0
+
+    graded_count = progress.graded_count
+    accuracy_pct = round((progress.total_score / (graded_count * 10)) * 100) if graded_count else 0
+
+    if pending_tasks_count is None:
+        pending_tasks_count = count_pending_tasks(student)
+
+    return StudentStats(
+        total_score=progress.total_score,
+        graded_count=graded_count,
+        accuracy_pct=accuracy_pct,
+        ayah_count=progress.ayah_count,
+        weekly_hifdh_score=round((hifdh_avg / 10) * 100),
+        weekly_review_score=round((review_avg / 10) * 100),
+        pending_tasks_count=pending_tasks_count,
+    )
+
+
+# ========= إحصائيات الحلقات (لوحة المعلم، صفحة الحلقات، تفاصيل الحلقة) =========
+
+@dataclass(frozen=True)
+class TeacherOverview:
+    """كروت لوحة المعلم العلوية (تُعاد أيضًا من grade_submission)."""
+    pending_submissions_count: int = 0
+    total_students_count: int = 0
+    active_halaqat_count: int = 0
+    average_performance: float = 0
+
+    def as_dict(self):
+        return {
+            "pending_submissions_count": self.pending_submissions_count,
+            "total_students_count": self.total_students_count,
+            "active_halaqat_count": self.active_halaqat_count,
+            "average_performance": self.average_performance,
+        }
+
+
+def _scalar(qs, group_by, value):
+    """استعلام فرعي مرتبط يعيد قيمة تجميعية واحدة لكل حلقة."""
+    return Subquery(
+        qs.order_by().values(group_by).annotate(v=value).values("v")[:1]
+    )
+
+
+def _count(qs, group_by):
+    return Coalesce(_scalar(qs, group_by, Count("pk")), 0, output_field=IntegerField())
+
+
+def with_halaqa_stats(halaqat):
+    """
+    يضيف لكل حلقة في الاستعلام: عدد الطلاب، التسليمات المعلقة، مجموع/عدد درجات
+    التسميع المصححة (لحساب المتوسط)، وتاريخ آخر تسميع/مراجعة.
+    كل ذلك كاستعلامات فرعية داخل SELECT واحد مهما كان عدد الحلقات.
+    """
+    halaqa = OuterRef("pk")
+    graded_recitations = RecitationSubmission.objects.filter(recitation__halaqa=halaqa, status="graded")
+    return halaqat.annotate(
+        student_count=_count(
+            Profile.objects.filter(halaqa=halaqa, role=Profile.ROLE_STUDENT), "halaqa"
+        ),
+        pending_count=(
+            _count(RecitationSubmission.objects.filter(recitation__halaqa=halaqa, status="submitted"),
+                   "recitation__halaqa")
+            + _count(ReviewSubmission.objects.filter(review__halaqa=halaqa, status="submitted"),
+                     "review__halaqa")
+        ),
+        graded_count=_count(graded_recitations, "recitation__halaqa"),
+        graded_score_sum=Coalesce(
+            _scalar(graded_recitations, "recitation__halaqa", Sum("score")), 0,
+            output_field=IntegerField(),
+        ),
+        last_recitation_date=_scalar(Recitation.objects.filter(halaqa=halaqa), "halaqa", Max("created_at")),
+        last_review_date=_scalar(Review.objects.filter(halaqa=halaqa), "halaqa", Max("created_at")),
+    )
+
+
+def halaqa_avg_performance(halaqa):
+    """متوسط درجات التسميع المصححة للحلقة كنسبة مئوية (الدرجة من 10)."""
+    if not halaqa.graded_count:
+        return 0
+    return round((halaqa.graded_score_sum / halaqa.graded_count) * 10, 1)
+
+
+def get_teacher_overview(halaqat):
+    """
+    يحسب كروت لوحة المعلم من حلقات مُعلَّمة مسبقًا بـ with_halaqa_stats
+    (قائمة أو استعلام) بدون أي استعلام إضافي.
+    """
+    halaqat = list(halaqat)
+    graded_count = sum(h.graded_count for h in halaqat)
+    score_sum = sum(h.graded_score_sum for h in halaqat)
+    return TeacherOverview(
+        pending_submissions_count=sum(h.pending_count for h in halaqat),
+        total_students_count=sum(h.student_count for h in halaqat),
+        active_halaqat_count=len(halaqat),
+        average_performance=round((score_sum / graded_count) * 10, 1) if graded_count else 0,
+    )
+
+
+# ========= مصفوفة طالب × مهمة (StudentTaskStatus) =========
+
+# نوع المهمة → (موديل المهمة، موديل التسليم)
+TASK_KINDS = {
+    "recitation": (Recitation, RecitationSubmission),
+    "review": (Review, ReviewSubmission),
+}
+
+
+def task_kind(obj):
+    """نوع المهمة ("recitation" أو "review") من مهمة أو تسليم."""
+    return "recitation" if isinstance(obj, (Recitation, RecitationSubmission)) else "review"
+
+
+def task_status_for(submission, deadline, now=None):
+    """
+    (الحالة، الدرجة) لمهمة طالب حسب تسليمه إن وجد (status, score) وموعدها النهائي.
+    "متأخرة" = لم يسلّم ومر الموعد النهائي (كما كانت تحسبها صفحة تفاصيل الحلقة).
+    """
+    if submission is not None:
+        status, score = submission
+        if status == "graded":
+            return StudentTaskStatus.STATUS_GRADED, score
+        return StudentTaskStatus.STATUS_SUBMITTED, None
+    if deadline and deadline < (now or timezone.now()):
+        return StudentTaskStatus.STATUS_LATE, None
+    return StudentTaskStatus.STATUS_ASSIGNED, None
+
+
+def _build_task_statuses(kind, tasks, student_ids, now):
+    """صفوف المصفوفة لمجموعة مهام من نفس النوع × مجموعة طلاب (بدون حفظ)."""
+    _, sub_model = TASK_KINDS[kind]
+    if not tasks or not student_ids:
+        return []
+    subs = {
+        (student_id, task_id): (status, score)
+        for student_id, task_id, status, score in sub_model.objects.filter(
+            **{f"{kind}__in": [t.id for t in tasks]}, student_id__in=student_ids
+        ).values_list("student_id", f"{kind}_id", "status", "score")
+    }
+    rows = []
+    for task in tasks:
+        for student_id in student_ids:
+            status, score = task_status_for(subs.get((student_id, task.id)), task.deadline, now)
+            rows.append(StudentTaskStatus(
+                halaqa_id=task.halaqa_id, student_id=student_id,
+                status=status, score=score, deadline=task.deadline,
+                **{f"{kind}_id": task.id},
+            ))
+    return rows
+
+
+def _halaqa_student_ids(halaqa_id):
+    return list(Profile.objects.filter(
+        halaqa_id=halaqa_id, role=Profile.ROLE_STUDENT
+    ).values_list("id", flat=True))
+
+
+def rebuild_task_statuses_for_task(task, now=None):
+    """عند إنشاء/تعديل مهمة: صف لكل طالب في حلقتها (bulk_create واحد)."""
+    kind = task_kind(task)
+    StudentTaskStatus.objects.filter(**{kind: task}).delete()
+    StudentTaskStatus.objects.bulk_create(
+        _build_task_statuses(kind, [task], _halaqa_student_ids(task.halaqa_id), now or timezone.now()),
+        batch_size=500,
+    )
+
+
+def rebuild_task_statuses_for_student(student, now=None):
+    """عند انضمام الطالب لحلقة أو انتقاله منها: صفوفه تتبع حلقته الحالية فقط."""
+    now = now or timezone.now()
+    StudentTaskStatus.objects.filter(student=student).delete()
+    if not student.halaqa_id or student.role != Profile.ROLE_STUDENT:
+        return
+    rows = []
+    for kind, (task_model, _) in TASK_KINDS.items():
+        tasks = list(task_model.objects.filter(halaqa_id=student.halaqa_id).only("id", "halaqa_id", "deadline"))
+        rows += _build_task_statuses(kind, tasks, [student.pk], now)
+    StudentTaskStatus.objects.bulk_create(rows, batch_size=500)
+
+
+def rebuild_task_statuses_for_halaqa(halaqa_id, now=None):
+    """إعادة بناء مصفوفة حلقة كاملة (أمر rebuild_task_matrix). يعيد عدد الصفوف."""
+    now = now or timezone.now()
+    student_ids = _halaqa_student_ids(halaqa_id)
+    StudentTaskStatus.objects.filter(halaqa_id=halaqa_id).delete()
+    created = 0
+    for kind, (task_model, _) in TASK_KINDS.items():
+        tasks = list(task_model.objects.filter(halaqa_id=halaqa_id).only("id", "halaqa_id", "deadline"))
+        created += len(StudentTaskStatus.objects.bulk_create(
+            _build_task_statuses(kind, tasks, student_ids, now), batch_size=500
+        ))
+    return created
+
+
+def record_submission_status(sub):
+    """بعد حفظ تسليم: تحديث خانته في المصفوفة (أو إنشاؤها إن لم تكن موجودة)."""
+    kind = task_kind(sub)
+    status, score = task_status_for((sub.status, sub.score), None)
+    updated = StudentTaskStatus.objects.filter(
+        student_id=sub.student_id, **{f"{kind}_id": getattr(sub, f"{kind}_id")}
+    ).update(status=status, score=score, updated_at=timezone.now())
+    if not updated:
+        task = getattr(sub, kind)
+        StudentTaskStatus.objects.get_or_create(
+            student_id=sub.student_id, **{kind: task},
+            defaults={"halaqa_id": task.halaqa_id, "status": status, "score": score, "deadline": task.deadline},
+        )
+
+
+def clear_submission_status(sub, now=None):
+    """بعد حذف تسليم (إعادة المحاولة): ترجع المهمة مطلوبة أو متأخرة حسب موعدها."""
+    kind = task_kind(sub)
+    now = now or timezone.now()
+    StudentTaskStatus.objects.filter(
+        student_id=sub.student_id, **{f"{kind}_id": getattr(sub, f"{kind}_id")}
+    ).update(
+        status=Case(
+            When(deadline__lt=now, then=Value(StudentTaskStatus.STATUS_LATE)),
+            default=Value(StudentTaskStatus.STATUS_ASSIGNED),
+        ),
+        score=None,
+        updated_at=now,
+    )
+
+
+def halaqa_student_task_stats(halaqa, now=None):
+    """
+    {student_id: (عدد مهام التسميع المتأخرة، متوسط درجات التسميع المصححة)}
+    من مصفوفة الحلقة في استعلام مجمّع واحد على الفهرس (halaqa, student, status).
+    الصفوف "المطلوبة" التي فات موعدها تُحسب متأخرة حتى لو لم يمر عليها أمر التحديث بعد.
+    """
+    now = now or timezone.now()
+    recitations = Q(recitation__isnull=False)
+    late = Q(status=StudentTaskStatus.STATUS_LATE) | Q(
+        status=StudentTaskStatus.STATUS_ASSIGNED, deadline__lt=now
+    )
+    rows = StudentTaskStatus.objects.filter(halaqa=halaqa).values("student_id").annotate(
+        late=Count("pk", filter=recitations & late),
+        avg=Avg("score", filter=recitations & Q(status=StudentTaskStatus.STATUS_GRADED)),
+    ).order_by()
+    return {row["student_id"]: (row["late"], row["avg"]) for row in rows}
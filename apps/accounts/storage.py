@@ -0,0 +1,129 @@
+# apps/accounts/storage.py
+import hashlib
+import posixpath
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.urls import reverse
+from django.utils import timezone
+
+BLOB_PREFIX = "blobs/"
+DIRECT_MEDIA_SALT = "accounts.direct_media"
+
+
+def is_blob_name(name):
+    return bool(name) and name.startswith(BLOB_PREFIX)
+
+
+def blob_name(digest, ext=""):
+    return f"{BLOB_PREFIX}{digest[:2]}/{digest[2:4]}/{digest}{ext.lower()}"
+
+
+class ContentAddressedMixin:
+    """
+    تخزين بعنوان المحتوى: اسم الملف هو SHA-256 لمحتواه، فالتسجيل المكرر يُحفظ مرة واحدة.
+    الحذف العادي لا يمس ملفات blobs (قد يشير للملف أكثر من تسليم)؛ العدّاد في AudioBlob
+    وأمر gc_audio_blobs هما من يحذفانها. الأسماء القديمة (submissions/...) تُقرأ وتُحذف كالمعتاد.
+    """
+
+    def save(self, name, content, max_length=None):
+        # استيراد متأخر: الحقل FileField ينشئ التخزين أثناء تحميل models نفسها
+        from .models import AudioBlob
+
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        sha = hashlib.sha256()
+        for chunk in content.chunks():
+            sha.update(chunk)
+        digest = sha.hexdigest()
+        target = blob_name(digest, posixpath.splitext(name)[1])
+
+        existing = AudioBlob.objects.filter(name=target)
+        if existing.exists() and self.exists(target):
+            # blob بلا مراجع سيشير إليه تسليم بعد لحظات: نؤجل جمعه (انظر gc_audio_blobs)
+            existing.filter(refcount=0).update(unreferenced_at=timezone.now())
+            return target
+        content.seek(0)
+        if not self.exists(target):
+            target = super().save(target, content, max_length)
+        self.register(target, digest, content.size)
+        return target
+
+    def register(self, name, digest, size):
+        """صف AudioBlob لملف وصل للتخزين بدون save (الرفع المباشر بروابط موقّعة)."""
+        from .models import AudioBlob
+
+        AudioBlob.objects.get_or_create(
+            name=name, defaults={"sha256": digest, "size": size, "unreferenced_at": timezone.now()},
+        )
+
+    def delete(self, name):
+        if not is_blob_name(name):
+            super().delete(name)
+
+    def purge(self, name):
+        """حذف فعلي لملف blob (يستدعيه gc_audio_blobs فقط)."""
+        super().delete(name)
+
+
+class ContentAddressedFileSystemStorage(ContentAddressedMixin, FileSystemStorage):
+    pass
+
+
+# ========= الروابط الموقّعة (رفع وتنزيل مباشر من/إلى التخزين) =========
+#
+# التخزين الذي يدعمها يعرّف:
+#   direct_upload(name, size, content_type, sha256, expires) -> {"url", "method", "headers"}
+#   direct_download_url(name, expires, content_type=None) -> str
+# (انظر storage_s3.py). غيره تمر ملفاته عبر Django (serve_media والرفع المقسّم).
+
+def direct_upload(storage, name, size, content_type, sha256):
+    method = getattr(storage, "direct_upload", None)
+    if method is None:
+        return None
+    return method(name, size, content_type, sha256, settings.MEDIA_PRESIGNED_EXPIRES)
+
+
+def direct_download_url(storage, name, content_type=None):
+    method = getattr(storage, "direct_download_url", None)
+    if method is None:
+        return None
+    return method(name, settings.MEDIA_PRESIGNED_EXPIRES, content_type)
+
+
+class SignedURLFileSystemStorage(FileSystemStorage):
+    """
+    بديل محلي لتخزين S3 (للتطوير والاختبار): نفس واجهة الروابط الموقّعة، لكن الرابط
+    يشير إلى view direct_media الذي يتحقق من التوقيع ثم يكتب/يقرأ من القرص.
+    """
+
+    def _signed_url(self, payload, expires):
+        payload["exp"] = int(time.time()) + expires
+        return reverse("accounts:direct_media", args=[signing.dumps(payload, salt=DIRECT_MEDIA_SALT)])
+
+    def direct_upload(self, name, size, content_type, sha256, expires):
+        url = self._signed_url({"n": name, "m": "PUT", "s": size, "h": sha256}, expires)
+        return {"url": url, "method": "PUT", "headers": {"Content-Type": content_type}}
+
+    def direct_download_url(self, name, expires, content_type=None):
+        return self._signed_url({"n": name, "m": "GET", "t": content_type or ""}, expires)
+
+
+def unsign_direct_media(token):
+    """محتوى رابط SignedURLFileSystemStorage، أو None لو التوقيع غير صحيح أو انتهت صلاحيته."""
+    try:
+        payload = signing.loads(token, salt=DIRECT_MEDIA_SALT)
+    except signing.BadSignature:
+        return None
+    if payload.get("exp", 0) < time.time():
+        return None
+    return payload
+
+
+class ContentAddressedSignedFileSystemStorage(ContentAddressedMixin, SignedURLFileSystemStorage):
+    pass
@@ -0,0 +1,43 @@
+# apps/accounts/storage_s3.py
+# يحتاج django-storages و boto3 (pip install "django-storages[s3]")؛ يُستورد فقط لو MEDIA_STORAGE=s3
+import base64
+
+from storages.backends.s3 import S3Storage
+from storages.utils import clean_name
+
+from .storage import ContentAddressedMixin
+
+
+class PresignedS3Storage(S3Storage):
+    """
+    S3 أو أي خدمة متوافقة (MinIO، R2، ...) مع روابط موقّعة: المتصفح يرفع التسجيل
+    ويشغّله من الـ bucket مباشرة، ولا تمر البايتات عبر Django.
+    """
+
+    def direct_upload(self, name, size, content_type, sha256, expires):
+        # S3 يرفض الملف لو لم يطابق الـ checksum الموقّع، فلا حاجة لإعادة قراءته عندنا
+        checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+        url = self.connection.meta.client.generate_presigned_url(
+            "put_object",
+            Params={
+                "Bucket": self.bucket_name,
+                "Key": self._normalize_name(clean_name(name)),
+                "ContentType": content_type,
+                "ChecksumSHA256": checksum,
+            },
+            ExpiresIn=expires,
+            HttpMethod="PUT",
+        )
+        return {
+            "url": url,
+            "method": "PUT",
+            "headers": {"Content-Type": content_type, "x-amz-checksum-sha256": checksum},
+        }
+
+    def direct_download_url(self, name, expires, content_type=None):
+        parameters = {"ResponseContentType": content_type} if content_type else None
+        return self.url(name, parameters=parameters, expire=expires)
+
+
+class ContentAddressedS3Storage(ContentAddressedMixin, PresignedS3Storage):
+    pass
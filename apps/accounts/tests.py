@@ -0,0 +1,124 @@
+import json
+import random
+
+from django.test import SimpleTestCase
+
+from .uploads import AudioStreamValidator, UploadError
+
+UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+# بايتات تشبه TimecodeScale وCluster+Timecode بقيم ضخمة، كما تظهر بالصدفة داخل صوت Opus
+LOOKALIKE_IDS = b"\x2a\xd7\xb1\x88" + b"\xff" * 8 + b"\x1f\x43\xb6\x75\x81\xe7\x88" + b"\xff" * 8
+
+
+def element(element_id, payload, unknown=False):
+    size = UNKNOWN_SIZE if unknown else b"\x01" + len(payload).to_bytes(7, "big")
+    return element_id + size + payload
+
+
+def webm(seconds, timecode_scale=b"\x0f\x42\x40", bytes_per_second=16_000, seed=0):
+    """WebM صناعي كتسجيل MediaRecorder: Segment وClusters بحجم غير معروف، Cluster لكل ثانية."""
+    rng = random.Random(seed)
+    blocks_per_cluster = 50
+    block_size = bytes_per_second // blocks_per_cluster
+    header = element(b"\x1a\x45\xdf\xa3", element(b"\x42\x82", b"webm"))
+    info = element(b"\x15\x49\xa9\x66", element(b"\x2a\xd7\xb1", timecode_scale) + element(b"\x4d\x80", b"test"))
+    tracks = element(b"\x16\x54\xae\x6b", element(b"\xae", b"\x00" * 40))
+    clusters = []
+    for second in range(seconds):
+        blocks = b""
+        for i in range(blocks_per_cluster):
+            payload = bytearray(rng.randbytes(block_size))
+            if i % 10 == 0:
+                payload[20:20 + len(LOOKALIKE_IDS)] = LOOKALIKE_IDS
+            blocks += element(b"\xa3", bytes(payload))
+        clusters.append(b"\x1f\x43\xb6\x75" + UNKNOWN_SIZE + element(b"\xe7", (second * 1000).to_bytes(4, "big")) + blocks)
+    return header + b"\x18\x53\x80\x67" + UNKNOWN_SIZE + info + tracks + b"".join(clusters)
+
+
+def chunks(data, size):
+    return [data[i:i + size] for i in range(0, len(data), size)]
+
+
+class AudioStreamValidatorWebMTests(SimpleTestCase):
+
+    def feed_all(self, data, max_seconds, chunk_size):
+        validator = AudioStreamValidator(max_seconds)
+        for chunk in chunks(data, chunk_size):
+            validator.feed(chunk)
+        validator.finish()
+        return validator
+
+    def test_duration_ignores_lookalike_ids_in_payload(self):
+        for seed in range(5):
+            data = webm(300, seed=seed)
+            for chunk_size in (512 * 1024, 1000, 7):
+                validator = self.feed_all(data, 600, chunk_size)
+                self.assertEqual(validator.format, "webm")
+                self.assertAlmostEqual(validator.duration, 299.0)
+
+    def test_too_long_is_rejected(self):
+        with self.assertRaises(UploadError) as ctx:
+            self.feed_all(webm(130), 120, 64 * 1024)
+        self.assertEqual(ctx.exception.status, 413)
+
+    def test_timecode_scale_from_info(self):
+        # وحدة توقيت 2ms: Timecode 1000 = ثانيتان
+        validator = self.feed_all(webm(10, timecode_scale=b"\x1e\x84\x80"), 600, 4096)
+        self.assertAlmostEqual(validator.duration, 18.0)
+
+    def test_timecode_scale_over_8_bytes_is_rejected(self):
+        with self.assertRaises(UploadError) as ctx:
+            self.feed_all(webm(3, timecode_scale=b"\x00" * 6 + b"\x0f\x42\x40"), 600, 4096)
+        self.assertEqual(ctx.exception.status, 415)
+
+    def test_chunked_resume_with_saved_state(self):
+        """كما في append_chunk: فاحص جديد لكل جزء يستأنف من أول بايتات الملف والحالة المحفوظة."""
+        data = webm(200, seed=3)
+        head, state, offset = data[:64], None, 0
+        for chunk in chunks(data, 512 * 1024 + 13):
+            validator = AudioStreamValidator(600)
+            if offset:
+                validator.resume(head, offset, state)
+            validator.feed(chunk)
+            offset += len(chunk)
+            state = json.loads(json.dumps(validator.state()))
+        validator.finish()
+        self.assertAlmostEqual(validator.duration, 199.0)
+
+    def test_resume_without_state_checks_size_only(self):
+        data = webm(20)
+        validator = AudioStreamValidator(600)
+        validator.resume(data[:64], 10_000)
+        validator.feed(data[10_000:])
+        validator.finish()
+        self.assertEqual(validator.duration, 0.0)
+
+
+class AudioStreamValidatorFormatTests(SimpleTestCase):
+
+    def test_ogg_opus_duration_from_granules(self):
+        opus_head = b"OpusHead\x01\x01" + (312).to_bytes(2, "little") + b"\x80\xbb\x00\x00\x00\x00\x00"
+        pages = b"OggS\x00\x02" + (0).to_bytes(8, "little") + b"\x00" * 12 + opus_head
+        for second in range(1, 31):
+            pages += b"OggS\x00\x00" + (second * 48000 + 312).to_bytes(8, "little") + b"\x00" * 12 + b"\x55" * 2000
+        validator = AudioStreamValidator(600)
+        for chunk in chunks(pages, 997):
+            validator.feed(chunk)
+        validator.finish()
+        self.assertEqual(validator.format, "ogg")
+        self.assertAlmostEqual(validator.duration, 30.0)
+
+    def test_wav_duration_from_byte_rate(self):
+        header = (b"RIFF" + b"\x00" * 4 + b"WAVE" + b"fmt " + (16).to_bytes(4, "little")
+                  + b"\x01\x00\x01\x00" + (16000).to_bytes(4, "little") + (32000).to_bytes(4, "little")
+                  + b"\x02\x00\x10\x00" + b"data" + b"\x00" * 4)
+        validator = AudioStreamValidator(600)
+        validator.feed(header + b"\x00" * 32000 * 5)
+        validator.finish()
+        self.assertAlmostEqual(validator.duration, 5.0)
+
+    def test_unknown_format_is_rejected(self):
+        validator = AudioStreamValidator(600)
+        with self.assertRaises(UploadError) as ctx:
+            validator.feed(b"%PDF-1.7\n" + b"\x00" * 100)
+        self.assertEqual(ctx.exception.status, 415)
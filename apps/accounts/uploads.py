@@ -0,0 +1,564 @@
+# apps/accounts/uploads.py
+import hashlib
+import io
+import posixpath
+import re
+import uuid
+
+from django.conf import settings
+from django.core import signing
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadhandler import FileUploadHandler, StopUpload
+from django.db import transaction
+
+from .media import AUDIO_CONTENT_TYPES
+from .models import UploadSession
+from .stats import TASK_KINDS
+from .storage import blob_name, direct_upload
+
+# حجم الجزء الموصى به للعميل، وأقصى حجم مقبول لجزء واحد
+# (أقل من DATA_UPLOAD_MAX_MEMORY_SIZE لأن الجزء يُقرأ من request.body)
+UPLOAD_CHUNK_SIZE = 512 * 1024
+UPLOAD_MAX_CHUNK_SIZE = 2 * 1024 * 1024
+UPLOAD_MAX_SIZE = 200 * 1024 * 1024
+
+# تذكرة الرفع المباشر صالحة لإنهاء الرفع خلال هذه المدة (ثوانٍ)
+DIRECT_UPLOAD_TICKET_AGE = 6 * 3600
+DIRECT_UPLOAD_SALT = "accounts.direct_upload"
+_SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+# نوع المحتوى → الامتداد (أول امتداد لكل نوع في AUDIO_CONTENT_TYPES)
+_AUDIO_EXTENSIONS = {}
+for _ext, _type in AUDIO_CONTENT_TYPES.items():
+    _AUDIO_EXTENSIONS.setdefault(_type, _ext)
+
+
+class UploadError(ValueError):
+    """خطأ في بروتوكول الرفع؛ الرسالة تُعرض للمستخدم كما هي."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+# ========= التحقق من التسجيل أثناء وصوله =========
+
+# حد مدة التسجيل للمهمة: AUDIO_BASE_SECONDS + عدد الآيات × AUDIO_SECONDS_PER_AYAH
+# (بحد أقصى AUDIO_MAX_DURATION، وهو الحد نفسه للمهام بلا نطاق آيات)
+AUDIO_BASE_SECONDS = 120
+AUDIO_SECONDS_PER_AYAH = 45
+# أعلى معدل بايت معقول لكل صيغة، لتحويل حد المدة إلى حد للحجم يُطبق قبل وصول الملف
+AUDIO_MAX_BYTES_PER_SECOND = {
+    "wav": 192_000,  # PCM 16-bit ستيريو 48kHz
+    "webm": 40_000, "ogg": 40_000, "mp4": 40_000, "mp3": 40_000,  # 320 kbps
+}
+_SNIFF_BYTES = 64
+_OGG_NO_GRANULE = 2 ** 64 - 1
+# عناصر Matroska/WebM التي يقرؤها الفاحص (ID بعلامة طوله كما في الملف)
+_MKV_SEGMENT = 0x18538067
+_MKV_INFO = 0x1549A966
+_MKV_TIMECODE_SCALE = 0x2AD7B1
+_MKV_CLUSTER = 0x1F43B675
+_MKV_TIMECODE = 0xE7
+# يُدخل إليها بدل تخطيها (حجم Segment وCluster "غير معروف" في تسجيلات MediaRecorder)
+_MKV_CONTAINERS = {_MKV_SEGMENT, _MKV_INFO, _MKV_CLUSTER}
+
+
+def max_duration_for_task(task):
+    """أقصى مدة مقبولة (ثوانٍ) لتسجيل المهمة حسب نطاق الآيات."""
+    limit = settings.AUDIO_MAX_DURATION
+    if task.start_ayah and task.end_ayah and task.end_ayah >= task.start_ayah:
+        ayahs = task.end_ayah - task.start_ayah + 1
+        limit = min(limit, AUDIO_BASE_SECONDS + ayahs * AUDIO_SECONDS_PER_AYAH)
+    return limit
+
+
+def sniff_audio_format(head):
+    """الصيغة من أول بايتات الملف (magic bytes)، أو None لو ليست تسجيلًا صوتيًا نعرفه."""
+    if head[:4] == b"\x1aE\xdf\xa3":
+        return "webm"
+    if head[:4] == b"OggS":
+        return "ogg"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "wav"
+    if head[4:8] == b"ftyp":
+        return "mp4"
+    if head[:3] == b"ID3" or (len(head) > 1 and head[0] == 0xFF and head[1] & 0xE0 == 0xE0):
+        return "mp3"
+    return None
+
+
+def _ebml_vint(buf, pos):
+    """عدد EBML متغير الطول عند pos: (القيمة، موضع ما بعده) أو (None, pos) لو ناقص."""
+    if pos >= len(buf) or buf[pos] == 0:
+        return None, pos
+    length = 9 - buf[pos].bit_length()
+    if pos + length > len(buf):
+        return None, pos
+    value = buf[pos] & ((1 << (8 - length)) - 1)
+    for b in buf[pos + 1:pos + length]:
+        value = (value << 8) | b
+    return value, pos + length
+
+
+def _ebml_id(buf, pos):
+    """ID عنصر EBML عند pos بعلامة طوله (1-4 بايت): (ID، موضع ما بعده) أو (None, pos) لو ناقص."""
+    if pos >= len(buf):
+        return None, pos
+    length = 9 - buf[pos].bit_length()
+    if length > 4:
+        raise UploadError("ملف WebM تالف.", status=415)
+    if pos + length > len(buf):
+        return None, pos
+    return int.from_bytes(buf[pos:pos + length], "big"), pos + length
+
+
+class AudioStreamValidator:
+    """
+    يفحص التسجيل أثناء وصوله دون الاحتفاظ به: الصيغة من أول البايتات، والحجم،
+    والمدة من رؤوس الحاوية (granule في صفحات Ogg، توقيت الـ Clusters في WebM،
+    معدل البايت في ترويسة WAV). يرفع UploadError عند أول مخالفة، فيتوقف الرفع
+    قبل أن يُكتب الملف كاملًا. MP3/MP4 يُتحقق من حجمهما فقط.
+
+    WebM يُقرأ عنصرًا عنصرًا من أول الملف ويُتخطى محتوى ما سواها (الصوت نفسه)، فلا
+    تُقرأ بايتات داخل الـ payload تشبه ID عنصر بالصدفة. للرفع المقسّم تُحفظ حالة
+    القراءة بين الأجزاء (state/resume).
+    """
+
+    def __init__(self, max_seconds, declared_size=None):
+        self.max_seconds = max_seconds
+        self.max_size = min(UPLOAD_MAX_SIZE, int(max_seconds * max(AUDIO_MAX_BYTES_PER_SECOND.values())))
+        self.format = None
+        self.received = 0
+        self.duration = 0.0
+        self._head = b""
+        self._early = b""  # ما وصل قبل معرفة الصيغة
+        # بايتات من آخر الجزء السابق: رأس صفحة Ogg أو رأس عنصر WebM انقسم بين جزأين
+        self._pending = b""
+        self._rate = None  # بايت/ثانية لـ WAV، عينة/ثانية لـ granule في Ogg
+        self._pre_skip = 0
+        self._timecode_scale = 1_000_000  # نانوثانية لكل وحدة توقيت (الافتراضي في Matroska)
+        self._skip = 0  # ما بقي من محتوى عنصر WebM يُتخطى
+        self._clusters = False  # وصلنا لأول Cluster: TimecodeScale بعده لا يُقرأ
+        self._lost = False  # تعذر تتبع عناصر WebM: يُكتفى بحد الحجم
+        if declared_size is not None:
+            self._check_size(declared_size)
+
+    def _check_size(self, size):
+        if size > self.max_size:
+            raise UploadError(f"حجم التسجيل أكبر من المسموح لهذه المهمة ({self.max_size // (1024 * 1024)} MB).",
+                              status=413)
+
+    def state(self):
+        """حالة القراءة بعد آخر جزء (JSON) لتُمرر إلى resume مع الجزء التالي."""
+        return {
+            "duration": self.duration, "pending": self._pending.hex(), "skip": self._skip,
+            "timecode_scale": self._timecode_scale, "clusters": self._clusters, "lost": self._lost,
+        }
+
+    def resume(self, head, received, state=None):
+        """لمتابعة رفع مقسّم: أول بايتات الملف وعدد ما وصل قبل هذا الجزء وحالة state()."""
+        self.feed(head[:_SNIFF_BYTES])
+        self.received = received
+        if not state:
+            # جلسة بلا حالة محفوظة: لا نعرف موضع العنصر التالي في WebM
+            self._pending, self._lost = b"", self.format == "webm"
+            return
+        self.duration = state["duration"]
+        self._pending = bytes.fromhex(state["pending"])
+        self._skip = state["skip"]
+        self._timecode_scale = state["timecode_scale"]
+        self._clusters = state["clusters"]
+        self._lost = state["lost"]
+
+    def feed(self, data):
+        self.received += len(data)
+        self._check_size(self.received)
+        if self.format is None:
+            self._early += data
+            self._head = self._early[:_SNIFF_BYTES]
+            if len(self._early) < 12:
+                return
+            self._detect()
+            data, self._early = self._early, b""
+        self._scan(data)
+        if self.duration > self.max_seconds + 1:
+            raise UploadError(f"التسجيل أطول من المسموح لهذه المهمة ({self.max_seconds // 60}:{self.max_seconds % 60:02d} دقيقة).", status=413)
+
+    def finish(self, size=None):
+        """بعد آخر جزء (أو لملف وصل للتخزين مباشرة بحجم size)."""
+        if size is not None:
+            self.received = size
+            self._check_size(size)
+        if self.format is None:
+            raise UploadError("صيغة الملف غير مدعومة؛ المطلوب تسجيل صوتي.", status=415)
+        self._scan(b"")
+        if self.duration > self.max_seconds + 1:
+            raise UploadError(f"التسجيل أطول من المسموح لهذه المهمة ({self.max_seconds // 60}:{self.max_seconds % 60:02d} دقيقة).", status=413)
+
+    def _detect(self):
+        head = self._head
+        self.format = sniff_audio_format(head)
+        if self.format is None:
+            raise UploadError("صيغة الملف غير مدعومة؛ المطلوب تسجيل صوتي.", status=415)
+        self.max_size = min(self.max_size, int(self.max_seconds * AUDIO_MAX_BYTES_PER_SECOND[self.format]) + 65536)
+        self._check_size(self.received)
+        if self.format == "wav":
+            fmt = head.find(b"fmt ")
+            if fmt >= 0 and len(head) >= fmt + 20:
+                self._rate = int.from_bytes(head[fmt + 16:fmt + 20], "little") or None
+        elif self.format == "ogg":
+            opus = head.find(b"OpusHead")
+            vorbis = head.find(b"\x01vorbis")
+            if opus >= 0 and len(head) >= opus + 12:
+                self._rate = 48000  # granule في Opus دائمًا بعينات 48kHz
+                self._pre_skip = int.from_bytes(head[opus + 10:opus + 12], "little")
+            elif vorbis >= 0 and len(head) >= vorbis + 16:
+                self._rate = int.from_bytes(head[vorbis + 12:vorbis + 16], "little") or None
+
+    def _scan(self, data):
+        if self.format == "wav" and self._rate:
+            self.duration = max(self.received - 44, 0) / self._rate
+        elif self.format == "ogg" and self._rate:
+            buf = self._pending + data
+            self._pending = buf[-32:]
+            pos = buf.find(b"OggS")
+            while 0 <= pos <= len(buf) - 14:
+                granule = int.from_bytes(buf[pos + 6:pos + 14], "little")
+                if granule != _OGG_NO_GRANULE:
+                    self.duration = max(self.duration, (granule - self._pre_skip) / self._rate)
+                pos = buf.find(b"OggS", pos + 4)
+        elif self.format == "webm" and not self._lost:
+            self._walk_webm(self._pending + data)
+
+    def _walk_webm(self, buf):
+        """
+        يمر على عناصر WebM بالتتابع: يدخل Segment/Info/Cluster، ويقرأ TimecodeScale
+        (من Info قبل أول Cluster) وTimecode كل Cluster، ويتخطى محتوى ما سواها.
+        """
+        pos = 0
+        while True:
+            if self._skip:
+                step = min(self._skip, len(buf) - pos)
+                pos += step
+                self._skip -= step
+                if self._skip:
+                    break
+            element_id, at = _ebml_id(buf, pos)
+            if element_id is None:
+                break
+            if at < len(buf) and buf[at] == 0:
+                raise UploadError("ملف WebM تالف.", status=415)
+            size, data_at = _ebml_vint(buf, at)
+            if size is None:
+                break
+            unknown = size == (1 << 7 * (data_at - at)) - 1
+
+            if element_id in _MKV_CONTAINERS:
+                self._clusters = self._clusters or element_id == _MKV_CLUSTER
+                pos = data_at
+            elif element_id in (_MKV_TIMECODE_SCALE, _MKV_TIMECODE):
+                if unknown or not 0 < size <= 8:
+                    raise UploadError("ملف WebM تالف.", status=415)
+                if data_at + size > len(buf):
+                    break
+                value = int.from_bytes(buf[data_at:data_at + size], "big")
+                if element_id == _MKV_TIMECODE:
+                    self.duration = max(self.duration, value * self._timecode_scale / 1e9)
+                elif not self._clusters:
+                    self._timecode_scale = value or self._timecode_scale
+                pos = data_at + size
+            elif unknown:
+                # عنصر غير معروف الحجم لا ندخله: لا يمكن معرفة ما بعده
+                self._lost = True
+                break
+            else:
+                self._skip = size
+                pos = data_at
+        self._pending = buf[pos:]
+
+
+class AudioUploadHandler(FileUploadHandler):
+    """
+    معالج رفع Django يمرر أجزاء حقل audio على AudioStreamValidator قبل أن يكتبها
+    المعالج التالي على القرص، ويوقف قراءة الطلب عند أول مخالفة.
+    يجب إضافته قبل أي قراءة لـ request.POST/FILES (انظر submit_task). الخطأ في error.
+    """
+
+    def __init__(self, request, max_seconds, field_name="audio"):
+        super().__init__(request)
+        self.max_seconds = max_seconds
+        self.audio_field = field_name
+        self.validator = None
+        self.error = None
+
+    def _fail(self, error):
+        self.error = error
+        raise StopUpload(connection_reset=True)
+
+    def handle_raw_input(self, input_data, META, content_length, boundary, encoding=None):
+        # حجم الطلب كله معروف من Content-Length قبل قراءة أي بايت
+        try:
+            AudioStreamValidator(self.max_seconds, declared_size=content_length - 64 * 1024)
+        except UploadError as e:
+            self.error = e
+
+    def new_file(self, field_name, *args, **kwargs):
+        super().new_file(field_name, *args, **kwargs)
+        if self.error is not None:
+            raise StopUpload(connection_reset=True)
+        self.validator = AudioStreamValidator(self.max_seconds) if field_name == self.audio_field else None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.validator is not None:
+            try:
+                self.validator.feed(raw_data)
+            except UploadError as e:
+                self._fail(e)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.validator is not None:
+            try:
+                self.validator.finish()
+            except UploadError as e:
+                self.error = e
+        return None
+
+
+def _session_max_duration(session):
+    task_model, _ = TASK_KINDS[session.task_type]
+    task = task_model.objects.only("start_ayah", "end_ayah").filter(pk=session.task_id).first()
+    return max_duration_for_task(task) if task else settings.AUDIO_MAX_DURATION
+
+
+def _parts_dir(session):
+    return f"uploads/{session.pk}"
+
+
+def start_upload(student, task_type, task_id, filename, size, content_type="", max_seconds=None):
+    """
+    يبدأ جلسة رفع جديدة، أو يعيد الجلسة النشطة لنفس المهمة ونفس حجم الملف
+    حتى يكمل العميل من حيث توقف بعد انقطاع الاتصال.
+    """
+    if size <= 0 or size > UPLOAD_MAX_SIZE:
+        raise UploadError("حجم الملف غير مقبول.")
+    AudioStreamValidator(max_seconds or settings.AUDIO_MAX_DURATION, declared_size=size)
+    session = UploadSession.objects.filter(
+        student=student, task_type=task_type, task_id=task_id,
+        size=size, status=UploadSession.STATUS_ACTIVE,
+    ).order_by("-created_at").first()
+    if session is None:
+        session = UploadSession.objects.create(
+            student=student, task_type=task_type, task_id=task_id,
+            filename=posixpath.basename(filename or "recording.webm")[:255],
+            content_type=(content_type or "")[:100], size=size,
+        )
+    return session
+
+
+def append_chunk(session_id, student, offset, data):
+    """
+    يحفظ جزءًا عند الإزاحة offset مباشرة في التخزين ويعيد الإزاحة الجديدة.
+    إعادة إرسال جزء تم استلامه من قبل (بعد انقطاع قبل وصول الرد) لا تفعل شيئًا.
+    """
+    if not data:
+        raise UploadError("الجزء فارغ.")
+    if len(data) > UPLOAD_MAX_CHUNK_SIZE:
+        raise UploadError("حجم الجزء أكبر من المسموح.", status=413)
+
+    with transaction.atomic():
+        session = _locked_session(session_id, student)
+        if offset + len(data) <= session.received:
+            return session.received  # جزء مكرر
+        if offset != session.received:
+            raise UploadError(f"الإزاحة غير متوقعة؛ المطلوب {session.received}.", status=409)
+        if offset + len(data) > session.size:
+            raise UploadError("البيانات أكبر من حجم الملف المعلن.")
+
+        # الصيغة والمدة تُفحص مع كل جزء؛ الأجزاء التالية تستأنف من أول بايتات الملف
+        validator = AudioStreamValidator(_session_max_duration(session))
+        if offset:
+            with default_storage.open(sorted(session.parts)[0][2], "rb") as first:
+                validator.resume(first.read(_SNIFF_BYTES), offset, session.scan_state)
+        validator.feed(data)
+        if offset + len(data) == session.size:
+            validator.finish()
+
+        # الأجزاء ملفات مؤقتة تبقى في default_storage: تخزين التسليمات يعيد تسميتها blobs بحسب المحتوى
+        name = default_storage.save(f"{_parts_dir(session)}/{offset:012d}.part", ContentFile(data))
+        session.parts.append([offset, len(data), name])
+        session.received = offset + len(data)
+        session.scan_state = validator.state()
+        session.save(update_fields=["parts", "received", "scan_state", "updated_at"])
+        return session.received
+
+
+class _PartsReader(io.RawIOBase):
+    """
+    يقرأ الأجزاء المخزنة بالتتابع كملف واحد، ويحسب SHA-256 أثناء القراءة.
+    يقبل seek(0) فقط: التخزين بعنوان المحتوى يقرأ الملف مرة للـ hash ثم يعيده للبداية ليحفظه.
+    """
+
+    def __init__(self, names):
+        self._all = list(names)
+        self._current = None
+        self.seek(0)
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR and offset == 0:
+            return self._position
+        if offset != 0 or whence != io.SEEK_SET:
+            raise io.UnsupportedOperation("_PartsReader يدعم seek(0) فقط")
+        if self._current is not None:
+            self._current.close()
+        self._names = list(self._all)
+        self._current = None
+        self._position = 0
+        self.sha256 = hashlib.sha256()
+        return 0
+
+    def readinto(self, buffer):
+        while True:
+            if self._current is None:
+                if not self._names:
+                    return 0
+                self._current = default_storage.open(self._names.pop(0), "rb")
+            data = self._current.read(len(buffer))
+            if data:
+                buffer[:len(data)] = data
+                self.sha256.update(data)
+                self._position += len(data)
+                return len(data)
+            self._current.close()
+            self._current = None
+
+    def close(self):
+        if self._current is not None:
+            self._current.close()
+        super().close()
+
+
+def finalize_upload(session_id, student, sha256, storage, upload_to="submissions/"):
+    """
+    يجمع الأجزاء في ملف واحد داخل storage (تخزين التسليمات، قراءة متتابعة بدون ملف مؤقت)
+    ويتحقق من SHA-256 ثم يسجّل الـ blob كما في finish_direct_upload.
+    يعيد (الجلسة، اسم الملف النهائي في التخزين).
+    عند عدم تطابق الـ checksum يُحذف الملف النهائي وتبقى الأجزاء كما هي.
+    بلا transaction ولا قفل: النسخ يطول مع الملفات الكبيرة. الجلسة تُعلَّم مكتملة
+    بعدها بـ complete_upload في نفس transaction إنشاء التسليم.
+    """
+    session = UploadSession.objects.filter(pk=session_id, student=student).first()
+    if session is None:
+        raise UploadError("جلسة الرفع غير موجودة.", status=404)
+    if session.status != UploadSession.STATUS_ACTIVE:
+        raise UploadError("جلسة الرفع مكتملة بالفعل.", status=409)
+    if session.received != session.size:
+        raise UploadError(f"الرفع لم يكتمل ({session.received}/{session.size}).", status=409)
+
+    reader = _PartsReader(name for _, _, name in sorted(session.parts))
+    ext = posixpath.splitext(session.filename)[1] or ".webm"
+    final = File(io.BufferedReader(reader), name=f"{uuid.uuid4().hex}{ext}")
+    final.size = session.size
+    name = storage.save(posixpath.join(upload_to, final.name), final)
+    reader.close()
+
+    digest = reader.sha256.hexdigest()
+    if digest != (sha256 or "").lower():
+        # في التخزين بعنوان المحتوى الحذف لا يمس الـ blob؛ يجمعه gc_audio_blobs لأنه بلا مراجع
+        storage.delete(name)
+        raise UploadError("الملف وصل تالفًا (checksum غير مطابق)؛ أعد الرفع.")
+    if hasattr(storage, "register"):
+        storage.register(name, digest, session.size)
+    return session, name
+
+
+def complete_upload(session):
+    """
+    داخل transaction: يقفل الجلسة ويعلّمها مكتملة، تحديث قصير بعد finalize_upload.
+    يرفع UploadError (409) لو أكملها طلب متزامن. الأجزاء تُحذف بعد الـ commit.
+    """
+    locked = _locked_session(session.pk, session.student_id)
+    locked.status = UploadSession.STATUS_COMPLETED
+    locked.save(update_fields=["status", "updated_at"])
+    transaction.on_commit(lambda: discard_parts(locked))
+    return locked
+
+
+def start_direct_upload(storage, student, task_type, task_id, size, content_type, sha256, max_seconds=None):
+    """
+    رفع مباشر إلى التخزين (S3 مثلًا) برابط موقّع: اسم الملف = SHA-256 المعلن،
+    فالتسجيل الموجود مسبقًا لا يُرفع مرة أخرى. يعيد (التذكرة، بيانات الرفع أو None)،
+    أو يرفع LookupError لو التخزين لا يدعم الروابط الموقّعة.
+    """
+    sha256 = (sha256 or "").lower()
+    if not _SHA256_RE.match(sha256):
+        raise UploadError("checksum غير صالح.")
+    if size <= 0 or size > UPLOAD_MAX_SIZE:
+        raise UploadError("حجم الملف غير مقبول.")
+    max_seconds = max_seconds or settings.AUDIO_MAX_DURATION
+    AudioStreamValidator(max_seconds, declared_size=size)
+    content_type = (content_type or "").split(";")[0].strip().lower() or "audio/webm"
+    if content_type not in _AUDIO_EXTENSIONS:
+        raise UploadError("نوع الملف غير مدعوم.", status=415)
+
+    name = blob_name(sha256, _AUDIO_EXTENSIONS[content_type])
+    upload = None
+    if not (storage.exists(name) and storage.size(name) == size):
+        upload = direct_upload(storage, name, size, content_type, sha256)
+        if upload is None:
+            raise LookupError("direct uploads are not supported by this storage")
+    ticket = signing.dumps({
+        "student": student.pk, "task_type": task_type, "task_id": task_id,
+        "name": name, "size": size, "sha256": sha256, "max_seconds": max_seconds,
+    }, salt=DIRECT_UPLOAD_SALT)
+    return ticket, upload
+
+
+def finish_direct_upload(storage, student, ticket):
+    """
+    يتحقق أن الملف وصل للتخزين بالحجم المعلن وأنه تسجيل صوتي ويسجله كـ blob.
+    يعيد بيانات التذكرة (task_type, task_id, name).
+    """
+    try:
+        data = signing.loads(ticket or "", salt=DIRECT_UPLOAD_SALT, max_age=DIRECT_UPLOAD_TICKET_AGE)
+    except signing.BadSignature:
+        raise UploadError("تذكرة الرفع غير صالحة أو منتهية؛ أعد الرفع.")
+    if data["student"] != student.pk:
+        raise UploadError("تذكرة الرفع غير صالحة أو منتهية؛ أعد الرفع.", status=403)
+    if not storage.exists(data["name"]):
+        raise UploadError("الملف لم يصل إلى التخزين بعد.", status=409)
+    if storage.size(data["name"]) != data["size"]:
+        raise UploadError("الملف وصل ناقصًا؛ أعد الرفع.", status=409)
+    # الملف لم يمر علينا: نفحص أوله فقط (الصيغة، ومدة WAV من ترويسته)؛ الباقي بعد التحويل
+    validator = AudioStreamValidator(data["max_seconds"])
+    with storage.open(data["name"], "rb") as f:
+        validator.feed(f.read(_SNIFF_BYTES))
+    validator.finish(data["size"])
+    storage.register(data["name"], data["sha256"], data["size"])
+    return data
+
+
+def discard_parts(session):
+    """حذف أجزاء الجلسة من التخزين (بعد الاكتمال أو عند التنظيف)."""
+    for _, _, name in session.parts:
+        default_storage.delete(name)
+
+
+def _locked_session(session_id, student):
+    session = UploadSession.objects.select_for_update().filter(pk=session_id, student=student).first()
+    if session is None:
+        raise UploadError("جلسة الرفع غير موجودة.", status=404)
+    if session.status != UploadSession.STATUS_ACTIVE:
+        raise UploadError("جلسة الرفع مكتملة بالفعل.", status=409)
+    return session
@@ -33,11 +33,24 @@ urlpatterns = [
     path('teacher/student/add_task/', views.add_student_task, name='add_student_task'),
     path('halaqa/<int:halaqa_id>/send-notification/', views.send_halaqa_notification, name='send_halaqa_notification'),
     path('teacher/submission/<str:submission_type>/<int:submission_id>/grade/', views.grade_submission, name='grade_submission'),
+    path('submission/<str:submission_type>/<int:submission_id>/audio/', views.submission_audio, name='submission_audio'),
+    path('media/direct/<str:token>/', views.direct_media, name='direct_media'),
 
 
     
     # --- API URLs ---
     path('api/halaqa/<int:halaqa_id>/surahs/', views.get_halaqa_surahs, name='get_halaqa_surahs'),
+    path('api/submissions/', views.get_submissions_page, name='get_submissions_page'),
+    path('api/notifications/', views.notifications_page, name='notifications_page'),
+    path('api/notifications/mark-read/', views.notifications_mark_read, name='notifications_mark_read'),
+    path('api/events/', views.events_stream, name='events_stream'),
+    path('api/tasks/<str:task_type>/<int:task_id>/card/', views.student_task_card, name='student_task_card'),
+    path('api/uploads/', views.upload_start, name='upload_start'),
+    path('api/uploads/direct/', views.upload_direct_start, name='upload_direct_start'),
+    path('api/uploads/direct/complete/', views.upload_direct_complete, name='upload_direct_complete'),
+    path('api/uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('api/uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='upload_chunk'),
+    path('api/uploads/<uuid:upload_id>/finalize/', views.upload_finalize, name='upload_finalize'),
     path('api/submission/<str:submission_type>/<int:submission_id>/', views.get_submission_details, name='get_submission_details'),
     path('api/logout-other-devices/', views.logout_other_devices_view, name='logout_other_devices'),
     path('api/delete-account/', views.delete_account_view, name='delete_account'),
@@ -4,23 +4,49 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.models import User
-from django.http import JsonResponse, HttpResponseForbidden, HttpResponseRedirect
+from django.http import JsonResponse, HttpResponse, HttpResponseForbidden, HttpResponseRedirect, HttpResponseNotModified, Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags
 from django.shortcuts import render, redirect, get_object_or_404
-from django.views.decorators.http import require_POST
+from django.views.decorators.csrf import csrf_exempt, csrf_protect
+from django.views.decorators.http import require_POST, require_http_methods
 from django.db import transaction, IntegrityError
 from django.utils import timezone
-from django.db.models import Q, Count, Avg, Max
+from django.db.models import Q, Avg, Max
 from itertools import chain
 from operator import attrgetter
-from django.db.models import Q, Count, Avg, Max, F, Subquery, OuterRef
+from django.db.models import Q, Avg, Max, F
 from .forms import ProfileUpdateForm, CustomPasswordChangeForm
 from django.contrib.auth import update_session_auth_hash
 from .forms import ProfileUpdateForm, PasswordChangeForm
 from django.contrib.sessions.models import Session
 import types
+import hashlib
+import logging
+import tempfile
+from django.core.files import File
 from django.template.loader import render_to_string
 from django.templatetags.static import static
 from .models import Recitation, Review
+from .stats import (
+    get_student_stats, count_pending_tasks,
+    with_halaqa_stats, halaqa_avg_performance, get_teacher_overview,
+    halaqa_student_task_stats, TASK_KINDS,
+)
+from .media import serve_media, audio_content_type
+from .storage import SignedURLFileSystemStorage, direct_download_url, unsign_direct_media
+from .uploads import (
+    UPLOAD_CHUNK_SIZE, UploadError, start_upload, append_chunk, finalize_upload, complete_upload,
+    start_direct_upload, finish_direct_upload, AudioUploadHandler, max_duration_for_task,
+)
+from .jobs import enqueue
+from .archive import restore_submission_audio
+from .feeds import submission_feed_page, submission_counters, submission_page_etag, InvalidCursor
+from .inbox import broadcast, inbox_page, mark_read, mark_all_read
+from .events import stream as event_stream
+
+logger = logging.getLogger(__name__)
 
 try:
     from hijri_converter import Gregorian as _Gregorian
@@ -28,7 +54,7 @@ try:
 except Exception:
     HIJRI_OK = False
 
-from django.db.models import Sum, F, IntegerField, ExpressionWrapper
+from django.db.models import F, IntegerField, ExpressionWrapper
 
 from apps.accounts.models import (
     Recitation,
@@ -36,7 +62,7 @@ from apps.accounts.models import (
     Attendance,
     Profile, Halaqa,
     Review, ReviewSubmission,
-    Surah
+    Surah, UploadSession, submission_storage,
 )
 
 # ========= أدوات مساعدة =========
@@ -298,7 +324,7 @@ def _range_len(obj):
 
 @login_required(login_url="accounts:login")
 def student_dashboard(request):
-    profile = get_object_or_404(Profile, user=request.user)
+    profile = get_object_or_404(Profile.objects.select_related("halaqa"), user=request.user)
     if profile.role != Profile.ROLE_STUDENT:
         return redirect("accounts:teacher_dashboard")
 
@@ -306,10 +332,14 @@ def student_dashboard(request):
     today = timezone.localdate()
     
     # --- 1. Attendance Logic ---
-    Attendance.objects.get_or_create(student=profile, date=today, defaults={"status": "present"})
+    # نقرأ حضور الأسبوع مرة واحدة، ولا نُنشئ سجل اليوم إلا لو لم يكن موجودًا
     start_date = today - timedelta(days=6)
     existing_attendance = Attendance.objects.filter(student=profile, date__gte=start_date, date__lte=today)
     attendance_map = {att.date: att for att in existing_attendance}
+    if today not in attendance_map:
+        attendance_map[today], _ = Attendance.objects.get_or_create(
+            student=profile, date=today, defaults={"status": "present"}
+        )
     week_attendance = []
     for i in range(7):
         day_date = start_date + timedelta(days=i)
@@ -376,36 +406,11 @@ def student_dashboard(request):
     ]
     
     # --- 4. Calculate All Statistics ---
-    week_ago = now - timedelta(days=7)
-    
-    all_graded_recitations = RecitationSubmission.objects.filter(student=profile, status="graded")
-    all_graded_reviews = ReviewSubmission.objects.filter(student=profile, status="graded")
-    total_rec_score = all_graded_recitations.aggregate(total=Sum('score'))['total'] or 0
-    total_rev_score = all_graded_reviews.aggregate(total=Sum('score'))['total'] or 0
-    count_graded = all_graded_recitations.count() + all_graded_reviews.count()
-    total_score = total_rec_score + total_rev_score
-    accuracy_pct = round((total_score / (count_graded * 10)) * 100) if count_graded > 0 else 0
+    stats = get_student_stats(profile, now=now, pending_tasks_count=len(pending_tasks))
     present_days = sum(1 for a in week_attendance if a.status == "present")
     presence_pct = round((present_days / 7) * 100) if week_attendance else 0
-    
-    successful_recitations = RecitationSubmission.objects.filter(
-        student=profile, status="graded", score__gte=5
-    ).select_related('recitation__surah')
-    ayah_count = sum(
-        (s.recitation.end_ayah - s.recitation.start_ayah + 1) 
-        for s in successful_recitations 
-        if s.recitation and s.recitation.start_ayah and s.recitation.end_ayah
-    )
-    
-    pending_tasks_count = len(pending_tasks)
-    weekly_hifdh_subs = RecitationSubmission.objects.filter(student=profile, created_at__gte=week_ago, status='graded')
-    hifdh_avg = weekly_hifdh_subs.aggregate(avg=Avg('score'))['avg'] or 0
-    weekly_hifdh_score = round((hifdh_avg / 10) * 100)
-    weekly_review_subs = ReviewSubmission.objects.filter(student=profile, created_at__gte=week_ago, status='graded')
-    review_avg = weekly_review_subs.aggregate(avg=Avg('score'))['avg'] or 0
-    weekly_review_score = round((review_avg / 10) * 100)
 
-    halaqa_teacher = profile.halaqa.teachers.first() if profile.halaqa else None
+    halaqa_teacher = profile.halaqa.teachers.select_related("user").first() if profile.halaqa else None
 
     # --- 5. Final Context for Template ---
     ctx = {
@@ -414,12 +419,12 @@ def student_dashboard(request):
         "submitted_tasks": submitted_tasks,
         "graded_tasks": graded_tasks,
         "week_attendance": week_attendance,
-        "pending_tasks_count": pending_tasks_count,
-        "accuracy_pct": accuracy_pct,
+        "pending_tasks_count": stats.pending_tasks_count,
+        "accuracy_pct": stats.accuracy_pct,
         "presence_pct": presence_pct,
-        "ayah_count": ayah_count,
-        "weekly_hifdh_score": weekly_hifdh_score,
-        "weekly_review_score": weekly_review_score,
+        "ayah_count": stats.ayah_count,
+        "weekly_hifdh_score": stats.weekly_hifdh_score,
+        "weekly_review_score": stats.weekly_review_score,
         "halaqa_teacher_name": halaqa_teacher.user.get_full_name() or halaqa_teacher.user.username if halaqa_teacher else "غير محدد",
         "now": now,
     }
@@ -428,77 +433,340 @@ def student_dashboard(request):
 
 
 
+def _get_student_task(student, task_type, task_id):
+    """مهمة من حلقة الطالب حسب النوع (404 لو غير موجودة، None لو النوع غير صالح)."""
+    if task_type == 'recitation':
+        return get_object_or_404(Recitation, id=task_id, halaqa=student.halaqa)
+    if task_type == 'review':
+        return get_object_or_404(Review, id=task_id, halaqa=student.halaqa)
+    return None
+
+
+def _render_task_card(request, task, task_type, submission):
+    setattr(task, "type", task_type)
+    setattr(task, "sub", submission)
+    setattr(task, "is_late", task.deadline and task.deadline < timezone.now() and not task.sub)
+    return render_to_string(
+        'students/partials/_task_item.html',
+        {'task': task, 'sub': submission, 'request': request}
+    )
+
+
+@login_required
+def student_task_card(request, task_type, task_id):
+    """
+    API لكارت مهمة واحدة في لوحة الطالب بحالتها الحالية، تطلبه الصفحة عند
+    أحداث task_created و graded (events_stream) بدل إعادة تحميل اللوحة كلها.
+    """
+    student = request.user.profile
+    if student.role != Profile.ROLE_STUDENT:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
+    task = _get_student_task(student, task_type, task_id)
+    if task is None:
+        return JsonResponse({'status': 'error', 'message': 'نوع المهمة غير صالح.'}, status=400)
+
+    model = RecitationSubmission if task_type == 'recitation' else ReviewSubmission
+    submission = model.objects.filter(**{task_type: task}, student=student).first()
+    if submission is None:
+        state = 'pending'
+    else:
+        state = 'graded' if submission.status == 'graded' else 'submitted'
+    return JsonResponse({
+        'status': 'success',
+        'state': state,
+        'html': _render_task_card(request, task, task_type, submission),
+        'new_stats': {'pending_tasks_count': count_pending_tasks(student)},
+    })
+
+
+@login_required
+def events_stream(request):
+    """
+    بث Server-Sent Events لأحداث المستخدم (مهمة جديدة، تسليم، تصحيح، إشعار)
+    تستمع له اللوحات بدل إعادة التحميل. يستكمل من Last-Event-ID عند إعادة الاتصال.
+    """
+    last_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_id = int(last_id) if last_id else None
+    except ValueError:
+        last_id = None
+    response = StreamingHttpResponse(
+        event_stream(request.user.profile, last_id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx: لا تخزين مؤقت للبث
+    return response
+
+
+def _save_task_submission(request, student, task, task_type, audio):
+    """
+    ينشئ/يحدّث تسليم الطالب للمهمة ويعيد رد JSON بكارت المهمة الجديد.
+    audio: ملف مرفوع أو اسم ملف موجود في التخزين (من الرفع المقسّم).
+    مشترك بين submit_task و upload_finalize.
+    """
+    model = RecitationSubmission if task_type == 'recitation' else ReviewSubmission
+    submission, _ = model.objects.update_or_create(
+        **{task_type: task}, student=student,
+        defaults={
+            'audio': audio, 'audio_status': model.AUDIO_PENDING,
+            'audio_archive': '', 'archived_at': None,
+            'status': 'submitted', 'updated_at': timezone.now(),
+        }
+    )
+    # التحويل إلى Opus خارج مسار الطلب (run_worker)
+    enqueue('transcode_submission', {'kind': task_type, 'submission_id': submission.pk})
+
+    task_card_html = _render_task_card(request, task, task_type, submission)
+    
+    # عدد المهام المطلوبة بنفس تعريف لوحة الطالب
+    new_pending_count = count_pending_tasks(student)
+
+    return JsonResponse({
+        'status': 'success',
+        'message': 'تم التسليم بنجاح!',
+        'task_card_html': task_card_html,
+        'new_stats': {
+            'pending_tasks_count': new_pending_count
+        }
+    })
+
+
+# معالج فحص التسجيل يجب أن يُضاف قبل أي قراءة للـ body، و CsrfViewMiddleware يقرأ
+# request.POST قبل الـ view؛ لذلك الـ views التي تستقبل ملفًا معفاة منه ويُفحص CSRF
+# داخلها (csrf_protect) بعد تركيب المعالج، كما في توثيق Django لمعالجات الرفع.
+@csrf_exempt
 @require_POST
 @login_required(login_url="accounts:login")
 def submit_task(request, task_type, task_id):
     if request.user.profile.role != Profile.ROLE_STUDENT:
         return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
 
+    student = request.user.profile
+    task = _get_student_task(student, task_type, task_id)
+    if task is None:
+        return JsonResponse({'status': 'error', 'message': 'نوع المهمة غير صالح.'}, status=400)
+
+    handler = AudioUploadHandler(request, max_duration_for_task(task))
+    request.upload_handlers.insert(0, handler)
+    return _submit_task(request, student, task, task_type, handler)
+
+
+@csrf_protect
+def _submit_task(request, student, task, task_type, handler):
     audio_file = request.FILES.get('audio')
+    if handler.error is not None:
+        return _upload_error(handler.error)
     if not audio_file:
         return JsonResponse({"status": "error", "message": "لم يصل ملف الصوت."}, status=400)
 
+    try:
+        return _save_task_submission(request, student, task, task_type, audio_file)
+
+    except Exception as e:
+        print(f"Error in submit_task: {e}")
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+# ========= الرفع المقسّم (init / chunk / finalize) =========
+
+def _upload_error(e):
+    return JsonResponse({'status': 'error', 'message': str(e)}, status=e.status)
+
+
+@require_POST
+@login_required(login_url="accounts:login")
+def upload_start(request):
+    """
+    بدء (أو استئناف) رفع تسجيل على أجزاء.
+    JSON: {task_type, task_id, filename, size, content_type}
+    الرد: {upload_id, offset, chunk_size} — يكمل العميل من offset.
+    """
     student = request.user.profile
-    task = None
-    submission = None
+    if student.role != Profile.ROLE_STUDENT:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
+    try:
+        data = json.loads(request.body or "{}")
+        task_type = data.get('task_type')
+        size = int(data.get('size') or 0)
+    except (ValueError, TypeError):
+        return JsonResponse({'status': 'error', 'message': 'بيانات غير صالحة.'}, status=400)
+
+    task = _get_student_task(student, task_type, data.get('task_id'))
+    if task is None:
+        return JsonResponse({'status': 'error', 'message': 'نوع المهمة غير صالح.'}, status=400)
+    try:
+        session = start_upload(student, task_type, task.id, data.get('filename'), size, data.get('content_type'),
+                               max_seconds=max_duration_for_task(task))
+    except UploadError as e:
+        return _upload_error(e)
 
+    return JsonResponse({
+        'status': 'success',
+        'upload_id': str(session.pk),
+        'offset': session.received,
+        'chunk_size': UPLOAD_CHUNK_SIZE,
+    }, status=201 if session.received == 0 else 200)
+
+
+@login_required(login_url="accounts:login")
+def upload_status(request, upload_id):
+    """حالة جلسة الرفع: كم بايت وصل (للاستئناف بعد الانقطاع)."""
+    session = get_object_or_404(UploadSession, pk=upload_id, student=request.user.profile)
+    return JsonResponse({
+        'status': 'success',
+        'upload_id': str(session.pk),
+        'offset': session.received,
+        'size': session.size,
+        'upload_status': session.status,
+    })
+
+
+@require_POST
+@login_required(login_url="accounts:login")
+def upload_chunk(request, upload_id):
+    """
+    جزء من الملف كـ body خام؛ الإزاحة في هيدر Upload-Offset.
+    الرد: {offset} = عدد البايتات المستلمة حتى الآن.
+    """
     try:
-        if task_type == 'recitation':
-            task = get_object_or_404(Recitation, id=task_id, halaqa=student.halaqa)
-            submission, _ = RecitationSubmission.objects.update_or_create(
-                recitation=task, student=student,
-                defaults={'audio': audio_file, 'status': 'submitted', 'updated_at': timezone.now()}
-            )
-        elif task_type == 'review':
-            task = get_object_or_404(Review, id=task_id, halaqa=student.halaqa)
-            submission, _ = ReviewSubmission.objects.update_or_create(
-                review=task, student=student,
-                defaults={'audio': audio_file, 'status': 'submitted', 'updated_at': timezone.now()}
-            )
-        else:
-            return JsonResponse({'status': 'error', 'message': 'نوع المهمة غير صالح.'}, status=400)
-            
-        setattr(task, "type", task_type)
-        setattr(task, "sub", submission)
-        setattr(task, "is_late", task.deadline and task.deadline < timezone.now() and not task.sub)
+        offset = int(request.headers.get('Upload-Offset', ''))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'هيدر Upload-Offset مطلوب.'}, status=400)
+    try:
+        received = append_chunk(upload_id, request.user.profile, offset, request.body)
+    except UploadError as e:
+        return _upload_error(e)
+    return JsonResponse({'status': 'success', 'offset': received})
 
-        task_card_html = render_to_string(
-            'students/partials/_task_item.html', 
-            {'task': task, 'sub': submission, 'request': request}
-        )
-        
-        # --- بداية الإصلاح النهائي ---
-        # حساب عدد المهام المطلوبة بشكل صحيح بعد التسليم
-        
-        pending_recitations = Recitation.objects.filter(
-            halaqa=student.halaqa
-        ).exclude(
-            submissions__student=student
-        ).count()
-
-        # تم تصحيح الخطأ هنا بناءً على رسالة الخطأ الجديدة
-        # اسم العلاقة الصحيح هو 'submissions' وليس 'reviewsubmission'
-        pending_reviews = Review.objects.filter(
-            halaqa=student.halaqa
-        ).exclude(
-            submissions__student=student 
-        ).count()
-        # --- نهاية الإصلاح النهائي ---
-
-        new_pending_count = pending_recitations + pending_reviews
 
-        return JsonResponse({
-            'status': 'success',
-            'message': 'تم التسليم بنجاح!',
-            'task_card_html': task_card_html,
-            'new_stats': {
-                'pending_tasks_count': new_pending_count
-            }
-        })
+@require_POST
+@login_required(login_url="accounts:login")
+def upload_finalize(request, upload_id):
+    """
+    إنهاء الرفع: JSON {sha256}. يتحقق من الـ checksum ثم ينشئ التسليم
+    (نفس رد submit_task).
+    """
+    student = request.user.profile
+    session = get_object_or_404(UploadSession, pk=upload_id, student=student)
+    task = _get_student_task(student, session.task_type, session.task_id)
+    try:
+        sha256 = json.loads(request.body or "{}").get('sha256', '')
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'بيانات غير صالحة.'}, status=400)
 
+    # تجميع الملف (قد يطول) خارج الـ transaction؛ القفل فقط لتعليم الجلسة وإنشاء التسليم
+    storage = submission_storage()
+    try:
+        session, audio_name = finalize_upload(session.pk, student, sha256, storage)
+    except UploadError as e:
+        return _upload_error(e)
+    try:
+        with transaction.atomic():
+            complete_upload(session)
+            return _save_task_submission(request, student, task, session.task_type, audio_name)
     except Exception as e:
-        print(f"Error in submit_task: {e}")
-        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+        # لم يُنشأ التسليم: لا شيء يشير إلى الملف المجمّع
+        storage.delete(audio_name)
+        if isinstance(e, UploadError):
+            return _upload_error(e)
+        raise
+
+
+# ========= الرفع المباشر إلى التخزين (روابط موقّعة) =========
+
+@require_POST
+@login_required(login_url="accounts:login")
+def upload_direct_start(request):
+    """
+    JSON: {task_type, task_id, size, content_type, sha256}
+    الرد: {ticket, upload} — upload = {url, method, headers} يرفع المتصفح الملف إليه
+    مباشرة (null لو التسجيل نفسه موجود بالفعل)، ثم upload_direct_complete بالتذكرة.
+    501 لو التخزين لا يدعم الروابط الموقّعة (يستخدم العميل الرفع المقسّم).
+    """
+    student = request.user.profile
+    if student.role != Profile.ROLE_STUDENT:
+        return JsonResponse({'status': 'error', 'message': 'Permission denied.'}, status=403)
+    try:
+        data = json.loads(request.body or "{}")
+        task_type = data.get('task_type')
+        size = int(data.get('size') or 0)
+    except (ValueError, TypeError):
+        return JsonResponse({'status': 'error', 'message': 'بيانات غير صالحة.'}, status=400)
+
+    task = _get_student_task(student, task_type, data.get('task_id'))
+    if task is None:
+        return JsonResponse({'status': 'error', 'message': 'نوع المهمة غير صالح.'}, status=400)
+    try:
+        ticket, upload = start_direct_upload(
+            submission_storage(), student, task_type, task.id, size, data.get('content_type'), data.get('sha256'),
+            max_seconds=max_duration_for_task(task),
+        )
+    except UploadError as e:
+        return _upload_error(e)
+    except LookupError:
+        return JsonResponse({'status': 'error', 'message': 'الرفع المباشر غير مفعّل.'}, status=501)
+    return JsonResponse({'status': 'success', 'ticket': ticket, 'upload': upload})
+
+
+@require_POST
+@login_required(login_url="accounts:login")
+def upload_direct_complete(request):
+    """إنهاء الرفع المباشر: JSON {ticket}. ينشئ التسليم (نفس رد submit_task)."""
+    student = request.user.profile
+    try:
+        ticket = json.loads(request.body or "{}").get('ticket', '')
+    except ValueError:
+        return JsonResponse({'status': 'error', 'message': 'بيانات غير صالحة.'}, status=400)
+    try:
+        data = finish_direct_upload(submission_storage(), student, ticket)
+    except UploadError as e:
+        return _upload_error(e)
+
+    task = _get_student_task(student, data['task_type'], data['task_id'])
+    with transaction.atomic():
+        return _save_task_submission(request, student, task, data['task_type'], data['name'])
+
+
+@csrf_exempt
+@require_http_methods(["GET", "HEAD", "PUT"])
+def direct_media(request, token):
+    """
+    هدف الروابط الموقّعة لـ SignedURLFileSystemStorage (البديل المحلي لـ S3).
+    التوقيع هو الصلاحية، كما في S3، فلا حاجة لتسجيل الدخول أو CSRF.
+    """
+    payload = unsign_direct_media(token)
+    storage = submission_storage()
+    if payload is None or not isinstance(storage, SignedURLFileSystemStorage):
+        return JsonResponse({'status': 'error', 'message': 'الرابط غير صالح أو منتهي.'}, status=403)
+    name = payload['n']
+
+    if request.method != 'PUT':
+        if payload['m'] != 'GET':
+            return JsonResponse({'status': 'error', 'message': 'الرابط غير صالح أو منتهي.'}, status=403)
+        try:
+            return serve_media(request, storage, name, payload['t'] or audio_content_type(name))
+        except FileNotFoundError:
+            raise Http404
+
+    if payload['m'] != 'PUT':
+        return JsonResponse({'status': 'error', 'message': 'الرابط غير صالح أو منتهي.'}, status=403)
+    # مثل S3 مع x-amz-checksum-sha256: المحتوى يجب أن يطابق الحجم والـ checksum الموقّعين
+    sha, size = hashlib.sha256(), 0
+    with tempfile.SpooledTemporaryFile(max_size=UPLOAD_CHUNK_SIZE * 4) as tmp:
+        while size <= payload['s']:
+            data = request.read(UPLOAD_CHUNK_SIZE)
+            if not data:
+                break
+            sha.update(data)
+            size += len(data)
+            tmp.write(data)
+        if size != payload['s'] or sha.hexdigest() != payload['h']:
+            return JsonResponse({'status': 'error', 'message': 'المحتوى لا يطابق الحجم أو الـ checksum.'}, status=400)
+        tmp.seek(0)
+        saved = storage.save(name, File(tmp, name=name))
+    if saved != name:  # لا يحدث مع تخزين بعنوان المحتوى ما دام الـ checksum مطابقًا
+        return JsonResponse({'status': 'error', 'message': 'تعذر حفظ الملف.'}, status=500)
+    return HttpResponse(status=200)
     
 
 
@@ -524,28 +792,19 @@ def teacher_dashboard(request):
         return redirect("accounts:login")
 
     # --- جلب البيانات ---
-    my_halaqat = Halaqa.objects.filter(teachers=profile).prefetch_related('students')
-    
-    # تصحيح: حساب عدد التسليمات المعلقة من كلا النوعين
-    pending_submissions_count = (
-        RecitationSubmission.objects.filter(recitation__halaqa__in=my_halaqat, status='submitted').count() +
-        ReviewSubmission.objects.filter(review__halaqa__in=my_halaqat, status='submitted').count()
-    )
-    
-    total_students_count = Profile.objects.filter(halaqa__in=my_halaqat, role=Profile.ROLE_STUDENT).count()
-    active_halaqat_count = my_halaqat.count()
-    
-    avg_performance_rec = RecitationSubmission.objects.filter(recitation__halaqa__in=my_halaqat, status='graded').aggregate(avg_score=Avg('score'))['avg_score'] or 0
-    average_performance = round(avg_performance_rec * 10, 1) if avg_performance_rec else 0
+    # كل إحصائيات الحلقات (والكروت العلوية) تأتي من استعلام واحد
+    my_halaqat = list(with_halaqa_stats(Halaqa.objects.filter(teachers=profile)))
+    overview = get_teacher_overview(my_halaqat)
 
     # --- دمج أحدث التسليمات من النوعين ---
+    # نكتفي بأحدث 5 من كل نوع من قاعدة البيانات بدل تحميل كل التسليمات المعلقة
     latest_rec_subs = RecitationSubmission.objects.filter(
         recitation__halaqa__in=my_halaqat, status='submitted'
-    ).select_related('student__user', 'recitation')
+    ).select_related('student__user', 'recitation__surah', 'recitation__halaqa').order_by('-created_at')[:5]
 
     latest_rev_subs = ReviewSubmission.objects.filter(
         review__halaqa__in=my_halaqat, status='submitted'
-    ).select_related('student__user', 'review')
+    ).select_related('student__user', 'review__surah', 'review__halaqa').order_by('-created_at')[:5]
 
     # إضافة سمة 'type' لنميز بينهما في القالب
     for sub in latest_rec_subs:
@@ -560,17 +819,15 @@ def teacher_dashboard(request):
         reverse=True
     )[:5] # جلب أحدث 5 تسليمات فقط
     
-    halaqat_with_stats = []
-    for halaqa in my_halaqat:
-        last_recitation = Recitation.objects.filter(halaqa=halaqa).order_by('-created_at').first()
-        last_review = Review.objects.filter(halaqa=halaqa).order_by('-created_at').first()
-        
-        halaqat_with_stats.append({
+    halaqat_with_stats = [
+        {
             'halaqa': halaqa,
-            'student_count': halaqa.students.count(),
-            'last_recitation_date': last_recitation.created_at if last_recitation else None,
-            'last_review_date': last_review.created_at if last_review else None,
-        })
+            'student_count': halaqa.student_count,
+            'last_recitation_date': halaqa.last_recitation_date,
+            'last_review_date': halaqa.last_review_date,
+        }
+        for halaqa in my_halaqat
+    ]
 
     # --- تحويل التاريخ إلى هجري ---
     today_gregorian = date.today()
@@ -579,10 +836,7 @@ def teacher_dashboard(request):
 
     # --- إرسال البيانات بالأسماء الصحيحة للقالب ---
     context = {
-        'pending_submissions_count': pending_submissions_count,
-        'total_students_count': total_students_count,
-        'active_halaqat_count': active_halaqat_count,
-        'average_performance': average_performance,
+        **overview.as_dict(),
         # ✅✅✅ هذا هو السطر الذي تم تصحيحه ✅✅✅
         'latest_submissions': latest_submissions, # يجب إرسال المتغير المدمج وليس القديم
         'halaqat_list': halaqat_with_stats,
@@ -603,9 +857,7 @@ def teacher_halaqat(request):
         return redirect("accounts:student_dashboard")
 
     # جلب الحلقات مع حساب عدد الطلاب لكل حلقة
-    my_halaqat_query = Halaqa.objects.filter(teachers=profile).annotate(
-        student_count=Count('students', distinct=True)
-    )
+    my_halaqat_query = with_halaqa_stats(Halaqa.objects.filter(teachers=profile))
 
     # --- منطق الفرز (تم تحسينه ليعمل مع anntotations) ---
     sort_option = request.GET.get('sort', 'name_asc')
@@ -619,22 +871,15 @@ def teacher_halaqat(request):
     else: # name_asc هو الافتراضي
         my_halaqat_query = my_halaqat_query.order_by('name')
 
-    # --- حساب متوسط الأداء (كنسبة إنجاز) لكل حلقة ---
-    halaqat_with_stats = []
-    for halaqa in my_halaqat_query:
-        # حساب متوسط الدرجات من تسليمات التسميع فقط
-        avg_score_query = RecitationSubmission.objects.filter(
-            recitation__halaqa=halaqa, status='graded'
-        ).aggregate(avg=Avg('score'))
-        
-        # تحويل المتوسط (من 10) إلى نسبة مئوية
-        avg_performance_percentage = round((avg_score_query['avg'] or 0) * 10, 1)
-
-        halaqat_with_stats.append({
+    # --- متوسط الأداء (كنسبة إنجاز) محسوب مسبقًا ضمن نفس الاستعلام ---
+    halaqat_with_stats = [
+        {
             'halaqa': halaqa,
             'student_count': halaqa.student_count,
-            'completion_percentage': avg_performance_percentage,
-        })
+            'completion_percentage': halaqa_avg_performance(halaqa),
+        }
+        for halaqa in my_halaqat_query
+    ]
 
     context = {
         'halaqat_list': halaqat_with_stats,
@@ -665,7 +910,7 @@ def teacher_students(request):
     students_query = Profile.objects.filter(
         role=Profile.ROLE_STUDENT,
         halaqa__teachers=profile
-    ).distinct()
+    ).select_related('user', 'halaqa').distinct()
 
     # --- 3. تطبيق فلترة الحلقة (إذا تم اختيار حلقة من القائمة) ---
     halaqa_id = request.GET.get('halaqa')
@@ -801,6 +1046,7 @@ def recitation_start(request, task_type, task_id):
 
 
 
+@csrf_exempt  # CSRF يُفحص في _recitation_submit بعد تركيب معالج الرفع (انظر submit_task)
 @require_POST
 @login_required(login_url="accounts:login")
 def recitation_submit(request, pk):
@@ -810,7 +1056,16 @@ def recitation_submit(request, pk):
         return HttpResponseForbidden()
 
     rec = get_object_or_404(Recitation, pk=pk, halaqa=student.halaqa)
+    handler = AudioUploadHandler(request, max_duration_for_task(rec))
+    request.upload_handlers.insert(0, handler)
+    return _recitation_submit(request, student, rec, handler)
+
+
+@csrf_protect
+def _recitation_submit(request, student, rec, handler):
     audio_file = request.FILES.get('audio')
+    if handler.error is not None:
+        return JsonResponse({"ok": False, "msg": str(handler.error)}, status=handler.error.status)
     if not audio_file:
         return JsonResponse({"ok": False, "msg": "لم يصل ملف الصوت."}, status=400)
 
@@ -820,8 +1075,11 @@ def recitation_submit(request, pk):
     )
     if not created:
         sub.audio = audio_file
+        sub.audio_status = sub.AUDIO_PENDING
+        sub.audio_archive, sub.archived_at = '', None
         sub.status = 'submitted'
         sub.save()
+    enqueue('transcode_submission', {'kind': 'recitation', 'submission_id': sub.pk})
 
     return JsonResponse({"ok": True})
 
@@ -951,50 +1209,28 @@ def halaqa_details_view(request, halaqa_id):
     صفحة تفاصيل الحلقة مع إحصائيات محسوبة بكفاءة.
     """
     # صلاحية المعلم
-    halaqa = get_object_or_404(Halaqa, id=halaqa_id, teachers=request.user.profile)
-
-    # --- 1) الإحصائيات العامة للكروت العلوية ---
-    student_count = halaqa.students.count()
-    
-    # متوسط الأداء العام للحلقة (من التسليمات المصححة فقط)
-    avg_performance_query = RecitationSubmission.objects.filter(
-        recitation__halaqa=halaqa, status='graded'
-    ).aggregate(avg=Avg('score'))
-    avg_performance = round((avg_performance_query['avg'] or 0) * 10, 1)
-
-    # ✅ تسليمات قيد التصحيح (التسميع + المراجعة) لحلقة واحدة
-    pending_submissions_halaqa = (
-        RecitationSubmission.objects.filter(recitation__halaqa=halaqa, status='submitted').count()
-        + ReviewSubmission.objects.filter(review__halaqa=halaqa, status='submitted').count()
+    halaqa = get_object_or_404(
+        with_halaqa_stats(Halaqa.objects.filter(teachers=request.user.profile)), id=halaqa_id
     )
 
+    # --- 1) الإحصائيات العامة للكروت العلوية (من نفس استعلام الحلقة) ---
+    student_count = halaqa.student_count
+    avg_performance = halaqa_avg_performance(halaqa)
+    pending_submissions_halaqa = halaqa.pending_count
+
     # --- 2) سجل المهام الأخيرة ---
-    recitations = Recitation.objects.filter(halaqa=halaqa).select_related('created_by__user')
-    reviews     = Review.objects.filter(halaqa=halaqa).select_related('created_by__user')
+    recitations = Recitation.objects.filter(halaqa=halaqa).select_related('created_by__user', 'surah').order_by('-created_at')[:30]
+    reviews     = Review.objects.filter(halaqa=halaqa).select_related('created_by__user', 'surah').order_by('-created_at')[:30]
     for r in recitations: r.type = 'تسميع'
     for v in reviews:     v.type = 'مراجعة'
     all_tasks = sorted(chain(recitations, reviews), key=attrgetter('created_at'), reverse=True)
     recent_tasks = all_tasks[:30]
 
-    # --- 3) إحصائيات لكل طالب ---
-    from django.db.models import Subquery, OuterRef, Count
-
-    avg_score_subquery = RecitationSubmission.objects.filter(
-        student=OuterRef('pk'),
-        status='graded'
-    ).values('student').annotate(avg_s=Avg('score')).values('avg_s')
-
-    late_tasks_subquery = Recitation.objects.filter(
-        halaqa=halaqa,
-        deadline__lt=timezone.now()
-    ).exclude(
-        submissions__student=OuterRef('pk')
-    ).values('halaqa').annotate(count=Count('id')).values('count')
-
-    students_list = halaqa.students.select_related('user').annotate(
-        avg_score=Subquery(avg_score_subquery),
-        late_submissions_count=Subquery(late_tasks_subquery)
-    ).order_by('user__username')
+    # --- 3) إحصائيات لكل طالب (من مصفوفة طالب × مهمة في استعلام واحد) ---
+    task_stats = halaqa_student_task_stats(halaqa)
+    students_list = list(halaqa.students.select_related('user').order_by('user__username'))
+    for student in students_list:
+        student.late_submissions_count, student.avg_score = task_stats.get(student.id, (0, None))
 
     # --- 4) السياق ---
     context = {
@@ -1056,7 +1292,7 @@ def add_student_task(request):
 
 
 import json
-from .models import Halaqa, Profile, Notification 
+from .models import Halaqa, Profile
 
 # ... باقي دوال الـ views الخاصة بك ...
 
@@ -1066,7 +1302,7 @@ from .models import Halaqa, Profile, Notification
 def send_halaqa_notification(request, halaqa_id):
     """
     View لإرسال إشعار لجميع طلاب حلقة معينة.
-    يستقبل الطلب عبر AJAX ويقوم بإنشاء الإشعارات بشكل مجمع.
+    يستقبل الطلب عبر AJAX وينشئ إشعارًا جماعيًا واحدًا (Broadcast) للحلقة.
     """
     profile = request.user.profile
     if profile.role != Profile.ROLE_TEACHER:
@@ -1086,27 +1322,18 @@ def send_halaqa_notification(request, halaqa_id):
         if not halaqa.teachers.filter(id=profile.id).exists():
             return JsonResponse({'status': 'error', 'message': 'أنت غير مسجل كمعلم في هذه الحلقة.'}, status=403)
 
-        students = halaqa.students.all()
-        if not students.exists():
+        students_count = halaqa.students.count()
+        if not students_count:
              return JsonResponse({'status': 'error', 'message': 'لا يوجد طلاب في هذه الحلقة لإرسال الإشعار إليهم.'}, status=400)
 
         final_title = title if title else f'رسالة جديدة بخصوص حلقة {halaqa.name}'
 
-        notifications_to_create = [
-            Notification(
-                recipient=student,
-                title=final_title,
-                message=message
-            )
-            for student in students
-        ]
-
-        # استخدام bulk_create لحفظ كل الإشعارات في استعلام واحد (أداء أفضل)
-        Notification.objects.bulk_create(notifications_to_create)
+        # صف واحد للحلقة كلها؛ يظهر لكل طالب عند قراءة إشعاراته (inbox.py)
+        broadcast(halaqa.id, final_title, message, sender=profile)
 
         return JsonResponse({
             'status': 'success',
-            'message': f'تم إرسال الإشعار بنجاح إلى {len(students)} طالب.'
+            'message': f'تم إرسال الإشعار بنجاح إلى {students_count} طالب.'
         })
 
     except json.JSONDecodeError:
@@ -1146,13 +1373,28 @@ def get_submission_details(request, submission_type, submission_id):
         else:
             return JsonResponse({'error': 'Invalid submission type'}, status=400)
 
+        if submission.audio_archive:
+            # تسجيل مؤرشف: نعيده للتخزين الأساسي، ولو تعذر نعرض المعاينة القصيرة
+            try:
+                restore_submission_audio(submission)
+            except Exception:  # OSError على القرص، ClientError/BotoCoreError من S3، ...
+                logger.exception("Could not restore %s #%s from the archive; serving the preview",
+                                 submission_type, submission.pk)
+        archived = bool(submission.audio_archive)
+
         data = {
             'student_name': submission.student.user.username,
             'avatar_url': submission.student.avatar_url,
             'recitation_title': str(task), # اسم المهمة
             'deadline': task.deadline.strftime('%Y-%m-%d %H:%M') if task.deadline else 'غير محدد',
             'submitted_at': submission.created_at.strftime('%Y-%m-%d %H:%M'),
-            'audio_url': submission.audio.url if submission.audio else '',
+            'audio_url': submission_audio_url(submission_type, submission),
+            # محسوبة في الخلفية (process_recordings/run_worker)؛ فارغة حتى تنتهي المعالجة
+            'duration': submission.audio_duration,
+            # الموجة والمقاطع للتسجيل الكامل، لا تنطبق على المعاينة
+            'peaks': list(submission.audio_peaks) if submission.audio_peaks and not archived else [],
+            'segments': [] if archived else submission.audio_segments or [],
+            'archived': archived,
             'current_notes': submission.notes or '',
             'current_hifdh': submission.hifdh or 5,
             'current_rules': submission.rules or 5,
@@ -1164,6 +1406,53 @@ def get_submission_details(request, submission_type, submission_id):
 
 
 
+def submission_audio_url(submission_type, submission):
+    """
+    رابط تسجيل التسليم: رابط موقّع مباشر من التخزين لو كان يدعمه، وإلا عبر submission_audio.
+    ?v= يتغير مع اسم الملف (بعد التحويل إلى Opus مثلًا) حتى لا يستخدم المتصفح نسخة قديمة من الكاش.
+    """
+    if not submission.audio:
+        return ''
+    # التخزين الذي يدعم الروابط الموقّعة (S3) يرسل الملف بنفسه بعد التحقق من الصلاحيات هنا
+    direct = direct_download_url(submission.audio.storage, submission.audio.name,
+                                 audio_content_type(submission.audio.name))
+    if direct:
+        return direct
+    version = hashlib.md5(submission.audio.name.encode()).hexdigest()[:8]
+    return reverse('accounts:submission_audio', args=[submission_type, submission.pk]) + f'?v={version}'
+
+
+@login_required(login_url="accounts:login")
+def submission_audio(request, submission_type, submission_id):
+    """
+    تسجيل التسليم لمعلم الحلقة (نفس صلاحيات get_submission_details) أو للطالب صاحبه،
+    مع دعم Range و ETag/Last-Modified و X-Sendfile/X-Accel-Redirect (انظر media.py).
+    """
+    if submission_type not in TASK_KINDS:
+        raise Http404
+    _, sub_model = TASK_KINDS[submission_type]
+    submission = get_object_or_404(
+        sub_model.objects.select_related(submission_type).only('id', 'audio', 'student_id', f'{submission_type}__halaqa_id'),
+        pk=submission_id,
+    )
+    profile = request.user.profile
+    halaqa_id = getattr(submission, submission_type).halaqa_id
+    if submission.student_id != profile.id and not Halaqa.objects.filter(pk=halaqa_id, teachers=profile).exists():
+        raise Http404
+    if not submission.audio:
+        raise Http404
+
+    direct = direct_download_url(submission.audio.storage, submission.audio.name,
+                                 audio_content_type(submission.audio.name))
+    if direct:
+        return HttpResponseRedirect(direct)
+    try:
+        return serve_media(request, submission.audio.storage, submission.audio.name,
+                           audio_content_type(submission.audio.name))
+    except FileNotFoundError:
+        raise Http404
+
+
 # في ملف: apps/accounts/views.py
 
 @require_POST
@@ -1211,32 +1500,18 @@ def grade_submission(request, submission_type, submission_id):
     submission.notes = notes
     submission.status = "graded"
     submission.save()
+    # إشعار الطالب بعد الـ commit عبر run_worker
+    enqueue("notify_submission_graded", {"kind": submission_type, "submission_id": submission.pk})
 
-    # 4. إعادة حساب الإحصائيات للمعلم
+    # 4. إعادة حساب الإحصائيات للمعلم (استعلام واحد لكل الحلقات)
     teacher = request.user.profile
-    my_halaqat = Halaqa.objects.filter(teachers=teacher)
-
-    pending_submissions_count = (
-        RecitationSubmission.objects.filter(recitation__halaqa__in=my_halaqat, status='submitted').count() +
-        ReviewSubmission.objects.filter(review__halaqa__in=my_halaqat, status='submitted').count()
-    )
-    total_students_count = Profile.objects.filter(halaqa__in=my_halaqat, role=Profile.ROLE_STUDENT).count()
-    active_halaqat_count = my_halaqat.count()
-    avg_performance_rec = RecitationSubmission.objects.filter(
-        recitation__halaqa__in=my_halaqat, status='graded'
-    ).aggregate(avg_score=Avg('score'))['avg_score'] or 0
-    average_performance = round(avg_performance_rec * 10, 1) if avg_performance_rec else 0
+    overview = get_teacher_overview(with_halaqa_stats(Halaqa.objects.filter(teachers=teacher)))
 
     # 5. إرجاع رسالة النجاح مع الإحصائيات المحدثة
     return JsonResponse({
         "status": "success",
         "message": "تم حفظ التقييم بنجاح!",
-        "stats": {
-            "pending_submissions_count": pending_submissions_count,
-            "total_students_count": total_students_count,
-            "active_halaqat_count": active_halaqat_count,
-            "average_performance": average_performance,
-        }
+        "stats": overview.as_dict(),
     })
 
 
@@ -1245,92 +1520,142 @@ def grade_submission(request, submission_type, submission_id):
 
 # في ملف: apps/accounts/views.py
 
+def _submission_feed_filters(request, teacher_halaqas):
+    """
+    قراءة فلاتر صفحة التسليمات من الرابط (مشتركة بين الصفحة والـ API).
+    الحلقة تُقبل فقط إن كانت من حلقات المعلم.
+    """
+    halaqa_filter = request.GET.get('halaqa', '')
+    return {
+        'status': request.GET.get('status', 'submitted'),
+        'task_type': request.GET.get('type', 'all'),
+        'halaqa': next((h for h in teacher_halaqas if str(h.id) == halaqa_filter), None),
+    }
+
+
 @login_required
 def teacher_submissions(request):
     teacher_profile = request.user.profile
-    now = timezone.now()
-    one_week_ago = now - timedelta(days=7)
-    
-    # جلب كل التسليمات (التسميع والمراجعة) الخاصة بحلقات هذا المعلم
-    recitation_subs = RecitationSubmission.objects.filter(
-        recitation__halaqa__teachers=teacher_profile
-    ).select_related('student__user', 'recitation', 'recitation__halaqa')
 
-    review_subs = ReviewSubmission.objects.filter(
-        review__halaqa__teachers=teacher_profile
-    ).select_related('student__user', 'review', 'review__halaqa')
+    # الفلاتر من الرابط؛ الفلترة والترتيب والتقسيم كلها تتم في قاعدة البيانات
+    teacher_halaqas = list(Halaqa.objects.filter(teachers=teacher_profile))
+    filters = _submission_feed_filters(request, teacher_halaqas)
+    status_filter, task_type_filter, active_halaqa = filters['status'], filters['task_type'], filters['halaqa']
 
-    all_submissions_unfiltered = list(chain(recitation_subs, review_subs))
-    
-    # =============================================================
-    # ===== بداية: منطق الفلترة الجديد لنوع المهمة =====
-    # =============================================================
-
-    task_type_filter = request.GET.get('type', 'all') # الافتراضي هو 'all'
-    if task_type_filter == 'recitation':
-        # hasattr(s, 'recitation') للتحقق إذا كان الكائن من نوع RecitationSubmission
-        all_submissions_filtered_by_type = [s for s in all_submissions_unfiltered if hasattr(s, 'recitation')]
-    elif task_type_filter == 'review':
-        # hasattr(s, 'review') للتحقق إذا كان الكائن من نوع ReviewSubmission
-        all_submissions_filtered_by_type = [s for s in all_submissions_unfiltered if hasattr(s, 'review')]
-    else: # 'all'
-        all_submissions_filtered_by_type = all_submissions_unfiltered
-
-    # ترتيب القائمة النهائية بعد فلترتها حسب النوع
-    all_submissions = sorted(
-        all_submissions_filtered_by_type,
-        key=lambda x: x.created_at,
-        reverse=True
-    )
-
-    # فلترة حسب الحالة (من الرابط) - تعمل على القائمة المفلترة بالفعل حسب النوع
-    status_filter = request.GET.get('status', 'submitted')
-    if status_filter in ['submitted', 'graded', 'reviewing']:
-        submissions = [s for s in all_submissions if s.status == status_filter]
-    else: # حالة 'all'
-        submissions = all_submissions
-        
-    # ===== نهاية: منطق الفلترة الجديد =====
-
-    # حسابات الإحصائيات (تبقى كما هي)
-    pending_count = sum(1 for s in all_submissions_unfiltered if s.status == 'submitted')
-    completed_this_week_count = sum(1 for s in all_submissions_unfiltered if s.status == 'graded' and s.updated_at >= one_week_ago)
-    needs_resubmission_count = sum(1 for s in all_submissions_unfiltered if s.status == 'reviewing')
-    
-    graded_submissions = [s for s in all_submissions_unfiltered if s.status == 'graded' and s.updated_at > s.created_at]
-    # ... (باقي كود حساب متوسط الوقت يبقى كما هو)
-    total_grading_time = timedelta(0)
-    if graded_submissions:
-        for sub in graded_submissions:
-            total_grading_time += sub.updated_at - sub.created_at
-        
-        average_seconds = total_grading_time.total_seconds() / len(graded_submissions)
-        avg_days = int(average_seconds // 86400)
-        avg_hours = int((average_seconds % 86400) // 3600)
-        avg_minutes = int((average_seconds % 3600) // 60)
-
-        if avg_days > 0:
-            average_grading_time = f"{avg_days} يوم"
-        elif avg_hours > 0:
-            average_grading_time = f"{avg_hours} ساعة"
-        else:
-            average_grading_time = f"{avg_minutes} دقيقة"
-    else:
-        average_grading_time = "N/A"
+    try:
+        submissions, next_cursor = submission_feed_page(
+            teacher_profile,
+            status=status_filter,
+            task_type=task_type_filter,
+            halaqa_id=active_halaqa.id if active_halaqa else None,
+            cursor=request.GET.get('cursor') or None,
+        )
+    except InvalidCursor:
+        return redirect(
+            f"{request.path}?status={status_filter}&type={task_type_filter}"
+            f"&halaqa={active_halaqa.id if active_halaqa else ''}"
+        )
 
     context = {
         'submissions': submissions,
-        'pending_count': pending_count,
-        'completed_this_week_count': completed_this_week_count,
-        'needs_resubmission_count': needs_resubmission_count,
-        'average_grading_time': average_grading_time,
+        'next_cursor': next_cursor,
+        **submission_counters(teacher_profile),
         'active_filter': status_filter,
         'active_type_filter': task_type_filter, # <-- نرسل الفلتر الجديد للقالب
-        'teacher_halaqas': Halaqa.objects.filter(teachers=teacher_profile)
+        'active_halaqa_filter': str(active_halaqa.id) if active_halaqa else '',
+        'active_halaqa_filter_name': active_halaqa.name if active_halaqa else '',
+        'teacher_halaqas': teacher_halaqas,
     } 
     return render(request, 'teachers/submissions.html', context)
 
 
+@login_required
+def get_submissions_page(request):
+    """
+    API لصفحة تسليمات تالية (infinite scroll) بصيغة JSON.
+    تعيد صفوف الجدول جاهزة كـ HTML + مؤشر الصفحة التالية،
+    وتدعم ETag: لو لم تتغير الصفحة يرجع 304 بدون إعادة الرسم.
+    """
+    teacher_profile = request.user.profile
+    if teacher_profile.role != Profile.ROLE_TEACHER:
+        return JsonResponse({'status': 'error', 'message': 'غير مصرح لك.'}, status=403)
+
+    teacher_halaqas = list(Halaqa.objects.filter(teachers=teacher_profile))
+    filters = _submission_feed_filters(request, teacher_halaqas)
+    try:
+        submissions, next_cursor = submission_feed_page(
+            teacher_profile,
+            status=filters['status'],
+            task_type=filters['task_type'],
+            halaqa_id=filters['halaqa'].id if filters['halaqa'] else None,
+            cursor=request.GET.get('cursor') or None,
+        )
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'message': 'مؤشر الصفحة غير صالح.'}, status=400)
+
+    etag = submission_page_etag(teacher_profile, submissions, next_cursor, request.GET.get('cursor', ''))
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        html = ''.join(
+            render_to_string('teachers/partials/_submission_row.html', {'sub': sub}, request=request)
+            for sub in submissions
+        )
+        response = JsonResponse({
+            'status': 'success',
+            'html': html,
+            'count': len(submissions),
+            'next_cursor': next_cursor,
+        })
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@login_required
+def notifications_page(request):
+    """
+    API صندوق الإشعارات (مباشرة + جماعية) بصيغة JSON، الأحدث أولًا.
+    ?cursor= من next_cursor للصفحة التالية (keyset، بلا OFFSET).
+    """
+    profile = request.user.profile
+    try:
+        rows, next_cursor = inbox_page(profile, cursor=request.GET.get('cursor') or None)
+    except InvalidCursor:
+        return JsonResponse({'status': 'error', 'message': 'مؤشر الصفحة غير صالح.'}, status=400)
+    response = JsonResponse({
+        'status': 'success',
+        'notifications': [dict(row, created_at=row['created_at'].isoformat()) for row in rows],
+        'next_cursor': next_cursor,
+        'unread': profile.unread_notifications,
+    })
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@require_POST
+@login_required(login_url="accounts:login")
+def notifications_mark_read(request):
+    """
+    JSON: {"direct": [ids], "broadcast": [ids]} أو {"all": true}.
+    كل نوع يُحدَّث بعبارة واحدة مهما كان عدد المعرّفات، والعدّاد بعبارة واحدة.
+    """
+    profile = request.user.profile
+    try:
+        data = json.loads(request.body or "{}")
+        direct = [int(pk) for pk in data.get('direct') or []]
+        broadcasts = [int(pk) for pk in data.get('broadcast') or []]
+    except (ValueError, TypeError, AttributeError):
+        return JsonResponse({'status': 'error', 'message': 'بيانات غير صالحة.'}, status=400)
+
+    if data.get('all'):
+        mark_all_read(profile)
+        changed = None
+    else:
+        changed = mark_read(profile, direct=direct, broadcasts=broadcasts)
+    return JsonResponse({'status': 'success', 'changed': changed, 'unread': profile.unread_notifications})
+
+
 
 
 @login_required
@@ -2,3 +2,6 @@ from django.apps import AppConfig
 
 class TrackerConfig(AppConfig):
     name = 'apps.tracker'
+
+    def ready(self):
+        import apps.tracker.signals  # noqa
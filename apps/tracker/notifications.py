@@ -1,8 +1,21 @@
-# Simple notification stubs (expand for real SMS/WhatsApp integrations)
-import os
-
-def notify_absence(student_name: str, phone: str, date_str: str):
-    # Here you would integrate with Twilio or WhatsApp Business API
-    # (Read TWILIO_* from environment)
-    # For demo, we just print:
-    print(f"[NOTIFY] {student_name} was absent on {date_str}. Send SMS/WA to {phone}")
+# Guardian notifications (SMS/WhatsApp). Messages are queued in the outbox
+# (apps/accounts/outbox.py) and sent in rate-limited batches by `dispatch_outbox`,
+# never inline from the attendance request.
+import datetime
+
+from apps.accounts.models import OutboundMessage
+from apps.accounts.outbox import queue_message
+
+
+def notify_absence(student_name: str, phone: str, date_str):
+    """Queue an absence alert for the guardian (one message per guardian per day)."""
+    day = datetime.date.fromisoformat(date_str) if isinstance(date_str, str) else date_str
+    return queue_message(
+        phone, f"نود إعلامكم بغياب {student_name} عن الحلقة بتاريخ {day:%Y-%m-%d}.",
+        kind=OutboundMessage.KIND_ABSENCE, day=day,
+    )
+
+
+def notify_guardian(phone: str, text: str, day=None):
+    """Queue any other message for a guardian (deduplicated per guardian per day)."""
+    return queue_message(phone, text, kind=OutboundMessage.KIND_GUARDIAN, day=day)
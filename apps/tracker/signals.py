@@ -0,0 +1,24 @@
+# apps/tracker/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from .models import Attendance, Student
+from .notifications import notify_absence
+
+
+@receiver(post_save, sender=Attendance)
+def alert_guardian_on_absence(sender, instance, **kwargs):
+    """
+    Queue an absence alert when record_attendance marks a student absent. The
+    guardian phone lives on the accounts Profile of the student's user; the
+    message is queued after commit and sent by dispatch_outbox.
+    """
+    if instance.status != "absent":
+        return
+    student = Student.objects.select_related("user__profile").filter(pk=instance.student_id).first()
+    profile = getattr(student.user, "profile", None) if student else None
+    if profile is None or not profile.guardian_phone:
+        return
+    name = str(student)
+    transaction.on_commit(lambda: notify_absence(name, profile.guardian_phone, instance.date))
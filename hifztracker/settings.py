@@ -35,6 +35,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'hifztracker.urls'
 
+# الأول يحمّل الـ profile مع المستخدم؛ ModelBackend باقٍ لجلسات سُجّلت قبل إضافته
+AUTHENTICATION_BACKENDS = [
+    'apps.accounts.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -46,6 +52,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'apps.accounts.context_processors.notifications',
             ],
         },
     },
@@ -117,13 +124,122 @@ STORAGES = {
             "base_url": MEDIA_URL,
         },
     },
+    # تسجيلات التسليمات: نفس المجلد لكن بأسماء = SHA-256 للمحتوى (بدون تكرار)
+    "submissions": {
+        "BACKEND": "apps.accounts.storage.ContentAddressedFileSystemStorage",
+        "OPTIONS": {
+            "location": MEDIA_ROOT,
+            "base_url": MEDIA_URL,
+        },
+    },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
     },
 }
 
+# مكان تخزين الملفات: 'filesystem' (افتراضي، MEDIA_ROOT)، 's3' لأي خدمة متوافقة مع S3
+# (AWS/MinIO/R2؛ تحتاج django-storages و boto3)، أو 'signed-filesystem' بديل محلي لـ S3
+# بنفس الروابط الموقّعة للتجربة. مع الروابط الموقّعة يرفع المتصفح التسجيل ويشغّله مباشرة.
+MEDIA_STORAGE = os.getenv('MEDIA_STORAGE', 'filesystem')
+MEDIA_PRESIGNED_EXPIRES = int(os.getenv('MEDIA_PRESIGNED_EXPIRES', '3600'))
+
+if MEDIA_STORAGE == 's3':
+    _S3_OPTIONS = {
+        "bucket_name": os.getenv('AWS_STORAGE_BUCKET_NAME', ''),
+        "endpoint_url": os.getenv('AWS_S3_ENDPOINT_URL') or None,
+        "region_name": os.getenv('AWS_S3_REGION_NAME') or None,
+        "access_key": os.getenv('AWS_ACCESS_KEY_ID', ''),
+        "secret_key": os.getenv('AWS_SECRET_ACCESS_KEY', ''),
+        "addressing_style": os.getenv('AWS_S3_ADDRESSING_STYLE') or None,  # 'path' لـ MinIO
+        "signature_version": "s3v4",
+        "default_acl": None,
+        "querystring_auth": True,
+        "querystring_expire": MEDIA_PRESIGNED_EXPIRES,
+        "file_overwrite": False,
+    }
+    STORAGES["default"] = {"BACKEND": "storages.backends.s3.S3Storage", "OPTIONS": _S3_OPTIONS}
+    STORAGES["submissions"] = {"BACKEND": "apps.accounts.storage_s3.ContentAddressedS3Storage", "OPTIONS": _S3_OPTIONS}
+elif MEDIA_STORAGE == 'signed-filesystem':
+    STORAGES["submissions"]["BACKEND"] = "apps.accounts.storage.ContentAddressedSignedFileSystemStorage"
+
+# أقصى مدة لتسجيل التسليم بالثواني (حد المهام بلا نطاق آيات؛ المهام الأقصر حدها أقل، انظر uploads.py)
+AUDIO_MAX_DURATION = int(os.getenv('AUDIO_MAX_DURATION', '3600'))
+
+# أرشيف التسجيلات المصححة القديمة (archive_recordings): تخزين منفصل أرخص، خارج MEDIA_ROOT
+STORAGES["audio_archive"] = {
+    "BACKEND": "django.core.files.storage.FileSystemStorage",
+    "OPTIONS": {"location": os.getenv('AUDIO_ARCHIVE_ROOT', str(BASE_DIR / 'archive'))},
+}
+if MEDIA_STORAGE == 's3':
+    # نفس الـ bucket بفئة تخزين أرخص (أو bucket آخر عبر AWS_ARCHIVE_BUCKET_NAME)
+    STORAGES["audio_archive"] = {"BACKEND": "storages.backends.s3.S3Storage", "OPTIONS": {
+        **_S3_OPTIONS,
+        "bucket_name": os.getenv('AWS_ARCHIVE_BUCKET_NAME') or _S3_OPTIONS["bucket_name"],
+        "location": "archive",
+        "object_parameters": {"StorageClass": os.getenv('AWS_ARCHIVE_STORAGE_CLASS', 'STANDARD_IA')},
+    }}
+# أيام بعد التصحيح قبل الأرشفة (تقريبًا فصل دراسي؛ لكل حلقة Halaqa.audio_retention_days)
+AUDIO_ARCHIVE_AFTER_DAYS = int(os.getenv('AUDIO_ARCHIVE_AFTER_DAYS', '120'))
+# المعاينة التي تبقى في التخزين الأساسي بدل التسجيل المؤرشف
+AUDIO_PREVIEW_SECONDS = int(os.getenv('AUDIO_PREVIEW_SECONDS', '20'))
+AUDIO_PREVIEW_BITRATE = os.getenv('AUDIO_PREVIEW_BITRATE', '12k')
+
+# تسجيلات التسليمات تُرسل عبر view يتحقق من الصلاحيات (submission_audio).
+# لإرسال الملف من السيرفر الأمامي بدل Django: 'x-accel-redirect' (nginx) أو 'x-sendfile' (Apache)
+MEDIA_SENDFILE = os.getenv('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv('MEDIA_ACCEL_REDIRECT_PREFIX', '/protected-media/')
+
+# معالجة التسجيلات (process_recordings): ffmpeg مع libopus مطلوب على السيرفر
+FFMPEG_BINARY = os.getenv('FFMPEG_BINARY', 'ffmpeg')
+AUDIO_OPUS_BITRATE = os.getenv('AUDIO_OPUS_BITRATE', '24k')
+AUDIO_TRANSCODE_TIMEOUT = int(os.getenv('AUDIO_TRANSCODE_TIMEOUT', '300'))
+
+# الأحداث الفورية للمتصفح (events_stream عبر SSE): ناقل قاعدة البيانات يعمل مع أكثر من
+# عملية؛ 'apps.accounts.events.MemoryEventBus' لعملية واحدة فقط (runserver/التجربة).
+# كل اتصال يشغل عاملًا طوال مدته: شغّل gunicorn بـ --worker-class gthread --threads N
+EVENT_BUS = os.getenv('EVENT_BUS', 'apps.accounts.events.DatabaseEventBus')
+EVENT_POLL_SECONDS = float(os.getenv('EVENT_POLL_SECONDS', '2'))
+EVENT_KEEPALIVE_SECONDS = int(os.getenv('EVENT_KEEPALIVE_SECONDS', '15'))
+# الاتصال يُغلق بعد هذه المدة ويعيد المتصفح فتحه بـ Last-Event-ID (بعد EVENT_RETRY_MS)
+EVENT_STREAM_SECONDS = int(os.getenv('EVENT_STREAM_SECONDS', '60'))
+EVENT_RETRY_MS = int(os.getenv('EVENT_RETRY_MS', '3000'))
+
+# رسائل أولياء الأمور (SMS/WhatsApp) تُجمع في OutboundMessage ويرسلها dispatch_outbox على دفعات.
+# للإرسال: 'apps.accounts.outbox.TwilioProvider'. بدون مزود تبقى الرسائل في الانتظار ويفشل
+# dispatch_outbox؛ 'apps.accounts.outbox.FakeProvider' (لا يرسل شيئًا) مع DEBUG فقط.
+OUTBOX_PROVIDER = os.getenv('OUTBOX_PROVIDER', '')
+OUTBOX_CHANNEL = os.getenv('OUTBOX_CHANNEL', 'sms')  # sms | whatsapp
+OUTBOX_BATCH_SIZE = int(os.getenv('OUTBOX_BATCH_SIZE', '50'))
+# حد المزود (رقم Twilio عادي: رسالة واحدة في الثانية)
+OUTBOX_RATE_PER_SECOND = float(os.getenv('OUTBOX_RATE_PER_SECOND', '1'))
+TWILIO_ACCOUNT_SID = os.getenv('TWILIO_ACCOUNT_SID', '')
+TWILIO_AUTH_TOKEN = os.getenv('TWILIO_AUTH_TOKEN', '')
+TWILIO_FROM_NUMBER = os.getenv('TWILIO_FROM_NUMBER', '')
+TWILIO_WHATSAPP_FROM = os.getenv('TWILIO_WHATSAPP_FROM', '')
+
+# البريد: ملخص يومي واحد لكل مستخدم (send_digests) بدل رسالة لكل حدث.
+# للتجربة: 'django.core.mail.backends.console.EmailBackend' أو '...locmem.EmailBackend'
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', '0') == '1'
+EMAIL_TIMEOUT = int(os.getenv('EMAIL_TIMEOUT', '30'))
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'webmaster@localhost')
+# رابط الموقع في رسائل البريد (لا يوجد request عند الإرسال من cron)
+SITE_URL = os.getenv('SITE_URL', 'http://localhost:8000')
+DIGEST_BATCH_SIZE = int(os.getenv('DIGEST_BATCH_SIZE', '200'))
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {"console": {"class": "logging.StreamHandler"}},
+    "loggers": {"apps": {"handlers": ["console"], "level": os.getenv('APP_LOG_LEVEL', 'INFO')}},
+}
+
 # Auth redirects
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = "accounts:login"
@@ -0,0 +1,33 @@
+// الأحداث الفورية من events_stream (Server-Sent Events) بدل إعادة تحميل اللوحات.
+// EventSource يعيد الاتصال وحده ويرسل Last-Event-ID فلا يضيع حدث بين الاتصالات.
+(function () {
+    const badge = () => document.getElementById('notifications-badge');
+
+    window.bumpNotificationsBadge = function (by) {
+        const el = badge();
+        if (!el) return;
+        const count = Math.max(0, (parseInt(el.textContent, 10) || 0) + by);
+        el.textContent = count;
+        el.classList.toggle('hidden', !count);
+        el.classList.toggle('d-none', !count);
+    };
+
+    window.liveToast = function (title, icon) {
+        if (!window.Swal) return;
+        Swal.fire({ toast: true, position: 'top-start', icon: icon || 'info', title, showConfirmButton: false, timer: 4000 });
+    };
+
+    window.listenEvents = function (url, handlers) {
+        if (!window.EventSource) return null;
+        handlers = Object.assign({
+            notification: data => { bumpNotificationsBadge(1); liveToast(data.title); },
+        }, handlers || {});
+        const source = new EventSource(url);
+        Object.entries(handlers).forEach(([kind, handler]) => {
+            source.addEventListener(kind, e => {
+                try { handler(JSON.parse(e.data)); } catch (err) { console.error(err); }
+            });
+        });
+        return source;
+    };
+})();
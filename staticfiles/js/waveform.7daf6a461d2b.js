@@ -0,0 +1,66 @@
+// رسم موجة التسجيل من القمم المحسوبة مسبقًا (peaks من get_submission_details)
+// قبل تحميل الصوت نفسه، والتنقل داخل التسجيل بالنقر على الموجة،
+// وتخطي السكتات الطويلة بين مقاطع الكلام (segments) أثناء التشغيل.
+(function () {
+    const formatTime = s => `${Math.floor(s / 60)}:${String(Math.floor(s % 60)).padStart(2, '0')}`;
+
+    window.renderWaveform = function (container, audio, peaks, duration, segments) {
+        container.innerHTML = '';
+        container.hidden = !peaks || !peaks.length;
+        audio.ontimeupdate = audio.onloadedmetadata = null;
+        if (container.hidden) return;
+        segments = segments || [];
+
+        const total = () => duration || audio.duration || 0;
+        const voicedAt = t => !segments.length || segments.some(([a, b]) => t >= a && t <= b);
+
+        const bars = document.createElement('div');
+        bars.className = 'flex items-center gap-px h-16 cursor-pointer';
+        bars.dir = 'ltr'; // الزمن من اليسار لليمين حتى في الصفحات العربية
+        peaks.forEach((p, i) => {
+            const bar = document.createElement('span');
+            bar.className = 'flex-1 rounded-sm bg-gray-300 dark:bg-gray-600';
+            bar.style.height = `${Math.max(4, p / 255 * 100)}%`;
+            if (duration && !voicedAt((i + 0.5) / peaks.length * duration)) bar.style.opacity = '0.35';
+            bars.appendChild(bar);
+        });
+
+        const footer = document.createElement('div');
+        footer.className = 'flex items-center justify-between text-xs text-text-secondary dark:text-text-secondary-dark mt-1';
+        const label = document.createElement('span');
+        label.dir = 'ltr';
+        footer.appendChild(label);
+
+        let skipSilence = false;
+        if (segments.length > 1) {
+            const toggle = document.createElement('label');
+            toggle.className = 'flex items-center gap-1 cursor-pointer select-none';
+            toggle.innerHTML = '<input type="checkbox" checked class="rounded"> تخطي السكتات';
+            skipSilence = true;
+            toggle.firstChild.onchange = e => { skipSilence = e.target.checked; };
+            footer.appendChild(toggle);
+        }
+        container.append(bars, footer);
+
+        const paint = () => {
+            const played = total() ? Math.round(audio.currentTime / total() * peaks.length) : 0;
+            bars.childNodes.forEach((bar, i) => { bar.style.backgroundColor = i < played ? 'currentColor' : ''; });
+            label.textContent = `${formatTime(audio.currentTime)} / ${formatTime(total())}`;
+        };
+        audio.ontimeupdate = () => {
+            if (skipSilence && !audio.paused && !voicedAt(audio.currentTime)) {
+                const next = segments.find(([a]) => a > audio.currentTime);
+                if (next) audio.currentTime = next[0];
+            }
+            paint();
+        };
+        audio.onloadedmetadata = paint;
+        bars.onclick = e => {
+            const rect = bars.getBoundingClientRect();
+            // المتصفح يطلب النطاق المطلوب فقط (Range) بدل تنزيل التسجيل كاملًا
+            audio.currentTime = (e.clientX - rect.left) / rect.width * total();
+            audio.play();
+        };
+        paint();
+    };
+})();